@@ -0,0 +1,55 @@
+"""Alert sinks: write throughput per batch size, and publish cost with a slow sink attached.
+
+    uv run python benchmarks/bench_alerts.py --alerts 20000 --batch 1 16 256
+"""
+from __future__ import annotations
+import argparse, asyncio, os, tempfile, time
+
+from ecod_edge.alerts import Alert, AlertDispatcher, MemorySink, RotatingFileSink, SQLiteSink
+
+def make_alerts(n: int):
+    return [
+        Alert("terminal-1", f"2025-11-10T12:00:{i % 60:02d}", "raised" if i % 2 == 0 else "cleared",
+              1.5 + i % 7, 1.2, {"ecod": 1.5, "iforest": 0.6})
+        for i in range(n)
+    ]
+
+async def publish_cost(alerts, slow_delay: float, queue_size: int) -> None:
+    fast, slow = MemorySink(name="fast"), MemorySink(delay=slow_delay, name="slow")
+    dispatcher = AlertDispatcher([fast, slow], queue_size=queue_size, linger=0.0)
+    await dispatcher.start()
+    t0 = time.perf_counter()
+    for i, alert in enumerate(alerts):
+        dispatcher.publish(alert)
+        if i % 64 == 0:
+            await asyncio.sleep(0)  # let delivery tasks run, as the detection loop would
+    us = (time.perf_counter() - t0) / len(alerts) * 1e6
+    await dispatcher.stop(timeout=2 * slow_delay)
+    stats = dispatcher.stats()
+    print(f"publish with a {slow_delay * 1e3:.0f} ms sink: {us:6.2f} us/alert  "
+          f"fast delivered={stats['fast']['delivered']}  slow delivered={stats['slow']['delivered']} dropped={stats['slow']['dropped']}")
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--alerts", type=int, default=20000)
+    p.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256])
+    p.add_argument("--slow-delay", type=float, default=0.05)
+    p.add_argument("--queue-size", type=int, default=1024)
+    args = p.parse_args()
+
+    alerts = make_alerts(args.alerts)
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch in args.batch:
+            for sink in (RotatingFileSink(os.path.join(tmp, f"alerts-{batch}.jsonl")),
+                         SQLiteSink(os.path.join(tmp, f"alerts-{batch}.db"))):
+                t0 = time.perf_counter()
+                for i in range(0, len(alerts), batch):
+                    sink.write(alerts[i:i + batch])
+                sink.close()
+                rate = len(alerts) / (time.perf_counter() - t0)
+                print(f"{sink.name.split(':')[0]:7s} batch={batch:<4d} {rate:10.0f} alerts/s")
+
+    asyncio.run(publish_cost(alerts, args.slow_delay, args.queue_size))
+
+if __name__ == "__main__":
+    main()
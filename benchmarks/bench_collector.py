@@ -0,0 +1,26 @@
+"""Collector cost per tick: /proc backend vs psutil fallback.
+
+    uv run python benchmarks/bench_collector.py --ticks 5000 --extras load1 ctx_switches
+"""
+from __future__ import annotations
+import argparse, time
+
+from ecod_edge.metrics import MetricsCollector, ProcCollector
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--ticks", type=int, default=5000)
+    p.add_argument("--extras", type=str, nargs="*", default=[])
+    args = p.parse_args()
+
+    for name, collector in (("proc", ProcCollector(extras=args.extras)), ("psutil", MetricsCollector(extras=args.extras))):
+        collector.collect()
+        t0 = time.perf_counter()
+        for _ in range(args.ticks):
+            collector.collect()
+        per_tick = (time.perf_counter() - t0) / args.ticks
+        print(f"{name:7s} {per_tick * 1e6:8.1f} us/tick")
+        collector.close()
+
+if __name__ == "__main__":
+    main()
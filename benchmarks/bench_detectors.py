@@ -0,0 +1,73 @@
+"""Per-tick cost of each registered detector and score normalizer, of gating IForest behind a cheap one, and of attribution.
+
+    uv run python benchmarks/bench_detectors.py --samples 600 --dim 6
+"""
+from __future__ import annotations
+import argparse, time
+import numpy as np
+
+from ecod_edge.detectors import DETECTORS, make_detector
+from ecod_edge.ensemble import DetectorEnsemble
+from ecod_edge.normalize import NORMALIZERS, make_normalizer
+
+def per_tick(update, score, X: np.ndarray, warmup: int) -> float:
+    """Mean microseconds per update + score after ``warmup`` ticks."""
+    for x in X[:warmup]:
+        update(x)
+    t0 = time.perf_counter()
+    for x in X[warmup:]:
+        update(x)
+        score(x)
+    return (time.perf_counter() - t0) / (len(X) - warmup) * 1e6
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--samples", type=int, default=600)
+    p.add_argument("--dim", type=int, default=6)
+    p.add_argument("--window", type=int, default=5)
+    p.add_argument("--gate-pct", type=float, nargs="+", default=[0.0, 80.0, 95.0])
+    p.add_argument("--normalize-history", type=int, nargs="+", default=[120, 86400])
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.gamma(2.0, 1.0, size=(args.samples, args.dim))
+    X[rng.integers(0, args.samples, size=args.samples // 50)] *= 5
+    warmup = min(200, args.samples // 2)
+
+    for name in DETECTORS:
+        det = make_detector(name, args.window, **({"background": False} if name == "iforest" else {}))
+        us = per_tick(det.update, lambda x: det.score(x.reshape(1, -1)), X, warmup)
+        print(f"{name:8s}: {us:10.1f} us/tick")
+        det.close()
+
+    scores = rng.gamma(2.0, 1.5, size=200000).tolist()
+    for kind in NORMALIZERS[1:]:
+        for history in args.normalize_history:
+            normalizer = make_normalizer(kind, history)
+            t0 = time.perf_counter()
+            for s in scores:
+                normalizer.transform(s)
+            us = (time.perf_counter() - t0) / len(scores) * 1e6
+            print(f"normalize={kind:6s} history={history:6d}: {us:6.2f} us/sample")
+
+    for gate_pct in args.gate_pct:
+        ens = DetectorEnsemble(args.window, detectors=("hbos", "iforest"), gate_pct=gate_pct,
+                               params={"iforest": {"background": False}})
+        us = per_tick(ens.update, ens.score, X, warmup)
+        scored = 1 - ens.gated / (len(X) - warmup)
+        print(f"hbos+iforest gate={gate_pct:4.0f}%: {us:10.1f} us/tick  iforest scored on {scored:6.1%} of ticks")
+        ens.close()
+
+    # Per-feature attribution rides on the same scoring pass; IForest's path walk is opt-in
+    for detectors, iforest_attribution in ((("ecod", "hbos"), False), (("ecod", "iforest"), False), (("ecod", "iforest"), True)):
+        costs = []
+        for attribution in (False, True):
+            ens = DetectorEnsemble(args.window, detectors=detectors, attribution=attribution,
+                                   params={"iforest": {"background": False, "attribution": iforest_attribution}})
+            costs.append(per_tick(ens.update, ens.score, X, warmup))
+            ens.close()
+        label = "+".join(detectors) + (" (iforest paths)" if iforest_attribution else "")
+        print(f"attribution {label:32s}: {costs[0]:10.1f} -> {costs[1]:10.1f} us/tick")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Hub -> worker frame fan-out over the Unix socket: delivery rate and per-frame relay cost.
+
+    uv run python benchmarks/bench_fanout.py --frames 20000 --workers 1 4 8
+
+Subscribers run in this process, so the rate is a lower bound for worker
+processes on their own cores.
+"""
+from __future__ import annotations
+import argparse, asyncio, json, os, tempfile, time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from ecod_edge.fanout import FramePublisher, FrameSubscriber
+from ecod_edge.inference import DetectionResult
+from ecod_edge.metrics import MetricSnapshot
+from ecod_edge.server import metric_from_dict, metric_to_dict
+
+async def deliver(lines, workers: int, queue_size: int) -> float:
+    """Frames per second until every subscriber has received every line."""
+    path = os.path.join(tempfile.mkdtemp(), "hub.sock")
+    publisher = FramePublisher(path, queue_size=queue_size)
+    await publisher.start()
+    done = asyncio.Event()
+    counts = [0] * workers
+
+    def counter(i):
+        async def on_frame(text: str):
+            counts[i] += 1
+            if sum(counts) == workers * len(lines):
+                done.set()
+        return on_frame
+
+    subscribers = [FrameSubscriber(path, counter(i)) for i in range(workers)]
+    tasks = [asyncio.create_task(s.run()) for s in subscribers]
+    while len(publisher.subscribers) < workers:
+        await asyncio.sleep(0.01)
+    t0 = time.perf_counter()
+    for line in lines:
+        publisher.publish(line)
+        await asyncio.sleep(0)
+    await done.wait()
+    elapsed = time.perf_counter() - t0
+    for task in tasks:
+        task.cancel()
+    await publisher.stop()
+    return len(lines) / elapsed
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--workers", type=int, nargs="*", default=[1, 4, 8])
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    start = datetime.now(timezone.utc)
+    lines = [
+        json.dumps(metric_to_dict(
+            MetricSnapshot((start + timedelta(seconds=i)).isoformat(), *row.tolist()),
+            DetectionResult(*rng.random(4).tolist(), False, False, scores={"ecod": 1.0, "iforest": 0.5}),
+        ))
+        for i, row in enumerate(rng.lognormal(8, 2, size=(args.frames, 6)))
+    ]
+
+    t0 = time.perf_counter()
+    for line in lines:
+        metric_from_dict(json.loads(line))
+    print(f"relay decode: {(time.perf_counter() - t0) / len(lines) * 1e6:8.2f} us/frame")
+    for workers in args.workers:
+        fps = asyncio.run(deliver(lines, workers, queue_size=len(lines)))
+        print(f"workers={workers:3d}: {fps:10.0f} frames/sec to every worker")
+
+if __name__ == "__main__":
+    main()
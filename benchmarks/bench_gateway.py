@@ -0,0 +1,41 @@
+"""Gateway throughput: many POS terminals scored per 1 Hz tick on one core.
+
+    uv run python benchmarks/bench_gateway.py --terminals 500 --ticks 120
+"""
+from __future__ import annotations
+import argparse, time
+import numpy as np
+
+from ecod_edge.gateway import TerminalRegistry
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--terminals", type=int, default=500)
+    p.add_argument("--ticks", type=int, default=120)
+    p.add_argument("--window", type=int, default=60)
+    p.add_argument("--baseline", type=int, default=120)
+    p.add_argument("--dim", type=int, default=6)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    ids = [f"pos-{i:04d}" for i in range(args.terminals)]
+    reg = TerminalRegistry(dim=args.dim, window=args.window, baseline=args.baseline)
+
+    latencies = []
+    for tick in range(args.ticks):
+        feats = rng.normal(size=(args.terminals, args.dim))
+        batch = list(zip(ids, [str(tick)] * args.terminals, feats))
+        t0 = time.perf_counter()
+        reg.ingest(batch)
+        results = reg.tick()
+        if tick >= args.window:
+            latencies.append(time.perf_counter() - t0)
+            assert len(results) == args.terminals
+
+    lat = np.array(latencies) * 1e3
+    print(f"{args.terminals} terminals, window={args.window}, baseline={args.baseline}, dim={args.dim}")
+    print(f"ingest+tick ms: p50={np.percentile(lat, 50):.2f} p99={np.percentile(lat, 99):.2f} max={lat.max():.2f}")
+    print(f"terminal-samples/sec on one core: {args.terminals / (lat.mean() / 1e3):.0f}")
+
+if __name__ == "__main__":
+    main()
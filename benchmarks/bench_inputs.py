@@ -0,0 +1,56 @@
+"""Replay input formats: rows/sec and peak RSS of a chunked read, CSV vs .npy/Parquet/Arrow.
+
+    uv run python benchmarks/bench_inputs.py --rows 2000000 --features cpu net
+"""
+from __future__ import annotations
+import argparse, os, resource, subprocess, sys, tempfile, time
+import numpy as np
+
+from ecod_edge.stream import convert, iter_chunks
+
+def read_once(path: str, features) -> None:
+    """Child process: stream the file chunk by chunk and report rate + peak RSS."""
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    t0 = time.perf_counter()
+    n = 0
+    for ts, X in iter_chunks(path, features):
+        n += len(ts)
+    dt = time.perf_counter() - t0
+    print(f"{n / dt:14.0f} rows/sec  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - base:+7.1f} MB over imports")
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--features", type=str, nargs="*", default=None)
+    p.add_argument("--formats", type=str, nargs="*", default=["npy", "parquet", "arrow"])
+    p.add_argument("--read", type=str, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.read:
+        read_once(args.read, args.features)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "metrics.csv")
+        rng = np.random.default_rng(0)
+        with open(src, "w") as f:
+            f.write("ts,cpu,mem,net,io\n")
+            for start in range(0, args.rows, 100_000):
+                n = min(100_000, args.rows - start)
+                X = rng.random((n, 4)) * [100, 100, 1e6, 1e5]
+                f.writelines(f"2025-11-10T12:00:{i % 60:02d},{a:.4f},{b:.4f},{c:.4f},{d:.4f}\n" for i, (a, b, c, d) in enumerate(X.tolist()))
+        paths = {"csv": src}
+        for fmt in args.formats:
+            paths[fmt] = os.path.join(tmp, f"metrics.{fmt}")
+            t0 = time.perf_counter()
+            convert(src, paths[fmt])
+            print(f"convert -> {fmt:8s} {time.perf_counter() - t0:6.2f}s  {os.path.getsize(paths[fmt]) / 2**20:8.1f} MB")
+        print(f"csv source          {os.path.getsize(src) / 2**20:8.1f} MB")
+        for fmt, path in paths.items():
+            cmd = [sys.executable, __file__, "--read", path]
+            if args.features:
+                cmd += ["--features", *args.features]
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+            print(f"{fmt:8s} {out}")
+
+if __name__ == "__main__":
+    main()
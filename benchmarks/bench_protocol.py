@@ -0,0 +1,44 @@
+"""/ws/metrics wire formats: serialize cost and bytes per frame, JSON vs packed binary.
+
+    uv run python benchmarks/bench_protocol.py --frames 20000 --batch 1 10 60
+"""
+from __future__ import annotations
+import argparse, json, time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from ecod_edge.inference import DetectionResult
+from ecod_edge.metrics import MetricSnapshot
+from ecod_edge.protocol import BinaryCodec
+from ecod_edge.server import metric_to_dict
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--frames", type=int, default=20000)
+    p.add_argument("--batch", type=int, nargs="*", default=[1, 10, 60])
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    start = datetime.now(timezone.utc)
+    frames = [
+        (MetricSnapshot((start + timedelta(seconds=i)).isoformat(), *row.tolist()),
+         DetectionResult(*rng.random(4).tolist(), False, False))
+        for i, row in enumerate(rng.lognormal(8, 2, size=(args.frames, 6)))
+    ]
+
+    t0 = time.perf_counter()
+    sizes = [len(json.dumps(metric_to_dict(m, d)).encode()) for m, d in frames]
+    json_us = (time.perf_counter() - t0) / args.frames * 1e6
+    print(f"json            {json_us:7.2f} us/frame  {np.mean(sizes):7.1f} B/frame")
+
+    codec = BinaryCodec()
+    for batch in args.batch:
+        t0 = time.perf_counter()
+        records = [codec.record(m, d) for m, d in frames]
+        total = sum(len(codec.pack(records[i:i + batch])) for i in range(0, len(records), batch))
+        us = (time.perf_counter() - t0) / args.frames * 1e6
+        print(f"binary batch={batch:<3d} {us:7.2f} us/frame  {total / args.frames:7.1f} B/frame"
+              f"  ({np.mean(sizes) * args.frames / total:4.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Import-time profile of each entry point, by top-level package (python -X importtime).
+
+    uv run python benchmarks/bench_startup.py --modules ecod_edge.cli ecod_edge.edge ecod_edge.server --top 8
+"""
+from __future__ import annotations
+import argparse, subprocess, sys
+from collections import defaultdict
+from typing import Dict, Tuple
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """(total ms, self ms per top-level package) for importing ``module`` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    by_package: Dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        by_package[name.split(".")[0]] += int(self_us) / 1e3
+        if name == module:
+            total = int(cumulative_us) / 1e3
+    return total, by_package
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--modules", type=str, nargs="+", default=["ecod_edge.cli", "ecod_edge.edge", "ecod_edge.server"])
+    p.add_argument("--top", type=int, default=8)
+    args = p.parse_args()
+
+    for module in args.modules:
+        total, by_package = import_profile(module)
+        print(f"{module}: {total:8.1f} ms")
+        for package, ms in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"    {package:24s} {ms:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
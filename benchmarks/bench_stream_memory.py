@@ -0,0 +1,60 @@
+"""Memory of windowed_vectors over a long stream: ring buffer vs. the old list-backed window.
+
+    uv run python benchmarks/bench_stream_memory.py --rows 3000000
+"""
+from __future__ import annotations
+import argparse, multiprocessing as mp, time
+import numpy as np
+import psutil
+
+from ecod_edge.stream import windowed_vectors
+
+def legacy_windowed_vectors(rows, window: int):
+    """The original implementation: unbounded lists, one new matrix per row."""
+    buf_ts, buf = [], []
+    for ts, feats in rows:
+        buf.append(feats)
+        buf_ts.append(ts)
+        if len(buf) >= window:
+            X = np.array(buf[-window:])
+            yield buf_ts[-1], X
+
+def synthetic_rows(n: int, dim: int):
+    rng = np.random.default_rng(0)
+    block = 10000
+    for start in range(0, n, block):
+        feats = rng.random((min(block, n - start), dim)).tolist()
+        for i, row in enumerate(feats):
+            yield str(start + i), row
+
+def measure(impl: str, rows: int, window: int, dim: int, out: mp.Queue):
+    proc = psutil.Process()
+    gen = legacy_windowed_vectors if impl == "legacy" else windowed_vectors
+    rss0 = peak = proc.memory_info().rss
+    t0 = time.perf_counter()
+    acc = 0.0
+    for i, (ts, X) in enumerate(gen(synthetic_rows(rows, dim), window=window)):
+        acc += X[-1, 0]
+        if i % 100000 == 0:
+            peak = max(peak, proc.memory_info().rss)
+    peak = max(peak, proc.memory_info().rss)
+    out.put((impl, rows / (time.perf_counter() - t0), (peak - rss0) / 2**20))
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--rows", type=int, default=3_000_000)
+    p.add_argument("--window", type=int, default=60)
+    p.add_argument("--dim", type=int, default=4)
+    args = p.parse_args()
+
+    out: mp.Queue = mp.Queue()
+    for impl in ("ring", "legacy"):
+        # separate processes so one run's freed heap does not mask the other's growth
+        proc = mp.Process(target=measure, args=(impl, args.rows, args.window, args.dim, out))
+        proc.start()
+        name, rps, grown = out.get()
+        proc.join()
+        print(f"{name:8s}: {rps:10.0f} rows/sec  RSS growth {grown:8.1f} MiB over {args.rows} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Load test for /ws/ingest with fake edge agents; reports frames/sec and p99 ingest-to-score latency.
+
+Starts a local server unless --url is given:
+
+    uv run python benchmarks/load_ingest.py --agents 10 --terminals 50 --seconds 20
+"""
+from __future__ import annotations
+import argparse, asyncio, json, os, random, subprocess, sys, time, urllib.request
+import numpy as np
+import websockets
+
+def frame(terminal_id: str, tick: int) -> dict:
+    return {
+        "terminal_id": terminal_id,
+        "ts": str(tick),
+        "cpu": random.gauss(35, 5),
+        "mem": random.gauss(42, 3),
+        "netInBps": random.gauss(1e5, 2e4),
+        "netOutBps": random.gauss(2e4, 4e3),
+        "diskReadBps": random.gauss(5e3, 1e3),
+        "diskWriteBps": random.gauss(1e4, 2e3),
+    }
+
+async def agent(url: str, agent_id: int, terminals: int, rate: float, deadline: float, latencies: list, counts: list):
+    """One agent relays `terminals` POS terminals, pushing one batch per 1/rate seconds."""
+    ids = [f"agent{agent_id}-pos{i}" for i in range(terminals)]
+    async with websockets.connect(url, max_size=None) as ws:
+        tick = 0
+        next_send = time.perf_counter()
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await ws.send(json.dumps([frame(t, tick) for t in ids]))
+            reply = json.loads(await ws.recv())
+            latencies.append(time.perf_counter() - t0)
+            counts.append(len(reply["results"]))
+            tick += 1
+            next_send += 1.0 / rate
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+async def run(args) -> None:
+    latencies: list = []
+    counts: list = []
+    deadline = time.perf_counter() + args.seconds
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        agent(args.url, i, args.terminals, args.rate, deadline, latencies, counts)
+        for i in range(args.agents)
+    ))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    print(f"{args.agents} agents x {args.terminals} terminals @ {args.rate} Hz for {elapsed:.1f}s")
+    print(f"sustained frames/sec : {sum(counts) / elapsed:.0f}")
+    print(f"ingest-to-score ms   : p50={np.percentile(lat, 50):.2f} p99={np.percentile(lat, 99):.2f} max={lat.max():.2f}")
+
+def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            urllib.request.urlopen(url, timeout=1.0).read()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.2)
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--url", type=str, default=None, help="ws://host:port/ws/ingest of a running server")
+    p.add_argument("--agents", type=int, default=10)
+    p.add_argument("--terminals", type=int, default=50, help="terminals relayed per agent")
+    p.add_argument("--rate", type=float, default=1.0, help="batches per second per agent")
+    p.add_argument("--seconds", type=float, default=20.0)
+    p.add_argument("--port", type=int, default=8765)
+    args = p.parse_args()
+
+    server = None
+    if args.url is None:
+        args.url = f"ws://127.0.0.1:{args.port}/ws/ingest"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "ecod_edge.server:app", "--port", str(args.port), "--log-level", "warning"],
+            env={**os.environ, "INCLUDE_SCORES": "false"},
+        )
+        wait_ready(f"http://127.0.0.1:{args.port}/healthz")
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""Benchmark suite for the detection hot path; writes JSON for comparing runs across releases.
+
+    uv run python benchmarks/suite.py --out bench.json
+    uv run python benchmarks/suite.py --quick --out new.json --compare bench.json
+
+Each axis (window, baseline, feature dimension, ensemble, client count, wire format, entry point) is swept
+one at a time around the defaults; --grid runs the full cross product of the
+detector axes instead. Per case: samples/sec, per-stage latency percentiles
+in microseconds and the process peak RSS so far. The startup bench reports
+seconds from launching an entry point to its first scored row (its
+samples_per_sec is starts per second, so --compare flags slower startups).
+"""
+from __future__ import annotations
+import argparse, asyncio, contextlib, csv, io, itertools, json, logging, os, platform, resource, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List
+import numpy as np
+
+from ecod_edge.detectors import RetrainingIForest, StreamingECODDetector
+from ecod_edge.inference import DetectionResult
+from ecod_edge.metrics import MetricSnapshot
+from ecod_edge.utils import PercentileThreshold, SustainAlarm, make_threshold
+
+DEFAULTS = dict(window=5, baseline=60, dim=6, ensemble="max", clients=1, format="json", entry="pos-ecod")
+SWEEP = dict(window=[5, 60, 300], baseline=[60, 600, 3600], dim=[4, 6, 16], ensemble=["max", "mean"], clients=[1, 10, 100], format=["json", "binary"],
+             entry=["pos-ecod", "pos-ecod-ecod", "pos-ecod-edge"])
+QUICK_SWEEP = dict(window=[5, 60], baseline=[60, 600], dim=[4, 6], ensemble=["max", "mean"], clients=[1, 10], format=["json", "binary"],
+                   entry=["pos-ecod", "pos-ecod-edge"])
+
+# Entry points timed by the startup bench: module and arguments after --mock PATH
+ENTRIES = {
+    "pos-ecod": ("ecod_edge.cli", []),                          # default ECOD + IForest
+    "pos-ecod-ecod": ("ecod_edge.cli", ["--detectors", "ecod"]),  # scikit-learn never imported
+    "pos-ecod-edge": ("ecod_edge.edge", []),                    # NumPy only
+}
+
+# ---------------------------------------------------------------- data
+
+def synthetic_metrics(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """POS-like metrics: cpu/mem percentages, bursty net/io rates, rare spikes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    cols = [
+        np.clip(35 + 10 * np.sin(t / 300.0) + rng.normal(0, 5, n), 0, 100),  # cpu
+        np.clip(42 + rng.normal(0, 3, n), 0, 100),                            # mem
+        rng.lognormal(11.5, 0.4, n),                                           # net
+        rng.lognormal(8.5, 0.6, n),                                            # io
+    ]
+    while len(cols) < dim:
+        cols.append(rng.lognormal(8.0, 0.5, n))
+    X = np.stack(cols[:dim], axis=1)
+    spikes = rng.random(n) < 0.005
+    X[spikes] *= rng.uniform(2, 5, size=(spikes.sum(), 1))
+    return X
+
+def write_csv(path: str, X: np.ndarray) -> None:
+    """Same layout as the --mock CSVs: ts,cpu,mem,net,io[,...]."""
+    names = ["cpu", "mem", "net", "io"] + [f"f{i}" for i in range(4, X.shape[1])]
+    start = datetime(2025, 11, 10, 12, 0, 0).timestamp()
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["ts"] + names[:X.shape[1]])
+        for i, row in enumerate(X.tolist()):
+            ts = datetime.fromtimestamp(start + 15 * i).strftime("%Y-%m-%dT%H:%M:%S")
+            w.writerow([ts] + [f"{v:.4f}" for v in row])
+
+def snapshot(row: np.ndarray) -> MetricSnapshot:
+    v = (row.tolist() + [0.0] * 6)[:6]
+    return MetricSnapshot(datetime.now(timezone.utc).isoformat(), *v)
+
+# ---------------------------------------------------------------- helpers
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    us = np.asarray(samples) * 1e6
+    return {f"p{q}": float(np.percentile(us, q)) for q in (50, 90, 99)} | {"max": float(us.max())}
+
+class StageTimer:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._t = time.perf_counter()
+
+    def start(self) -> None:
+        self._t = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.samples.setdefault(stage, []).append(now - self._t)
+        self._t = now
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {k: percentiles(v) for k, v in self.samples.items()}
+
+# ---------------------------------------------------------------- benchmarks
+
+def bench_detector(samples: int, window: int, baseline: int, dim: int, ensemble: str, **_) -> dict:
+    """RealtimeDetector.process stage by stage, on the same components it uses."""
+    from ecod_edge.server import metric_to_dict
+
+    X = synthetic_metrics(samples + window, dim)
+    ecod = StreamingECODDetector(window=window)
+    iforest = RetrainingIForest()
+    threshold = make_threshold(maxlen=baseline)
+    alarm = SustainAlarm(n=6, k=6)
+    timer = StageTimer()
+
+    for row in X[:window - 1]:
+        ecod.update(row)
+        iforest.update(row)
+
+    t0 = time.perf_counter()
+    for row in X[window - 1:]:
+        latest = row.reshape(1, -1)
+        timer.start()
+        ecod.update(row)
+        timer.lap("ecod_fit")
+        s_ecod = float(ecod.score(latest)[0])
+        timer.lap("ecod_score")
+        iforest.update(row)
+        timer.lap("iforest_fit")
+        s_if = float(iforest.score(latest)[0])
+        timer.lap("iforest_score")
+        s_ens = max(s_ecod, s_if) if ensemble == "max" else (s_ecod + s_if) / 2.0
+        timer.lap("ensemble")
+        threshold.update(s_ens)
+        thr = threshold.percentile(98.0)
+        timer.lap("threshold")
+        is_alarm = alarm.update(s_ens > thr)
+        timer.lap("alarm")
+        json.dumps(metric_to_dict(snapshot(row), DetectionResult(s_ecod, s_if, s_ens, thr, s_ens > thr, is_alarm)))
+        timer.lap("serialize")
+    elapsed = time.perf_counter() - t0
+    iforest.close()
+    return {"samples_per_sec": (samples + 1) / elapsed, "latency_us": timer.report()}
+
+def bench_pipeline(samples: int, window: int, baseline: int, dim: int, ensemble: str, **_) -> dict:
+    """End-to-end pos-ecod over a generated CSV, streaming and --batch."""
+    from ecod_edge.batch import run_batch
+    from ecod_edge.pipeline import run_pipeline
+
+    out: dict = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.csv")
+        write_csv(path, synthetic_metrics(samples + window, dim))
+        params = dict(mock_path=path, window=window, baseline=baseline, ensemble=ensemble, out_csv=os.path.join(tmp, "alerts.csv"))
+        for mode, fn in (("stream", lambda: run_pipeline(interval=0.0, **params)), ("batch", lambda: run_batch(**params))):
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                fn()
+                out[f"{mode}_samples_per_sec"] = samples / (time.perf_counter() - t0)
+    out["samples_per_sec"] = out["stream_samples_per_sec"]
+    return out
+
+def bench_threshold(samples: int, baseline: int, **_) -> dict:
+    scores = synthetic_metrics(samples, 4)[:, 2].tolist()
+    timer = StageTimer()
+    tracker = PercentileThreshold(maxlen=baseline)
+    t0 = time.perf_counter()
+    for s in scores:
+        timer.start()
+        tracker.update(s)
+        tracker.percentile(98.0)
+        timer.lap("threshold")
+    return {"samples_per_sec": samples / (time.perf_counter() - t0), "latency_us": timer.report()}
+
+class _FakeSocket:
+    """Stands in for a WebSocket: accepts, and 'sends' with a tiny await, counting bytes."""
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.bytes_sent += len(message.encode())
+        await asyncio.sleep(0)
+
+    async def send_bytes(self, message: bytes):
+        self.bytes_sent += len(message)
+        await asyncio.sleep(0)
+
+def bench_fanout(samples: int, clients: int, format: str, **_) -> dict:
+    """Serialize once per format + ConnectionManager.broadcast to N clients, drained concurrently."""
+    from ecod_edge.server import ConnectionManager
+    logging.getLogger("ecod_edge.server").setLevel(logging.WARNING)  # no per-client connect lines
+
+    async def run() -> dict:
+        manager = ConnectionManager(queue_size=8)
+        queues = [await manager.connect(_FakeSocket(), format) for _ in range(clients)]
+        sockets = list(manager.active_connections)
+
+        async def drain(ws, q):
+            while True:
+                item = await q.get()
+                if format == "json":
+                    await ws.send_text(item)
+                else:
+                    await ws.send_bytes(manager.codec.pack([item]))
+
+        drains = [asyncio.create_task(drain(ws, q)) for ws, q in zip(sockets, queues)]
+        rows = synthetic_metrics(samples, 6)
+        det = DetectionResult(1.0, 0.5, 1.0, 2.0, False, False)
+        timer = StageTimer()
+        t0 = time.perf_counter()
+        for row in rows:
+            timer.start()
+            frame = manager.encode(snapshot(row), det)
+            timer.lap("serialize")
+            await manager.broadcast(frame)
+            timer.lap("broadcast")
+            await asyncio.sleep(0)  # let the senders run, as between real ticks
+        elapsed = time.perf_counter() - t0
+        for task in drains:
+            task.cancel()
+        return {
+            "samples_per_sec": samples / elapsed,
+            "latency_us": timer.report(),
+            "dropped_frames": manager.dropped_frames,
+            "bytes_per_frame": sum(ws.bytes_sent for ws in sockets) / (clients * samples),
+        }
+
+    return asyncio.run(run())
+
+def bench_startup(samples: int, window: int, entry: str, repeat: int = 3, **_) -> dict:
+    """Seconds from launching an entry point in a fresh interpreter to its first scored row (best of ``repeat``)."""
+    module, extra = ENTRIES[entry]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.csv")
+        write_csv(path, synthetic_metrics(samples + window, 4))
+        with open(path) as f:
+            first_ts = f.read().splitlines()[window].split(",")[0]  # header, then window-1 warm-up rows
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, "-u", "-W", "ignore", "-m", module, "--mock", path, "--window", str(window), *extra],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            )
+            for line in proc.stdout:
+                if first_ts in line:
+                    times.append(time.perf_counter() - t0)
+                    break
+            proc.kill()
+            proc.wait()
+    first_score = min(times)
+    return {"samples_per_sec": 1.0 / first_score, "first_score_s": first_score}
+
+BENCHES = {
+    "detector": (bench_detector, ("window", "baseline", "dim", "ensemble")),
+    "pipeline": (bench_pipeline, ("window", "baseline", "ensemble")),
+    "threshold": (bench_threshold, ("baseline",)),
+    "fanout": (bench_fanout, ("clients", "format")),
+    "startup": (bench_startup, ("entry",)),
+}
+
+def cases(axes, sweep, grid: bool) -> Iterator[dict]:
+    if grid:
+        for values in itertools.product(*(sweep[a] for a in axes)):
+            yield {**DEFAULTS, **dict(zip(axes, values))}
+        return
+    seen = set()
+    for axis in axes:
+        for value in sweep[axis]:
+            params = {**DEFAULTS, axis: value}
+            key = tuple(sorted(params.items()))
+            if key not in seen:
+                seen.add(key)
+                yield params
+
+# ---------------------------------------------------------------- reporting
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def case_key(result: dict) -> str:
+    return result["bench"] + " " + " ".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+
+def compare(current: dict, baseline_path: str, tolerance: float) -> int:
+    """Print throughput ratios against a previous run; returns the regression count."""
+    with open(baseline_path) as f:
+        old = {case_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in current["results"]:
+        prev = old.get(case_key(r))
+        if prev is None:
+            continue
+        ratio = r["samples_per_sec"] / prev["samples_per_sec"]
+        flag = ""
+        if ratio < 1.0 - tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{case_key(r):60s} {prev['samples_per_sec']:12.1f} -> {r['samples_per_sec']:12.1f}  x{ratio:5.2f}{flag}")
+    return regressions
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--out", type=str, default="bench.json")
+    p.add_argument("--samples", type=int, default=None, help="samples per case (default 300, --quick 120)")
+    p.add_argument("--bench", type=str, nargs="*", choices=sorted(BENCHES), default=sorted(BENCHES))
+    p.add_argument("--quick", action="store_true", help="smaller sweep for CI / smoke runs")
+    p.add_argument("--grid", action="store_true", help="full cross product of each bench's axes")
+    p.add_argument("--compare", type=str, default=None, help="previous JSON to compare samples/sec against")
+    p.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging a regression")
+    args = p.parse_args()
+
+    sweep = QUICK_SWEEP if args.quick else SWEEP
+    samples = args.samples or (120 if args.quick else 300)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "samples": samples,
+        },
+        "results": [],
+    }
+    for name in args.bench:
+        fn, axes = BENCHES[name]
+        for params in cases(axes, sweep, args.grid):
+            used = {a: params[a] for a in axes}
+            result = fn(samples=samples, **params)
+            result = {"bench": name, "params": used, **result, "peak_rss_mb": peak_rss_mb()}
+            report["results"].append(result)
+            print(f"{case_key(result):60s} {result['samples_per_sec']:12.1f} samples/sec", file=sys.stderr)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+    if args.compare:
+        sys.exit(1 if compare(report, args.compare, args.tolerance) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ import { useWebSocket } from './hooks/useWebSocket';
 import { useTimeseries } from './hooks/useTimeseries';
 import { StatCard } from './components/StatCard';
 import { MetricChart } from './components/MetricChart';
+import type { WireFormat } from './types';
 
 const theme = createTheme({
   palette: {
@@ -123,17 +124,21 @@ const theme = createTheme({
 });
 
 const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000/ws/metrics';
+const WS_FORMAT: WireFormat = import.meta.env.VITE_WS_FORMAT === 'binary' ? 'binary' : 'json';
+const WS_BATCH = Number(import.meta.env.VITE_WS_BATCH || 1);
 
 function App() {
-  const { lastMessage, status, reconnectAttempts } = useWebSocket({ url: WS_URL });
+  const { lastMessage, lastMessages, status, reconnectAttempts } = useWebSocket({
+    url: WS_URL,
+    format: WS_FORMAT,
+    batch: WS_BATCH,
+  });
   const { data, addPoint } = useTimeseries({ maxLength: 300 });
 
-  // Add new data point when message arrives
+  // Add new data points when a message (possibly a batch) arrives
   useEffect(() => {
-    if (lastMessage) {
-      addPoint(lastMessage);
-    }
-  }, [lastMessage, addPoint]);
+    lastMessages.forEach(addPoint);
+  }, [lastMessages, addPoint]);
 
   // Format bytes per second to human readable
   const formatBps = (bps: number): string => {
@@ -157,6 +162,13 @@ function App() {
   const isAlarm = lastMessage?.alarm || false;
   const hasScores = lastMessage?.score_ens !== undefined;
 
+  // Feature with the largest share of the anomaly score, while over threshold
+  const attribution = lastMessage?.exceed || isAlarm ? lastMessage?.attribution : undefined;
+  const topFeature = attribution
+    ? Object.entries(attribution).reduce((best, entry) => (entry[1] > best[1] ? entry : best))
+    : undefined;
+  const contribution = (key: string) => (topFeature?.[0] === key ? topFeature[1] : undefined);
+
   return (
     <ThemeProvider theme={theme}>
       <CssBaseline />
@@ -229,6 +241,7 @@ function App() {
                 icon={<SpeedIcon fontSize="large" />}
                 color="#2563eb"
                 alarm={isAlarm}
+                contribution={contribution('cpu')}
               />
             </Grid>
             <Grid size={{ xs: 12, md: 12, lg: 3 }} xs={12} sm={6} md={3}>
@@ -239,6 +252,7 @@ function App() {
                 icon={<MemoryIcon fontSize="large" />}
                 color="#10b981"
                 alarm={isAlarm}
+                contribution={contribution('mem')}
               />
             </Grid>
             <Grid size={{ xs: 12, md: 12, lg: 3 }} xs={12} sm={6} md={3}>
@@ -247,6 +261,7 @@ function App() {
                 value={formatBps(lastMessage?.netInBps || 0)}
                 icon={<CloudIcon fontSize="large" />}
                 color="#f59e0b"
+                contribution={contribution('netInBps')}
               />
             </Grid>
             <Grid size={{ xs: 12, md: 12, lg: 3 }} xs={12} sm={6} md={3}>
@@ -255,6 +270,7 @@ function App() {
                 value={formatBps(lastMessage?.netOutBps || 0)}
                 icon={<CloudIcon fontSize="large" />}
                 color="#8b5cf6"
+                contribution={contribution('netOutBps')}
               />
             </Grid>
           </Grid>
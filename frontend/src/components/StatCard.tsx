@@ -8,19 +8,22 @@ interface StatCardProps {
   icon?: ReactNode;
   color?: string;
   alarm?: boolean;
+  contribution?: number; // share of the anomaly score when this metric is the top contributor
 }
 
-export const StatCard = ({ title, value, unit, icon, color = '#2563eb', alarm = false }: StatCardProps) => {
+export const StatCard = ({ title, value, unit, icon, color = '#2563eb', alarm = false, contribution }: StatCardProps) => {
   const isNumber = typeof value === 'number';
   const displayValue = isNumber ? (value as number).toFixed(2) : value;
   const bgColor = alarm ? '#fef2f2' : 'white';
-  const borderColor = alarm ? '#ef4444' : color;
+  const highlighted = contribution !== undefined;
+  const borderColor = alarm || highlighted ? '#ef4444' : color;
 
   return (
     <Card
       sx={{
         height: '100%',
         borderLeft: `4px solid ${borderColor}`,
+        boxShadow: highlighted ? '0 0 0 2px #ef4444' : undefined,
         backgroundColor: bgColor,
         transition: 'all 0.3s cubic-bezier(0.4, 0, 0.2, 1)',
         position: 'relative',
@@ -102,6 +105,14 @@ export const StatCard = ({ title, value, unit, icon, color = '#2563eb', alarm =
             </Typography>
           )}
         </Typography>
+        {highlighted && (
+          <Typography
+            variant="caption"
+            sx={{ color: '#ef4444', fontWeight: 600, letterSpacing: '0.5px' }}
+          >
+            Top contributor · {Math.round((contribution as number) * 100)}% of score
+          </Typography>
+        )}
       </CardContent>
     </Card>
   );
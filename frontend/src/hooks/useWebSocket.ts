@@ -1,35 +1,112 @@
 import { useEffect, useRef, useState } from 'react';
-import type { MetricMessage, ConnectionStatus } from '../types';
+import type { MetricMessage, ConnectionStatus, BinarySchema, WireFormat } from '../types';
 
 interface UseWebSocketOptions {
   url: string;
+  format?: WireFormat;
+  batch?: number; // frames per binary message
   reconnectDelay?: number;
   maxReconnectAttempts?: number;
 }
 
 interface UseWebSocketReturn {
   lastMessage: MetricMessage | null;
+  lastMessages: MetricMessage[]; // every frame of the latest message (binary streams may batch)
   status: ConnectionStatus;
   reconnectAttempts: number;
 }
 
+// Binary layout v1 (little-endian): header <u8 version, u8 reserved, u16 count, f64 t0 seconds>,
+// then per record <u32 ms since t0, u8 flags, f32 x fields>
+const HEADER_BYTES = 12;
+const RECORD_PREFIX_BYTES = 5;
+
+// score_ecod, score_iforest, score_<detector> for other configured detectors, score_ens, threshold,
+// then attr_<feature> when the schema advertises attribution
+const isScoreField = (field: string) => field.startsWith('score_') || field === 'threshold' || field.startsWith('attr_');
+const DETECTOR_SCORE = /^score_(?!ens$)(.+)$/;
+const FEATURE_ATTR = /^attr_(.+)$/;
+
+export const decodeBinaryFrames = (buffer: ArrayBuffer, schema: BinarySchema): MetricMessage[] => {
+  const view = new DataView(buffer);
+  const version = view.getUint8(0);
+  if (version !== schema.version) {
+    throw new Error(`Unsupported binary frame version ${version}`);
+  }
+  const count = view.getUint16(2, true);
+  const t0Ms = view.getFloat64(4, true) * 1000;
+  const recordBytes = RECORD_PREFIX_BYTES + 4 * schema.fields.length;
+
+  const messages: MetricMessage[] = [];
+  for (let i = 0; i < count; i++) {
+    let offset = HEADER_BYTES + i * recordBytes;
+    const dtMs = view.getUint32(offset, true);
+    const flags = view.getUint8(offset + 4);
+    offset += RECORD_PREFIX_BYTES;
+
+    const hasDetection = (flags & schema.flags.detection) !== 0;
+    const message: Record<string, unknown> = { ts: new Date(t0Ms + dtMs).toISOString() };
+    const scores: Record<string, number | null> = {};
+    const attribution: Record<string, number> = {};
+    schema.fields.forEach((field, j) => {
+      const feature = FEATURE_ATTR.exec(field);
+      if (feature) {
+        // NaN when the detection carries no attribution; JSON omits the object
+        const value = view.getFloat32(offset + 4 * j, true);
+        if (hasDetection && !Number.isNaN(value)) attribution[feature[1]] = value;
+      } else if (hasDetection || !isScoreField(field)) {
+        const value = view.getFloat32(offset + 4 * j, true);
+        // a score the server did not produce (detector not configured or gated off) is NaN; JSON sends null
+        message[field] = Number.isNaN(value) && isScoreField(field) ? null : value;
+        const detector = DETECTOR_SCORE.exec(field);
+        if (detector && schema.detectors.includes(detector[1])) scores[detector[1]] = message[field] as number | null;
+      }
+    });
+    if (hasDetection) {
+      message.scores = scores;
+      message.exceed = (flags & schema.flags.exceed) !== 0;
+      message.alarm = (flags & schema.flags.alarm) !== 0;
+      if (Object.keys(attribution).length > 0) message.attribution = attribution;
+    }
+    messages.push(message as unknown as MetricMessage);
+  }
+  return messages;
+};
+
 export const useWebSocket = ({
   url,
+  format = 'json',
+  batch = 1,
   reconnectDelay = 3000,
   maxReconnectAttempts = 10,
 }: UseWebSocketOptions): UseWebSocketReturn => {
   const [lastMessage, setLastMessage] = useState<MetricMessage | null>(null);
+  const [lastMessages, setLastMessages] = useState<MetricMessage[]>([]);
   const [status, setStatus] = useState<ConnectionStatus>('connecting');
   const [reconnectAttempts, setReconnectAttempts] = useState(0);
 
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null);
   const shouldReconnectRef = useRef(true);
+  const schemaRef = useRef<BinarySchema | null>(null);
+
+  const deliver = (messages: MetricMessage[]) => {
+    if (messages.length === 0) return;
+    setLastMessages(messages);
+    setLastMessage(messages[messages.length - 1]);
+  };
 
   const connect = () => {
     try {
       setStatus('connecting');
-      const ws = new WebSocket(url);
+      const wsUrl = new URL(url);
+      if (format === 'binary') {
+        wsUrl.searchParams.set('format', 'binary');
+        wsUrl.searchParams.set('batch', String(batch));
+      }
+      schemaRef.current = null;
+      const ws = new WebSocket(wsUrl.toString());
+      ws.binaryType = 'arraybuffer';
 
       ws.onopen = () => {
         console.log('[WebSocket] Connected');
@@ -39,8 +116,24 @@ export const useWebSocket = ({
 
       ws.onmessage = (event) => {
         try {
-          const data: MetricMessage = JSON.parse(event.data);
-          setLastMessage(data);
+          if (event.data instanceof ArrayBuffer) {
+            if (!schemaRef.current) {
+              throw new Error('Binary frame received before schema');
+            }
+            deliver(decodeBinaryFrames(event.data, schemaRef.current));
+            return;
+          }
+          const data = JSON.parse(event.data);
+          if (data.type === 'schema') {
+            schemaRef.current = data as BinarySchema;
+            return;
+          }
+          if (data.type === 'backfill') {
+            // Recent history sent on connect, so charts do not start empty
+            deliver(data.frames as MetricMessage[]);
+            return;
+          }
+          deliver([data as MetricMessage]);
         } catch (error) {
           console.error('[WebSocket] Failed to parse message:', error);
         }
@@ -86,7 +179,7 @@ export const useWebSocket = ({
         wsRef.current.close();
       }
     };
-  }, [url]);
+  }, [url, format, batch]);
 
-  return { lastMessage, status, reconnectAttempts };
+  return { lastMessage, lastMessages, status, reconnectAttempts };
 };
@@ -8,12 +8,30 @@ export interface MetricMessage {
   diskWriteBps: number; // Disk bytes written per second
 
   // Optional anomaly detection fields
-  score_ecod?: number;
-  score_iforest?: number;
+  score_ecod?: number | null; // null when ECOD is not configured
+  score_iforest?: number | null; // null when IForest is not configured or was gated off
+  scores?: Record<string, number | null>; // every configured detector
   score_ens?: number;
   threshold?: number;
   exceed?: boolean;
   alarm?: boolean;
+  attribution?: Record<string, number>; // feature -> share of score_ens, when enabled
 }
 
+// First message of a ?format=binary stream: names the float32 fields of each record
+export interface BinarySchema {
+  type: 'schema';
+  format: 'binary';
+  version: number;
+  fields: string[];
+  detectors: string[]; // configured detectors; each has a score_<name> field
+  attribution: boolean; // records end with an attr_<feature> field per feature
+  flags: { detection: number; exceed: number; alarm: number };
+  header: string;
+  record: string;
+  batch: number;
+}
+
+export type WireFormat = 'json' | 'binary';
+
 export type ConnectionStatus = 'connecting' | 'connected' | 'disconnected' | 'error';
@@ -0,0 +1,363 @@
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Alert:
+    """An alarm being raised or cleared for one source (the local host, a terminal, an input file)."""
+    source: str
+    ts: str
+    state: str  # "raised" or "cleared"
+    score: float
+    threshold: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    attribution: Dict[str, float] = field(default_factory=dict)  # feature -> share of score, when enabled
+
+    def to_dict(self) -> dict:
+        # JSON has no NaN: scores a detector did not produce become null
+        data = asdict(self)
+        data["scores"] = {k: None if math.isnan(v) else v for k, v in self.scores.items()}
+        return data
+
+class AlarmTransitions:
+    """Turns per-frame SustainAlarm outputs into one Alert per change, per source.
+
+    A sustained alarm stays true for many consecutive frames; only the frame
+    that raises it and the one that clears it become alerts.
+    """
+
+    def __init__(self):
+        self.alarmed: Dict[str, bool] = {}
+
+    def update(
+        self,
+        source: str,
+        ts: str,
+        alarm: bool,
+        score: float,
+        threshold: float,
+        scores: Optional[Dict[str, float]] = None,
+        attribution: Optional[Dict[str, float]] = None,
+    ) -> Optional[Alert]:
+        alarm = bool(alarm)
+        if alarm == self.alarmed.get(source, False):
+            return None
+        self.alarmed[source] = alarm
+        return Alert(source, str(ts), "raised" if alarm else "cleared", float(score), float(threshold),
+                     dict(scores or {}), dict(attribution or {}))
+
+class AlertSink:
+    """Destination for batches of alerts. ``write`` runs on the sink's own worker thread."""
+
+    name = "sink"
+
+    def write(self, alerts: List[Alert]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+class RotatingFileSink(AlertSink):
+    """JSON lines, one write and flush per batch; rolls over to ``path.1`` .. ``path.<backups>`` at ``max_bytes``."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 2**20, backups: int = 5):
+        self.name = f"file:{path}"
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._f = None  # opened on first write, on the worker thread
+
+    def _rotate(self) -> None:
+        self._f.close()
+        self._f = None
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, alerts: List[Alert]) -> None:
+        data = "".join(json.dumps(a.to_dict()) + "\n" for a in alerts)
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+        if 0 < self._f.tell() and self._f.tell() + len(data) > self.max_bytes:
+            self._rotate()
+            self._f = open(self.path, "a", encoding="utf-8")
+        self._f.write(data)
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+class SQLiteSink(AlertSink):
+    """One ``alerts`` table; each batch is a single transaction."""
+
+    def __init__(self, path: str):
+        self.name = f"sqlite:{path}"
+        self.path = path
+        self._conn = None  # opened on first write, on the worker thread
+
+    def _connect(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS alerts "
+            "(source TEXT, ts TEXT, state TEXT, score REAL, threshold REAL, scores TEXT, attribution TEXT)"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(alerts)")]
+        if "attribution" not in columns:  # table created before attribution existed
+            conn.execute("ALTER TABLE alerts ADD COLUMN attribution TEXT")
+        return conn
+
+    def write(self, alerts: List[Alert]) -> None:
+        if self._conn is None:
+            self._conn = self._connect()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(a.source, a.ts, a.state, a.score, a.threshold, json.dumps(a.to_dict()["scores"]), json.dumps(a.attribution))
+                 for a in alerts],
+            )
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class WebhookSink(AlertSink):
+    """POSTs each batch as a JSON array; any non-2xx response or network error fails the write."""
+
+    def __init__(self, url: str, timeout: float = 5.0, headers: Optional[Dict[str, str]] = None):
+        self.name = f"webhook:{url}"
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def write(self, alerts: List[Alert]) -> None:
+        import urllib.request
+        body = json.dumps([a.to_dict() for a in alerts]).encode()
+        req = urllib.request.Request(self.url, data=body, headers=self.headers, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+class MemorySink(AlertSink):
+    """Keeps alerts in a list; a local stand-in for the real sinks in tests and benchmarks.
+
+    ``delay`` seconds per write simulates a slow destination and the first
+    ``fail`` writes raise ConnectionError, to exercise retries.
+    """
+
+    def __init__(self, delay: float = 0.0, fail: int = 0, name: str = "memory"):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.alerts: List[Alert] = []
+        self.batches = 0
+
+    def write(self, alerts: List[Alert]) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail > 0:
+            self.fail -= 1
+            raise ConnectionError("simulated sink failure")
+        self.alerts.extend(alerts)
+        self.batches += 1
+
+SINKS = ("file", "sqlite", "webhook", "memory")
+
+def make_sink(spec: str) -> AlertSink:
+    """Sink for ``kind:target``, e.g. ``file:alerts.jsonl``, ``sqlite:alerts.db``, ``webhook:https://...`` or ``memory:``.
+
+    A bare http(s) URL is a webhook.
+    """
+    if spec.startswith(("http://", "https://")):
+        return WebhookSink(spec)
+    kind, _, target = spec.partition(":")
+    if kind == "file":
+        return RotatingFileSink(target)
+    if kind == "sqlite":
+        return SQLiteSink(target)
+    if kind == "webhook":
+        return WebhookSink(target)
+    if kind == "memory":
+        return MemorySink()
+    raise ValueError(f"unknown alert sink {spec!r}; expected one of {SINKS} as kind:target")
+
+class _SinkWorker:
+    """One sink's bounded queue, delivery task and counters."""
+
+    def __init__(self, sink: AlertSink, queue_size: int, max_batch: int, linger: float,
+                 retries: int, backoff: float, rate_window: float):
+        self.sink = sink
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.linger = linger
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_window = rate_window
+        # Unbounded underneath so the shutdown sentinel always fits; publish enforces queue_size
+        self.queue: asyncio.Queue[Optional[Alert]] = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alerts")
+        self.task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+        self.failures = 0  # failed write attempts, retried or not
+        self.last_error: Optional[str] = None
+        self._rate: Deque[Tuple[float, int]] = deque()  # (monotonic time, alerts) per delivered batch
+        self._started = time.monotonic()
+
+    def put(self, alert: Optional[Alert]) -> None:
+        if alert is not None and self.queue.qsize() >= self.queue_size:
+            # Sink is behind; drop its oldest pending alert
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(alert)
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            if batch[0] is not None and self.linger > 0:
+                # Let a burst of transitions gather into one write
+                await asyncio.sleep(self.linger)
+            while len(batch) < self.max_batch and batch[-1] is not None and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            closing = batch[-1] is None
+            alerts = [a for a in batch if a is not None]
+            if alerts:
+                await self._deliver(alerts)
+            if closing:
+                return
+
+    async def _deliver(self, alerts: List[Alert]) -> None:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            try:
+                await loop.run_in_executor(self.executor, self.sink.write, alerts)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2**attempt)
+                continue
+            self.delivered += len(alerts)
+            self._rate.append((time.monotonic(), len(alerts)))
+            return
+        self.dropped += len(alerts)
+        logger.warning(f"Dropped {len(alerts)} alerts for {self.sink.name} after {self.retries + 1} attempts: {self.last_error}")
+
+    def throughput(self) -> float:
+        """Alerts delivered per second over the last ``rate_window`` seconds."""
+        now = time.monotonic()
+        while self._rate and self._rate[0][0] < now - self.rate_window:
+            self._rate.popleft()
+        span = min(self.rate_window, now - self._started)
+        return sum(n for _, n in self._rate) / span if span > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "alerts_per_sec": self.throughput(),
+            "last_error": self.last_error,
+        }
+
+class AlertDispatcher:
+    """Fans alerts out to sinks through one bounded async queue per sink.
+
+    ``publish`` never waits: it appends to each sink's queue, dropping that
+    sink's oldest pending alert when the queue is full, so a slow or failing
+    sink never delays scoring or the other sinks. Each sink writes batches of
+    up to ``max_batch`` alerts (gathered for ``linger`` seconds) on its own
+    thread, retrying a failed batch ``retries`` times with exponential backoff
+    before counting it as dropped.
+    """
+
+    def __init__(
+        self,
+        sinks: Sequence[AlertSink] = (),
+        queue_size: int = 1024,
+        max_batch: int = 256,
+        linger: float = 0.5,
+        retries: int = 3,
+        backoff: float = 0.5,
+        rate_window: float = 60.0,
+    ):
+        self.workers = [_SinkWorker(s, queue_size, max_batch, linger, retries, backoff, rate_window) for s in sinks]
+        self.published = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.workers)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        for w in self.workers:
+            w.task = asyncio.create_task(w.run())
+
+    def publish(self, alert: Alert) -> None:
+        """Queue an alert for every sink; call on the dispatcher's event loop."""
+        self.published += 1
+        for w in self.workers:
+            w.put(alert)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Deliver what is queued (up to ``timeout`` seconds), then close the sinks."""
+        for w in self.workers:
+            w.put(None)
+        tasks = [w.task for w in self.workers if w.task is not None]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        loop = asyncio.get_running_loop()
+        for w in self.workers:
+            # whatever a timed-out sink still had queued is lost
+            while not w.queue.empty():
+                w.dropped += w.queue.get_nowait() is not None
+            try:
+                await loop.run_in_executor(w.executor, w.sink.close)
+            except Exception as e:
+                logger.error(f"Closing {w.sink.name}: {e}")
+            w.executor.shutdown(wait=False)
+
+    # Synchronous callers (the CLI pipeline) run the dispatcher on its own loop thread
+
+    def start_thread(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, name="alerts-loop", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+
+    def publish_threadsafe(self, alert: Alert) -> None:
+        self._loop.call_soon_threadsafe(self.publish, alert)
+
+    def stop_thread(self, timeout: float = 10.0) -> None:
+        loop = self._loop
+        asyncio.run_coroutine_threadsafe(self.stop(timeout), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-sink queue depth, delivered/dropped counts, failed attempts and rolling alerts/sec."""
+        return {w.sink.name: w.stats() for w in self.workers}
@@ -0,0 +1,323 @@
+
+from __future__ import annotations
+import csv, os
+from bisect import insort
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from rich.console import Console
+
+from .detectors import DETECTORS, RetrainingIForest, ecod_sliding_scores, make_detector
+from .ensemble import combine_attributions, combine_scores, resolve_rule
+from .normalize import normalize_series
+from .pipeline import start_alerts, stop_alerts
+from .stream import input_columns, load_array
+from .utils import SustainAlarm, make_threshold
+
+console = Console()
+
+def iforest_scores(
+    X: np.ndarray,
+    window: int,
+    retrain_every: int = 60,
+    reservoir: int = 600,
+    drift_z: float = 3.0,
+    attribution: bool = False,
+) -> np.ndarray:
+    """IForest scores for rows t >= window-1, replaying the retraining policy.
+
+    Refits happen at the same rows as in the streaming path; rows scored by the
+    same forest are scored in one call. With ``attribution`` returns the
+    (rows, dim) terms of ``score_features`` instead.
+    """
+    iforest = RetrainingIForest(
+        retrain_every=retrain_every,
+        reservoir=reservoir,
+        drift_z=drift_z,
+        background=False,
+    )
+    rows = max(0, len(X) - window + 1)
+    out = np.empty((rows, X.shape[1]) if attribution else rows, dtype=np.float64)
+    start, current = window - 1, None
+    for t in range(len(X)):
+        iforest.update(X[t])
+        if t < window - 1:
+            continue
+        if current is None:
+            iforest.score(X[t:t + 1])  # cold-start fit, as in the streaming path
+            current = iforest.model
+        elif iforest.model is not current:
+            # rows [start, t) belonged to the forest that was just replaced
+            out[start - window + 1:t - window + 1] = (current.score_features if attribution else current.score)(X[start:t])
+            start, current = t, iforest.model
+    if current is not None:
+        out[start - window + 1:] = (current.score_features if attribution else current.score)(X[start:])
+    return out
+
+def rolling_percentile(scores: np.ndarray, maxlen: int, pct: float, chunk_size: int = 4096) -> np.ndarray:
+    """``PercentileThreshold(maxlen).percentile(pct)`` after each update, vectorized."""
+    out = np.empty(len(scores), dtype=np.float64)
+
+    def rank(m: int) -> int:
+        return max(0, min(m - 1, int(round((pct / 100.0) * (m - 1)))))
+
+    # warm-up: the buffer is still filling
+    warm = min(len(scores), maxlen - 1)
+    filling: List[float] = []
+    for i in range(warm):
+        insort(filling, float(scores[i]))
+        out[i] = filling[rank(len(filling))]
+
+    if len(scores) >= maxlen:
+        k = rank(maxlen)
+        views = np.lib.stride_tricks.sliding_window_view(scores, maxlen)
+        for start in range(0, len(views), chunk_size):
+            block = np.partition(views[start:start + chunk_size], k, axis=1)
+            out[maxlen - 1 + start:maxlen - 1 + start + len(block)] = block[:, k]
+    return out
+
+def sustain_alarms(exceed: np.ndarray, n: int, k: int) -> np.ndarray:
+    """``SustainAlarm(n, k).update`` over a whole exceed sequence."""
+    cs = np.concatenate(([0], np.cumsum(exceed, dtype=np.int64)))
+    idx = np.arange(1, len(exceed) + 1)
+    return (cs[idx] - cs[np.maximum(0, idx - n)]) >= k
+
+def sliding_scores(name: str, X: np.ndarray, window: int, per_feature: bool = False, **params) -> np.ndarray:
+    """Scores of detector ``name`` for rows t >= window-1, as the streaming path produces them.
+
+    With ``per_feature``, detectors that split their score by feature return
+    the (rows, dim) terms of ``score_features`` instead.
+    """
+    if name in ("ecod", "copod"):
+        return ecod_sliding_scores(X, window, copod=name == "copod", per_feature=per_feature)
+    if name == "iforest":
+        params.pop("background", None)
+        params["attribution"] = per_feature and params.get("attribution", False)
+        return iforest_scores(X, window, **params)
+    # cheap detectors: replay the stream
+    detector = make_detector(name, window, **params)
+    per_feature = per_feature and getattr(detector, "per_feature", False)
+    rows = max(0, len(X) - window + 1)
+    out = np.empty((rows, X.shape[1]) if per_feature else rows, dtype=np.float64)
+    for t in range(len(X)):
+        detector.update(X[t])
+        if t >= window - 1:
+            out[t - window + 1] = (detector.score_features if per_feature else detector.score)(X[t:t + 1])[0]
+    return out
+
+def detector_scores(
+    X: np.ndarray,
+    window: int,
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    params: Optional[Dict[str, dict]] = None,
+) -> np.ndarray:
+    """(rows t >= window-1, detectors) score matrix; independent of ensemble, threshold and alarm settings."""
+    params = params or {}
+    return np.column_stack([sliding_scores(name, X, window, **dict(params.get(name, {}))) for name in detectors])
+
+def detector_contributions(
+    X: np.ndarray,
+    window: int,
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    params: Optional[Dict[str, dict]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``detector_scores`` plus the (rows, detectors, dim) per-feature terms, NaN for detectors without them."""
+    params = params or {}
+    rows = max(0, len(X) - window + 1)
+    S = np.empty((rows, len(detectors)), dtype=np.float64)
+    C = np.full((rows, len(detectors), X.shape[1]), np.nan)
+    for j, name in enumerate(detectors):
+        out = sliding_scores(name, X, window, per_feature=True, **dict(params.get(name, {})))
+        if out.ndim == 2:
+            C[:, j] = out
+            S[:, j] = out.sum(axis=1)
+        else:
+            S[:, j] = out
+    return S, C
+
+def _transformed(S: np.ndarray, cols: List[int], normalize: str, history: int) -> np.ndarray:
+    if normalize == "none":
+        return S[:, cols]
+    T = np.full((len(S), len(cols)), np.nan)
+    for j, c in enumerate(cols):
+        # a normalizer only sees the scores its detector produced
+        valid = ~np.isnan(S[:, c])
+        T[valid, j] = normalize_series(S[valid, c], normalize, history)
+    return T
+
+def ensemble_series(
+    S: np.ndarray,
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    rule: str = "max",
+    weights: Optional[Sequence[float]] = None,
+    history: int = 120,
+    gate_pct: float = 0.0,
+    normalize: str = "none",
+    normalize_history: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(per-detector scores with gated-off entries NaN, combined score), as ``DetectorEnsemble`` yields them."""
+    rule, normalize = resolve_rule(rule, normalize)
+    S = S.copy()
+    w = None
+    if rule == "weighted":
+        w = np.asarray(weights if weights else [1.0] * len(detectors), dtype=np.float64)
+
+    def transformed(cols: List[int]) -> np.ndarray:
+        return _transformed(S, cols, normalize, normalize_history or history)
+
+    expensive = np.array([DETECTORS[name].expensive for name in detectors])
+    if gate_pct > 0 and expensive.any() and not expensive.all():
+        cheap_cols = np.flatnonzero(~expensive).tolist()
+        cheap = combine_scores(transformed(cheap_cols), rule, None if w is None else w[cheap_cols])
+        gated_off = cheap < rolling_percentile(cheap, maxlen=history, pct=gate_pct)
+        S[np.ix_(gated_off, expensive)] = np.nan
+    return S, combine_scores(transformed(list(range(len(detectors)))), rule, w)
+
+def attribution_series(
+    S: np.ndarray,
+    C: np.ndarray,
+    rule: str = "max",
+    weights: Optional[Sequence[float]] = None,
+    history: int = 120,
+    normalize: str = "none",
+    normalize_history: Optional[int] = None,
+) -> np.ndarray:
+    """(rows, dim) feature shares of the combined score, as ``DetectorEnsemble.contributions``.
+
+    ``S`` is the gated score matrix from ``ensemble_series``; gated-off
+    detectors contribute no terms.
+    """
+    rule, normalize = resolve_rule(rule, normalize)
+    w = None
+    if rule == "weighted":
+        w = np.asarray(weights if weights else [1.0] * S.shape[1], dtype=np.float64)
+    C = np.where(np.isnan(S)[:, :, None], np.nan, C)
+    T = _transformed(S, list(range(S.shape[1])), normalize, normalize_history or history)
+    return combine_attributions(C, T, rule, w)
+
+def alarm_series(
+    s_ens: np.ndarray,
+    baseline: int = 60,
+    threshold_pct: float = 98.0,
+    sustain: int = 6,
+    threshold_mode: str = "exact",
+    ts: Sequence = None,
+    threshold_params: dict = None,
+):
+    """(threshold, exceed, alarm) per scored row, with the pipeline's baseline*2 history and k-of-10 alarm.
+
+    ``ts`` (one per scored row) feeds the seasonal slots of the "adaptive" mode.
+    """
+    if threshold_mode == "adaptive":
+        # the baseline depends on each row's alarm, so the alarm runs in the same loop
+        score_hist = make_threshold(maxlen=baseline*2, mode=threshold_mode, pct=threshold_pct, **(threshold_params or {}))
+        alarm = SustainAlarm(n=10, k=sustain)
+        thr = np.empty_like(s_ens)
+        is_alarm = np.empty(len(s_ens), dtype=bool)
+        for i, s in enumerate(s_ens.tolist()):
+            score_hist.update(s, None if ts is None else ts[i])
+            thr[i] = score_hist.percentile(threshold_pct)
+            is_alarm[i] = alarm.update(s >= thr[i])
+            score_hist.update_alarm(is_alarm[i], s >= thr[i])
+        return thr, s_ens >= thr, is_alarm
+    if threshold_mode == "exact":
+        thr = rolling_percentile(s_ens, maxlen=baseline*2, pct=threshold_pct)
+    else:
+        # sketch updates are inherently sequential
+        score_hist = make_threshold(maxlen=baseline*2, mode=threshold_mode, pct=threshold_pct)
+        thr = np.empty_like(s_ens)
+        for i, s in enumerate(s_ens.tolist()):
+            score_hist.update(s)
+            thr[i] = score_hist.percentile(threshold_pct)
+    exceed = s_ens >= thr
+    return thr, exceed, sustain_alarms(exceed, n=10, k=sustain)
+
+def run_batch(
+    mock_path: str,
+    window: int = 5,
+    baseline: int = 60,
+    threshold_pct: float = 98.0,
+    sustain: int = 6,
+    ensemble: str = "max",
+    iforest_retrain_every: int = 60,
+    iforest_reservoir: int = 600,
+    iforest_drift_z: float = 3.0,
+    threshold_mode: str = "exact",
+    threshold_params: dict = None,
+    features: List[str] = None,
+    out_csv: str = None,
+    chunk_size: int = 65536,
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    detector_params: Dict[str, dict] = None,
+    ensemble_weights: Sequence[float] = None,
+    gate_pct: float = 0.0,
+    normalize: str = "none",
+    normalize_history: int = None,
+    alert_sinks: Sequence[str] = None,
+    attribution: bool = False,
+):
+    """Offline counterpart of ``run_pipeline``: same alerts, computed in vectorized passes.
+
+    Gating only changes which scores are reported here: every detector still
+    scores every row, in one vectorized pass per detector.
+    """
+    ts, X = load_array(mock_path, features=features, chunk_size=chunk_size)
+    if len(X) < window:
+        console.print(f"[yellow]Only {len(X)} rows; need at least window={window}[/]")
+        return
+
+    params = {name: dict(p) for name, p in (detector_params or {}).items()}
+    params.setdefault("iforest", {}).update(
+        retrain_every=iforest_retrain_every,
+        reservoir=iforest_reservoir,
+        drift_z=iforest_drift_z,
+    )
+    if attribution:
+        S, C = detector_contributions(X, window, detectors, params)
+    else:
+        S = detector_scores(X, window, detectors, params)
+    S, s_ens = ensemble_series(
+        S, detectors, ensemble, ensemble_weights, history=baseline*2, gate_pct=gate_pct,
+        normalize=normalize, normalize_history=normalize_history,
+    )
+    feature_names: List[str] = []
+    A = np.empty((len(s_ens), 0))
+    if attribution:
+        feature_names = input_columns(mock_path, features)[1:]
+        A = attribution_series(S, C, ensemble, ensemble_weights, history=baseline*2,
+                               normalize=normalize, normalize_history=normalize_history)
+    thr, exceed, is_alarm = alarm_series(
+        s_ens, baseline, threshold_pct, sustain, threshold_mode, ts=ts[window - 1:], threshold_params=threshold_params,
+    )
+
+    console.print(f"[bold]{len(s_ens)}[/] windows scored, exceed={int(exceed.sum())}  alarm={int(is_alarm.sum())}")
+
+    if out_csv:
+        with open(out_csv, "w", newline="") as wf:
+            writer = csv.writer(wf)
+            writer.writerow(["ts", *(f"score_{name}" for name in detectors), "score_ens","threshold","exceed","alarm",
+                             *(f"attr_{name}" for name in feature_names)])
+            ts_out = ts[window - 1:]
+            for start in range(0, len(s_ens), chunk_size):
+                end = start + chunk_size
+                writer.writerows(
+                    (t, *(f"{s:.6f}" for s in scores), f"{c:.6f}", f"{d:.6f}", int(e), int(f), *(f"{a:.6f}" for a in attr))
+                    for t, scores, c, d, e, f, attr in zip(
+                        ts_out[start:end], S[start:end].tolist(),
+                        s_ens[start:end].tolist(), thr[start:end].tolist(),
+                        exceed[start:end].tolist(), is_alarm[start:end].tolist(), A[start:end].tolist(),
+                    )
+                )
+        console.print(f"[green]Saved alerts to {out_csv}[/]")
+
+    if alert_sinks:
+        from .alerts import AlarmTransitions
+        alerts = start_alerts(alert_sinks)
+        source = os.path.basename(mock_path)
+        transitions = AlarmTransitions()
+        # only rows where the alarm changes become alerts
+        changed = np.flatnonzero(np.diff(is_alarm.astype(np.int8), prepend=0))
+        for i in changed.tolist():
+            scores = dict(zip(detectors, S[i].tolist()))
+            attributed = {} if np.isnan(A[i]).any() else dict(zip(feature_names, A[i].tolist()))
+            alerts.publish_threadsafe(transitions.update(source, ts[window - 1 + i], is_alarm[i], s_ens[i], thr[i], scores, attributed))
+        stop_alerts(alerts)
@@ -0,0 +1,52 @@
+
+from __future__ import annotations
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Detector state is a flat {name: ndarray} dict; nested components use "prefix.name" keys
+State = Dict[str, np.ndarray]
+
+def prefixed(prefix: str, state: State) -> State:
+    return {f"{prefix}.{k}": v for k, v in state.items()}
+
+def unprefixed(prefix: str, state: State) -> State:
+    head = prefix + "."
+    return {k[len(head):]: v for k, v in state.items() if k.startswith(head)}
+
+def save_checkpoint(path: str, state: State) -> None:
+    """Atomically write state as an uncompressed .npz (temp file + rename)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".ckpt-", suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **state)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def load_checkpoint(path: str) -> Optional[State]:
+    """Read a checkpoint written by save_checkpoint; None if absent or unreadable."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {k: data[k] for k in data.files}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+def check_meta(state: State, **expected) -> None:
+    """Raise ValueError if the checkpoint was taken with different parameters."""
+    for name, value in expected.items():
+        if name not in state or state[name].item() != value:
+            got = state[name].item() if name in state else None
+            raise ValueError(f"checkpoint {name}={got} does not match {value}")
@@ -1,19 +1,30 @@
 
 from __future__ import annotations
 import argparse, os
-from .pipeline import run_pipeline, load_config
+from .pipeline import run_pipeline, load_config, threshold_params
+from .batch import run_batch
+from .stream import convert
+from .ensemble import RULES
+from .normalize import NORMALIZERS
 
 def main():
     p = argparse.ArgumentParser(description="ECOD real-time + IForest complement pipeline")
-    p.add_argument("--mock", type=str, required=True, help="CSV path to simulate stream")
+    p.add_argument("--mock", type=str, required=True, help="Input to simulate stream: CSV, Parquet, Arrow/Feather or .npy")
     p.add_argument("--interval", type=float, default=None, help="Seconds between records (0 for batch)")
     p.add_argument("--window", type=int, default=None, help="Sliding window size")
     p.add_argument("--baseline", type=int, default=None, help="Number of windows for baseline stats")
     p.add_argument("--threshold-pct", type=float, default=None, help="Percentile threshold")
     p.add_argument("--sustain", type=int, default=None, help="Alarm sustain k of last 10")
-    p.add_argument("--ensemble", type=str, choices=["max","mean"], default=None, help="Ensemble rule")
+    p.add_argument("--ensemble", type=str, choices=RULES, default=None, help="Ensemble rule")
+    p.add_argument("--normalize", type=str, choices=NORMALIZERS, default=None, help="Per-detector score normalization before the ensemble")
+    p.add_argument("--detectors", type=str, nargs="+", default=None, help="Detectors to combine, e.g. ecod hbos iforest")
     p.add_argument("--config", type=str, default=os.path.join(os.path.dirname(__file__), "config.yaml"), help="YAML config")
     p.add_argument("--out", type=str, default=None, help="Output alerts CSV")
+    p.add_argument("--attribution", action="store_true", default=None, help="Add each feature's share of the ensemble score (attr_* columns)")
+    p.add_argument("--alerts", type=str, nargs="+", default=None, help="Alert sinks for alarm transitions, e.g. file:alerts.jsonl sqlite:alerts.db https://hook")
+    p.add_argument("--checkpoint", type=str, default=None, help="Detector state .npz to warm-start from and save to (streaming mode)")
+    p.add_argument("--batch", action="store_true", help="Score the whole file offline in vectorized passes (ignores --interval)")
+    p.add_argument("--convert", type=str, default=None, help="Convert --mock to this .npy/.parquet/.arrow file (config features only) and exit")
 
     args = p.parse_args()
     cfg = load_config(args.config)
@@ -24,17 +35,43 @@ def main():
             return cfg.get(name.replace("-","_"), default)
         return v
 
-    run_pipeline(
+    if args.convert:
+        rows = convert(args.mock, args.convert, features=cfg.get("features", None))
+        print(f"Wrote {rows} rows to {args.convert}")
+        return
+
+    params = dict(
         mock_path=args.mock,
-        interval=pick("interval", 0.0),
         window=pick("window", 5),
         baseline=pick("baseline", 60),
         threshold_pct=pick("threshold-pct", 98.0),
         sustain=pick("sustain", 6),
         ensemble=pick("ensemble", "max"),
+        iforest_retrain_every=cfg.get("iforest_retrain_every", 60),
+        iforest_reservoir=cfg.get("iforest_reservoir", 600),
+        iforest_drift_z=cfg.get("iforest_drift_z", 3.0),
+        threshold_mode=cfg.get("threshold_mode", "exact"),
+        threshold_params=threshold_params(cfg),
         features=cfg.get("features", None),
-        out_csv=args.out
+        out_csv=args.out,
+        detectors=pick("detectors", ["ecod", "iforest"]),
+        detector_params=cfg.get("detector_params", None),
+        ensemble_weights=cfg.get("ensemble_weights") or None,
+        gate_pct=cfg.get("gate_pct", 0.0),
+        normalize=pick("normalize", "none"),
+        normalize_history=cfg.get("normalize_history") or None,
+        alert_sinks=pick("alerts", []),
+        attribution=pick("attribution", False),
     )
+    if args.batch:
+        run_batch(**params)
+    else:
+        run_pipeline(
+            interval=pick("interval", 0.0),
+            checkpoint=pick("checkpoint", None),
+            checkpoint_every=cfg.get("checkpoint_every", 1000),
+            **params
+        )
 
 if __name__ == "__main__":
     main()
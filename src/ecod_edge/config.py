@@ -2,12 +2,14 @@
 from __future__ import annotations
 import os
 from typing import Literal
-from dotenv import load_dotenv
-
-load_dotenv()
 
 class Config:
-    """Configuration for real-time monitoring and anomaly detection."""
+    """Configuration for real-time monitoring and anomaly detection.
+
+    Values are read from the environment when this module is first imported;
+    the server loads ``.env`` into the environment before that (importing
+    this module alone does not touch ``os.environ``).
+    """
 
     # Sampling interval in seconds
     SAMPLE_INTERVAL: float = float(os.getenv("SAMPLE_INTERVAL", "1.0"))
@@ -16,15 +18,69 @@ class Config:
     WINDOW: int = int(os.getenv("WINDOW", "5"))  # sliding window size for detection
     BASELINE: int = int(os.getenv("BASELINE", "60"))  # baseline buffer size
     THRESHOLD_PCT: float = float(os.getenv("THRESHOLD_PCT", "98.0"))  # percentile threshold
+    THRESHOLD_MODE: Literal["exact", "approx", "adaptive"] = os.getenv("THRESHOLD_MODE", "exact")  # type: ignore  # approx: exact below 20/(1-pct/100) samples
+    THRESHOLD_DRIFT: float = float(os.getenv("THRESHOLD_DRIFT", "50"))  # adaptive: Page-Hinkley drift threshold
+    THRESHOLD_SEASONAL_SLOTS: int = int(os.getenv("THRESHOLD_SEASONAL_SLOTS", "0"))  # adaptive: time-of-day baselines per day (0 = off)
     SUSTAIN: int = int(os.getenv("SUSTAIN", "6"))  # sustained alarm count
-    ENSEMBLE: Literal["max", "mean"] = os.getenv("ENSEMBLE", "max")  # type: ignore
+    ENSEMBLE: Literal["max", "mean", "weighted", "rank", "norm"] = os.getenv("ENSEMBLE", "max")  # type: ignore
+    DETECTORS: list[str] = [s for s in os.getenv("DETECTORS", "ecod,iforest").split(",") if s]  # see detectors.DETECTORS
+    ENSEMBLE_WEIGHTS: list[float] = [float(s) for s in os.getenv("ENSEMBLE_WEIGHTS", "").split(",") if s]  # one per detector, for "weighted"
+    NORMALIZE: Literal["none", "zscore", "rank", "gauss"] = os.getenv("NORMALIZE", "none")  # type: ignore  # per-detector scores before the ensemble
+    NORMALIZE_HISTORY: int = int(os.getenv("NORMALIZE_HISTORY", "0"))  # scores each normalizer remembers (0 = BASELINE)
+    GATE_PCT: float = float(os.getenv("GATE_PCT", "0"))  # >0: score IForest only when the cheap score reaches this rolling percentile
+
+    # IForest retraining policy
+    IFOREST_RETRAIN_EVERY: int = int(os.getenv("IFOREST_RETRAIN_EVERY", "60"))  # samples between refits
+    IFOREST_RESERVOIR: int = int(os.getenv("IFOREST_RESERVOIR", "600"))  # recent samples a refit trains on
+    IFOREST_DRIFT_Z: float = float(os.getenv("IFOREST_DRIFT_Z", "3.0"))  # mean shift (in stds) forcing an early refit; 0 disables
+
+    # Metrics collector: "auto" (/proc when readable), "proc" or "psutil"
+    COLLECTOR_BACKEND: Literal["auto", "proc", "psutil"] = os.getenv("COLLECTOR_BACKEND", "auto")  # type: ignore
+    COLLECTOR_NICS: list[str] = [s for s in os.getenv("COLLECTOR_NICS", "").split(",") if s]  # empty = all NICs
+    COLLECTOR_DISKS: list[str] = [s for s in os.getenv("COLLECTOR_DISKS", "").split(",") if s]  # empty = all disks
+    COLLECTOR_EXTRAS: list[str] = [s for s in os.getenv("COLLECTOR_EXTRAS", "").split(",") if s]  # extra features, e.g. load1,ctx_switches
+
+    # Detection runs on one dedicated worker: "thread" or "process"
+    DETECTION_EXECUTOR: Literal["thread", "process"] = os.getenv("DETECTION_EXECUTOR", "thread")  # type: ignore
+    DETECTION_BACKLOG: int = int(os.getenv("DETECTION_BACKLOG", "4"))  # sampled frames waiting for detection before skipping
+
+    # Detector state checkpoints for warm restarts ("" disables)
+    CHECKPOINT_PATH: str = os.getenv("CHECKPOINT_PATH", "")
+    CHECKPOINT_INTERVAL: float = float(os.getenv("CHECKPOINT_INTERVAL", "60"))  # seconds between snapshots
+
+    # Frame history: raw ring in memory, downsampled rollups on disk ("" = ring only)
+    HISTORY_SIZE: int = int(os.getenv("HISTORY_SIZE", "3600"))  # raw frames kept in memory
+    HISTORY_DIR: str = os.getenv("HISTORY_DIR", "")
+    HISTORY_ROLLUPS: list[int] = [int(s) for s in os.getenv("HISTORY_ROLLUPS", "60,3600").split(",") if s]  # seconds per bucket
+    HISTORY_BACKFILL: float = float(os.getenv("HISTORY_BACKFILL", "300"))  # seconds of history sent on /ws/metrics connect
+
+    # Alert sinks for alarm transitions, e.g. file:alerts.jsonl,sqlite:alerts.db,webhook:https://... (empty = none)
+    ALERT_SINKS: list[str] = [s for s in os.getenv("ALERT_SINKS", "").split(",") if s]
+    ALERT_QUEUE_SIZE: int = int(os.getenv("ALERT_QUEUE_SIZE", "1024"))  # pending alerts per sink before dropping the oldest
+    ALERT_MAX_BATCH: int = int(os.getenv("ALERT_MAX_BATCH", "256"))  # alerts per sink write
+    ALERT_LINGER: float = float(os.getenv("ALERT_LINGER", "0.5"))  # seconds a sink gathers alerts into one write
+    ALERT_RETRIES: int = int(os.getenv("ALERT_RETRIES", "3"))  # retries of a failed write, with exponential backoff
+
+    # Per-stage latency histograms and the Prometheus /metrics endpoint
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
     # Feature flags
     INCLUDE_SCORES: bool = os.getenv("INCLUDE_SCORES", "true").lower() == "true"
+    ATTRIBUTION: bool = os.getenv("ATTRIBUTION", "true").lower() == "true"  # per-feature share of each detection's score
+    IFOREST_ATTRIBUTION: bool = os.getenv("IFOREST_ATTRIBUTION", "false").lower() == "true"  # add IForest's path-based split
 
     # Server settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "256"))  # pending ingest requests before POST gets 503
+    INGEST_MAX_BATCH: int = int(os.getenv("INGEST_MAX_BATCH", "4096"))  # frames scored per ingest worker pass
+    CLIENT_QUEUE_SIZE: int = int(os.getenv("CLIENT_QUEUE_SIZE", "8"))  # frames buffered per WebSocket client before skipping
+
+    # Multi-worker deployment: "standalone" collects, scores and serves in one process; a "hub"
+    # also publishes every frame on HUB_SOCKET, and "worker" processes relay them to their clients
+    SERVER_ROLE: Literal["standalone", "hub", "worker"] = os.getenv("SERVER_ROLE", "standalone")  # type: ignore
+    HUB_SOCKET: str = os.getenv("HUB_SOCKET", "/tmp/ecod-edge-hub.sock")
+    HUB_QUEUE_SIZE: int = int(os.getenv("HUB_QUEUE_SIZE", "256"))  # frames buffered per worker before skipping
     CORS_ORIGINS: list[str] = [
         "http://localhost:5173",
         "http://localhost:5174",
@@ -1,12 +1,27 @@
 
 from __future__ import annotations
 import numpy as np
-from typing import Optional
-from pyod.models.ecod import ECOD
-from sklearn.ensemble import IsolationForest
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .checkpoint import State, check_meta
+
+# |skewness| below this is treated as exactly symmetric
+SKEW_EPS = 1e-10
+
+# pyod and scikit-learn are imported on first use: importing them costs seconds
+# and the streaming detectors need only NumPy.
+
+def _isolation_forest():
+    from sklearn.ensemble import IsolationForest
+    return IsolationForest
 
 class ECODDetector:
     def __init__(self):
+        from pyod.models.ecod import ECOD
         self.model = ECOD()
 
     def fit(self, X: np.ndarray):
@@ -17,21 +32,627 @@ class ECODDetector:
         # higher is more anomalous
         return self.model.decision_function(X)
 
+class StreamingECODDetector:
+    """ECOD over a sliding window, maintained incrementally.
+
+    Keeps one sorted list per feature plus running central moments, so each
+    insert/evict is a binary search and scoring needs only ``bisect`` lookups
+    instead of rebuilding pyod's column ECDFs over the whole window.
+    ``score(x)`` matches ``ECOD().fit(window).decision_function(x)``, and
+    ``score_features(x)`` gives its per-feature terms (the larger of the
+    feature's tail log-probabilities), which sum to the score.
+    """
+
+    per_feature = True
+
+    def __init__(self, window: int):
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self._ring: Optional[np.ndarray] = None  # (window, dim) raw values, for eviction
+        self._head = 0
+        self._count = 0
+        self._sorted: List[List[float]] = []
+        # power sums of (x - shift); shift is re-centred on resync to limit cancellation
+        self._shift: Optional[np.ndarray] = None
+        self._s1 = self._s2 = self._s3 = None
+        self._since_resync = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def fit(self, X: np.ndarray):
+        """Replace the window contents with the last ``window`` rows of X."""
+        self.reset()
+        for row in np.asarray(X, dtype=np.float64)[-self.window:]:
+            self.update(row)
+        return self
+
+    def update(self, x: np.ndarray) -> None:
+        """Push the newest vector, evicting the oldest once the window is full."""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        if self._ring is None:
+            self._ring = np.zeros((self.window, x.shape[0]), dtype=np.float64)
+            self._sorted = [[] for _ in range(x.shape[0])]
+            self._shift = x.copy()
+            self._s1 = np.zeros_like(x)
+            self._s2 = np.zeros_like(x)
+            self._s3 = np.zeros_like(x)
+
+        if self._count == self.window:
+            old = self._ring[self._head]
+            for col, v in zip(self._sorted, old.tolist()):
+                del col[bisect_left(col, v)]
+            d = old - self._shift
+            self._s1 -= d
+            self._s2 -= d * d
+            self._s3 -= d * d * d
+        else:
+            self._count += 1
+
+        self._ring[self._head] = x
+        self._head = (self._head + 1) % self.window
+        for col, v in zip(self._sorted, x.tolist()):
+            insort(col, v)
+        d = x - self._shift
+        self._s1 += d
+        self._s2 += d * d
+        self._s3 += d * d * d
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def state_dict(self) -> State:
+        """Window rows oldest to newest; sorted lists and moments are rebuilt on load."""
+        if self._ring is None:
+            rows = np.zeros((0, 0), dtype=np.float64)
+        else:
+            start = self._head if self._count == self.window else 0
+            rows = self._ring[(np.arange(self._count) + start) % self.window].copy()
+        return {"window": np.array(self.window), "dim": np.array(rows.shape[1]), "rows": rows}
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, window=self.window)
+        if self._ring is not None:
+            check_meta(state, dim=self._ring.shape[1])
+        self.reset()
+        for row in state["rows"]:
+            self.update(row)
+
+    def close(self) -> None:
+        pass
+
+    def _resync(self) -> None:
+        """Recompute the running moments from the ring to cancel accumulated drift."""
+        W = self._ring[:self._count]
+        self._shift = W.mean(axis=0)
+        d = W - self._shift
+        self._s1 = d.sum(axis=0)
+        self._s2 = (d * d).sum(axis=0)
+        self._s3 = (d * d * d).sum(axis=0)
+        self._since_resync = 0
+
+    def _skew_sign(self, X: np.ndarray) -> np.ndarray:
+        """Sign of the (biased) skewness of window + X, as pyod computes it."""
+        n = self._count + X.shape[0]
+        d = X - self._shift
+        s1 = self._s1 + d.sum(axis=0)
+        s2 = self._s2 + (d * d).sum(axis=0)
+        s3 = self._s3 + (d * d * d).sum(axis=0)
+        mean = s1 / n
+        m2 = s2 / n - mean * mean
+        m3 = s3 / n - 3.0 * mean * s2 / n + 2.0 * mean ** 3
+        near_zero = np.abs(m3) <= 1e-6 * np.abs(m2) ** 1.5
+        if near_zero.any():
+            # running sums cannot resolve the sign of a (near-)symmetric column;
+            # fall back to the exact two-pass moments scipy uses
+            Z = np.concatenate((self._ring[:self._count], X), axis=0)[:, near_zero]
+            zc = Z - Z.mean(axis=0)
+            m2[near_zero] = (zc * zc).mean(axis=0)
+            m3[near_zero] = (zc * zc * zc).mean(axis=0)
+        sign = np.sign(m3)
+        # a symmetric column's skew is rounding noise whose sign depends on
+        # summation order; pin it to 0 so every scoring path agrees
+        sign[np.abs(m3) <= SKEW_EPS * np.abs(m2) ** 1.5] = 0.0
+        # scipy yields nan for (near-)constant columns and pyod maps that to 0
+        sign[m2 <= (np.finfo(np.float64).resolution * (mean + self._shift)) ** 2] = 0.0
+        return sign
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        # higher is more anomalous
+        return self.score_features(X).sum(axis=1)
+
+    def score_features(self, X: np.ndarray) -> np.ndarray:
+        """(samples, features) outlyingness terms whose row sums are ``score(X)``."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n = self._count + X.shape[0]
+        le = np.empty_like(X)
+        ge = np.empty_like(X)
+        for j, col in enumerate(self._sorted):
+            q = X[:, j]
+            m = len(col)
+            for i, v in enumerate(q.tolist()):
+                le[i, j] = bisect_right(col, v)
+                ge[i, j] = m - bisect_left(col, v)
+            # pyod scores X concatenated onto the training window
+            le[:, j] += (q[None, :] <= q[:, None]).sum(axis=1)
+            ge[:, j] += (q[None, :] >= q[:, None]).sum(axis=1)
+
+        u_l = -np.log(le / n)
+        u_r = -np.log(ge / n)
+        skewness = self._skew_sign(X)
+        u_skew = u_l * -np.sign(skewness - 1) + u_r * np.sign(skewness + 1)
+        return self._per_feature(u_l, u_r, u_skew)
+
+    @staticmethod
+    def _per_feature(u_l: np.ndarray, u_r: np.ndarray, u_skew: np.ndarray) -> np.ndarray:
+        return np.maximum(np.maximum(u_l, u_r), u_skew)
+
+class StreamingCOPODDetector(StreamingECODDetector):
+    """COPOD over a sliding window: ECOD's tail probabilities, combined as pyod's COPOD does.
+
+    ``score(x)`` matches ``COPOD().fit(window).decision_function(x)``.
+    """
+
+    @staticmethod
+    def _per_feature(u_l: np.ndarray, u_r: np.ndarray, u_skew: np.ndarray) -> np.ndarray:
+        return np.maximum(u_skew, (u_l + u_r) / 2)
+
+def ecod_window_scores(W: np.ndarray, x: np.ndarray, copod: bool = False, per_feature: bool = False) -> np.ndarray:
+    """ECOD (or COPOD) score of each query x[i] against its own window W[i], vectorized.
+
+    W has shape (N, dim, window) and must already contain x[i]; x has shape
+    (N, dim). Row i equals ``StreamingECODDetector`` fed with W[i], scoring x[i];
+    with ``per_feature`` the (N, dim) terms of ``score_features`` instead.
+    """
+    n = W.shape[2] + 1  # pyod scores the query concatenated onto the window
+    le = (W <= x[:, :, None]).sum(axis=2) + 1.0
+    ge = (W >= x[:, :, None]).sum(axis=2) + 1.0
+
+    mean = (W.sum(axis=2) + x) / n
+    zc = W - mean[:, :, None]
+    xc = x - mean
+    m2 = ((zc * zc).sum(axis=2) + xc * xc) / n
+    m3 = ((zc * zc * zc).sum(axis=2) + xc * xc * xc) / n
+    skewness = np.sign(m3)
+    skewness[np.abs(m3) <= SKEW_EPS * np.abs(m2) ** 1.5] = 0.0
+    skewness[m2 <= (np.finfo(np.float64).resolution * mean) ** 2] = 0.0
+
+    u_l = -np.log(le / n)
+    u_r = -np.log(ge / n)
+    u_skew = u_l * -np.sign(skewness - 1) + u_r * np.sign(skewness + 1)
+    terms = (StreamingCOPODDetector if copod else StreamingECODDetector)._per_feature(u_l, u_r, u_skew)
+    return terms if per_feature else terms.sum(axis=1)
+
+def ecod_sliding_scores(
+    X: np.ndarray, window: int, chunk_size: int = 4096, copod: bool = False, per_feature: bool = False,
+) -> np.ndarray:
+    """Score every row t >= window-1 of X against its trailing window, vectorized.
+
+    Equivalent to running ``StreamingECODDetector`` over X and scoring each new
+    row, but over strided views of X (no window copies) in chunks of windows.
+    With ``per_feature`` returns the (rows, dim) terms of ``score_features``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    views = np.lib.stride_tricks.sliding_window_view(X, window, axis=0)  # (N, dim, window)
+    out = np.empty((views.shape[0], X.shape[1]) if per_feature else views.shape[0], dtype=np.float64)
+    for start in range(0, views.shape[0], chunk_size):
+        W = views[start:start + chunk_size]
+        out[start:start + len(W)] = ecod_window_scores(W, W[:, :, -1], copod=copod, per_feature=per_feature)
+    return out
+
 class IForestDetector:
-    def __init__(self, n_estimators: int = 200, contamination: float = 0.02, random_state: int = 42):
-        self.model = IsolationForest(
+    def __init__(self, n_estimators: int = 200, contamination: float = 0.02, random_state: int = 42, n_jobs: int = -1):
+        self.model = _isolation_forest()(
             n_estimators=n_estimators,
             contamination=contamination,
             random_state=random_state,
-            n_jobs=-1
+            n_jobs=n_jobs
         )
         self._fitted = False
+        self._paths: Optional[Tuple[np.ndarray, ...]] = None
 
     def fit(self, X: np.ndarray):
         self.model.fit(X)
         self._fitted = True
+        self._paths = None
         return self
 
     def score(self, X: np.ndarray) -> np.ndarray:
         # sklearn IF returns anomaly score = -score_samples (higher -> more abnormal)
         return -self.model.score_samples(X)
+
+    def score_features(self, X: np.ndarray, chunk_size: int = 1024) -> np.ndarray:
+        """Score split across features by how much of each sample's isolation their splits did.
+
+        A split on a sample's path is credited with log(parent / child) of the
+        training samples it separated from the sample, so the one split that
+        cuts an outlier off from the bulk outweighs the routine splits after it.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        shares = np.concatenate([self._path_shares(X[i:i + chunk_size]) for i in range(0, len(X), chunk_size)])
+        return self.score(X)[:, None] * shares
+
+    def _stack_trees(self) -> Tuple[np.ndarray, ...]:
+        """Every tree's split feature (global index, -1 at leaves), threshold, children and log node size, padded."""
+        trees = [est.tree_ for est in self.model.estimators_]
+        width = max(t.node_count for t in trees)
+        feature = np.full((len(trees), width), -1, dtype=np.int64)
+        threshold = np.zeros((len(trees), width), dtype=np.float64)
+        left = np.zeros((len(trees), width), dtype=np.int64)
+        right = np.zeros((len(trees), width), dtype=np.int64)
+        log_size = np.zeros((len(trees), width), dtype=np.float64)
+        for i, (t, feats) in enumerate(zip(trees, self.model.estimators_features_)):
+            n = t.node_count
+            feature[i, :n] = np.where(t.feature >= 0, np.asarray(feats)[np.maximum(t.feature, 0)], -1)
+            threshold[i, :n] = t.threshold
+            left[i, :n] = t.children_left
+            right[i, :n] = t.children_right
+            log_size[i, :n] = np.log(t.n_node_samples)
+        return feature, threshold, left, right, log_size, max(t.max_depth for t in trees)
+
+    def _path_shares(self, X: np.ndarray) -> np.ndarray:
+        """(samples, features) mean over trees of each feature's share of the path's isolation."""
+        if self._paths is None:
+            self._paths = self._stack_trees()
+        feature, threshold, left, right, log_size, max_depth = self._paths
+        trees = np.arange(feature.shape[0])[None, :]
+        rows = np.arange(len(X))[:, None]
+        X32 = X.astype(np.float32)  # sklearn trees compare float32 inputs
+        node = np.zeros((len(X), feature.shape[0]), dtype=np.int64)
+        gain = np.zeros((len(X), feature.shape[0], X.shape[1]))
+        features = np.arange(X.shape[1])
+        for _ in range(max_depth):
+            f = feature[trees, node]
+            inner = f >= 0
+            if not inner.any():
+                break
+            go_left = X32[rows, np.maximum(f, 0)] <= threshold[trees, node]
+            child = np.where(inner, np.where(go_left, left[trees, node], right[trees, node]), node)
+            gain += (f[..., None] == features) * (log_size[trees, node] - log_size[trees, child])[..., None]
+            node = child
+        total = gain.sum(axis=2, keepdims=True)
+        return (gain / np.where(total > 0, total, 1.0)).mean(axis=1)
+
+class RetrainingIForest:
+    """IForest that keeps scoring with its last fitted forest and refits on a policy.
+
+    A refit over the reservoir of recent samples is due every ``retrain_every``
+    samples, or earlier when an EWMA of the inputs drifts more than ``drift_z``
+    training standard deviations from the data the forest was fitted on. With
+    ``background=True`` refits run on a single worker thread and the previous
+    forest is swapped out only once the new one is ready. ``attribution``
+    enables ``score_features`` (path-based, see ``IForestDetector``).
+    """
+
+    def __init__(
+        self,
+        retrain_every: int = 60,
+        reservoir: int = 600,
+        drift_z: float = 3.0,
+        drift_alpha: float = 0.1,
+        background: bool = True,
+        n_estimators: int = 200,
+        contamination: float = 0.02,
+        random_state: int = 42,
+        n_jobs: int = 1,
+        attribution: bool = False,
+    ):
+        self.per_feature = attribution
+        self.retrain_every = retrain_every
+        self.drift_z = drift_z
+        self.drift_alpha = drift_alpha
+        self.n_estimators = n_estimators
+        self.contamination = contamination
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+        self.reservoir: Deque[np.ndarray] = deque(maxlen=reservoir)
+        self.fits = 0
+
+        self._detector: Optional[IForestDetector] = None
+        self._fit_mean: Optional[np.ndarray] = None
+        self._fit_std: Optional[np.ndarray] = None
+        self._ewma: Optional[np.ndarray] = None
+        self._since_fit = 0
+        self._pending: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="iforest-retrain") if background else None
+        if self._executor is not None:
+            # import scikit-learn while the first window fills, not on the first score
+            self._executor.submit(_isolation_forest)
+
+    @property
+    def fitted(self) -> bool:
+        return self._detector is not None
+
+    @property
+    def model(self) -> Optional[IForestDetector]:
+        """The forest currently used for scoring."""
+        return self._detector
+
+    def update(self, x: np.ndarray) -> None:
+        """Add a sample to the reservoir and start a refit if the policy says so."""
+        x = np.array(x, dtype=np.float64).ravel()  # own copy: callers may pass ring views
+        self.reservoir.append(x)
+        self._since_fit += 1
+        if self._ewma is None:
+            self._ewma = x.copy()
+        else:
+            self._ewma += self.drift_alpha * (x - self._ewma)
+
+        self._collect()
+        if self._detector is None or self._pending is not None:
+            return
+        if self._since_fit >= self.retrain_every or self._drifted():
+            self._retrain()
+
+    def _drifted(self) -> bool:
+        if self.drift_z <= 0 or self._fit_mean is None:
+            return False
+        z = np.abs(self._ewma - self._fit_mean) / self._fit_std
+        return bool(np.max(z) > self.drift_z)
+
+    def _fit(self, X: np.ndarray) -> Tuple[IForestDetector, np.ndarray, np.ndarray]:
+        detector = IForestDetector(
+            n_estimators=self.n_estimators,
+            contamination=self.contamination,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+        ).fit(X)
+        return detector, X.mean(axis=0), np.maximum(X.std(axis=0), 1e-12)
+
+    def _install(self, fitted: Tuple[IForestDetector, np.ndarray, np.ndarray]) -> None:
+        self._detector, self._fit_mean, self._fit_std = fitted
+        self.fits += 1
+
+    def _retrain(self) -> None:
+        X = np.array(self.reservoir)
+        self._since_fit = 0
+        if self._executor is None:
+            self._install(self._fit(X))
+        else:
+            self._pending = self._executor.submit(self._fit, X)
+
+    def _collect(self) -> None:
+        """Swap in a finished background refit, if any."""
+        if self._pending is not None and self._pending.done():
+            pending, self._pending = self._pending, None
+            self._install(pending.result())
+
+    def state_dict(self) -> State:
+        """Reservoir and policy state; the forest itself is refit from the reservoir."""
+        state: State = {
+            "reservoir": np.array(self.reservoir, dtype=np.float64),
+            "since_fit": np.array(self._since_fit),
+            "fitted": np.array(self._detector is not None),
+        }
+        if self._ewma is not None:
+            state["ewma"] = self._ewma.copy()
+        return state
+
+    def load_state(self, state: State) -> None:
+        if "reservoir" not in state:
+            raise ValueError("checkpoint has no IForest state (taken with another detector set)")
+        self.reservoir.clear()
+        self.reservoir.extend(np.array(row) for row in state["reservoir"])
+        self._since_fit = int(state["since_fit"])
+        self._ewma = state["ewma"].copy() if "ewma" in state else None
+        self._detector = None
+        if bool(state["fitted"]) and self.reservoir:
+            # no pickled forest: refit now so the next score does not have to
+            self._since_fit = 0
+            self._install(self._fit(np.array(self.reservoir)))
+
+    def _scorer(self) -> IForestDetector:
+        self._collect()
+        if self._detector is None:
+            # cold start: nothing to fall back on, so fit synchronously once
+            self._since_fit = 0
+            self._install(self._fit(np.array(self.reservoir)))
+        return self._detector
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        # higher is more anomalous
+        return self._scorer().score(X)
+
+    def score_features(self, X: np.ndarray) -> np.ndarray:
+        return self._scorer().score_features(X)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+class _HistoryDetector:
+    """Base for cheap detectors scoring against a ring of the last ``history`` samples.
+
+    Subclasses implement ``score`` over ``self.rows``; the statistics they use
+    do not depend on row order.
+    """
+
+    def __init__(self, history: int = 120):
+        self.history = history
+        self.reset()
+
+    def reset(self) -> None:
+        self._ring: Optional[np.ndarray] = None
+        self._head = 0
+        self._count = 0
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._ring[:self._count]
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64).ravel()
+        if self._ring is None:
+            self._ring = np.empty((self.history, x.shape[0]), dtype=np.float64)
+        self._ring[self._head] = x
+        self._head = (self._head + 1) % self.history
+        self._count = min(self._count + 1, self.history)
+
+    def state_dict(self) -> State:
+        if self._ring is None:
+            rows = np.zeros((0, 0), dtype=np.float64)
+        else:
+            start = self._head if self._count == self.history else 0
+            rows = self._ring[(np.arange(self._count) + start) % self.history].copy()
+        return {"history": np.array(self.history), "rows": rows}
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, history=self.history)
+        self.reset()
+        for row in state["rows"]:
+            self.update(row)
+
+    def close(self) -> None:
+        pass
+
+def histogram_scores(R: np.ndarray, Q: np.ndarray, bins: int = 10, alpha: float = 0.1) -> np.ndarray:
+    """Per-column rarity of queries Q (m, c) under equal-width histograms of R (n, c).
+
+    Bin heights are normalised so the densest bin is 1 and the score is
+    ``-log((height + alpha) / (1 + alpha))``: 0 in the densest bin, at most
+    ``-log(alpha / (1 + alpha))`` outside the reference range.
+    """
+    lo, hi = R.min(axis=0), R.max(axis=0)
+    width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+    cols = np.arange(R.shape[1]) * bins
+    ref = np.minimum(((R - lo) / width).astype(np.int64), bins - 1)
+    counts = np.bincount((ref + cols).ravel(), minlength=bins * R.shape[1]).astype(np.float64)
+    heights = counts.reshape(R.shape[1], bins)
+    heights /= heights.max(axis=1, keepdims=True)
+    inside = (Q >= lo) & (Q <= hi)
+    idx = np.clip(((Q - lo) / width).astype(np.int64), 0, bins - 1)
+    h = np.where(inside, heights.ravel()[idx + cols], 0.0)
+    return -np.log((h + alpha) / (1.0 + alpha))
+
+class HBOSDetector(_HistoryDetector):
+    """Histogram-based outlier score: summed per-feature rarity against recent samples."""
+
+    per_feature = True
+
+    def __init__(self, history: int = 120, bins: int = 10, alpha: float = 0.1):
+        super().__init__(history)
+        self.bins = bins
+        self.alpha = alpha
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        # higher is more anomalous
+        return self.score_features(X).sum(axis=1)
+
+    def score_features(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return histogram_scores(self.rows, X, self.bins, self.alpha)
+
+class RobustZDetector(_HistoryDetector):
+    """Summed per-feature |z| against recent samples: mean/std, or median/MAD with ``robust``."""
+
+    per_feature = True
+
+    def __init__(self, history: int = 120, robust: bool = False):
+        super().__init__(history)
+        self.robust = robust
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        # higher is more anomalous
+        return self.score_features(X).sum(axis=1)
+
+    def score_features(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        R = self.rows
+        if self.robust:
+            center = np.median(R, axis=0)
+            scale = 1.4826 * np.median(np.abs(R - center), axis=0)
+        else:
+            center = R.mean(axis=0)
+            scale = R.std(axis=0)
+        # a flat feature would give an infinite z for any change; keep it large but finite
+        scale = np.maximum(scale, 1e-9 * (np.abs(center) + 1.0))
+        return np.abs(X - center) / scale
+
+class LODADetector(_HistoryDetector):
+    """LODA: mean histogram rarity over sparse random 1-D projections of recent samples.
+
+    Each of ``projections`` directions has ceil(sqrt(dim)) non-zero Gaussian
+    weights, drawn once from ``seed`` when the feature dimension is first seen.
+    """
+
+    def __init__(self, history: int = 120, projections: int = 20, bins: int = 10, alpha: float = 0.1, seed: int = 42):
+        super().__init__(history)
+        self.projections = projections
+        self.bins = bins
+        self.alpha = alpha
+        self.seed = seed
+        self._W: Optional[np.ndarray] = None
+
+    def _weights(self, dim: int) -> np.ndarray:
+        if self._W is None or self._W.shape[0] != dim:
+            rng = np.random.default_rng(self.seed)
+            W = rng.standard_normal((dim, self.projections))
+            nnz = int(np.ceil(np.sqrt(dim)))
+            for j in range(self.projections):
+                W[rng.permutation(dim)[nnz:], j] = 0.0
+            self._W = W
+        return self._W
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        # higher is more anomalous
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        W = self._weights(X.shape[1])
+        return histogram_scores(self.rows @ W, X @ W, self.bins, self.alpha).mean(axis=1)
+
+@dataclass(frozen=True)
+class DetectorSpec:
+    factory: Callable[..., object]
+    expensive: bool = False  # may be gated behind the cheap detectors
+
+# Streaming detectors by name. Each provides update(x), score(X) (higher is more
+# anomalous), state_dict(), load_state(state) and close(). Detectors whose
+# ``per_feature`` is true also provide score_features(X): (samples, features)
+# terms summing to score(X), used for per-feature attribution.
+DETECTORS: Dict[str, DetectorSpec] = {}
+
+def register_detector(name: str, expensive: bool = False):
+    """Decorator registering ``factory(window, **params)`` as detector ``name``."""
+    def wrap(factory):
+        DETECTORS[name] = DetectorSpec(factory, expensive)
+        return factory
+    return wrap
+
+def make_detector(name: str, window: int, **params):
+    spec = DETECTORS.get(name)
+    if spec is None:
+        raise ValueError(f"unknown detector {name!r}; available: {sorted(DETECTORS)}")
+    return spec.factory(window, **params)
+
+@register_detector("ecod")
+def _ecod(window: int) -> StreamingECODDetector:
+    return StreamingECODDetector(window=window)
+
+@register_detector("copod")
+def _copod(window: int) -> StreamingCOPODDetector:
+    return StreamingCOPODDetector(window=window)
+
+@register_detector("hbos")
+def _hbos(window: int, history: int = 120, bins: int = 10, alpha: float = 0.1) -> HBOSDetector:
+    return HBOSDetector(history=history, bins=bins, alpha=alpha)
+
+@register_detector("zscore")
+def _zscore(window: int, history: int = 120) -> RobustZDetector:
+    return RobustZDetector(history=history)
+
+@register_detector("mad")
+def _mad(window: int, history: int = 120) -> RobustZDetector:
+    return RobustZDetector(history=history, robust=True)
+
+@register_detector("loda")
+def _loda(window: int, history: int = 120, projections: int = 20, bins: int = 10, seed: int = 42) -> LODADetector:
+    return LODADetector(history=history, projections=projections, bins=bins, seed=seed)
+
+@register_detector("iforest", expensive=True)
+def _iforest(window: int, retrain_every: int = 60, reservoir: int = 600, drift_z: float = 3.0,
+             background: bool = True, attribution: bool = False) -> RetrainingIForest:
+    return RetrainingIForest(retrain_every=retrain_every, reservoir=reservoir, drift_z=drift_z,
+                             background=background, attribution=attribution)
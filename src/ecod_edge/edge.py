@@ -0,0 +1,106 @@
+
+from __future__ import annotations
+import argparse, csv, sys
+from typing import List, Optional, Sequence
+
+from .ensemble import RULES, DetectorEnsemble
+from .normalize import NORMALIZERS
+from .stream import input_columns, iter_rows, windowed_vectors
+from .utils import THRESHOLD_MODES, SustainAlarm, make_threshold
+
+# Lean edge entry point (pos-ecod-edge): imports nothing beyond NumPy and the
+# standard library, so it starts in a fraction of pos-ecod's time and runs on
+# boxes with only NumPy installed. Output has pos-ecod --out's CSV layout and
+# values for the same detectors and parameters.
+
+def run_edge(
+    mock_path: str,
+    interval: float = 0.0,
+    window: int = 5,
+    baseline: int = 60,
+    threshold_pct: float = 98.0,
+    sustain: int = 6,
+    ensemble: str = "max",
+    threshold_mode: str = "exact",
+    threshold_params: Optional[dict] = None,
+    features: Optional[List[str]] = None,
+    detectors: Sequence[str] = ("ecod",),
+    normalize: str = "none",
+    attribution: bool = False,
+    out_csv: Optional[str] = None,
+) -> int:
+    """Score a stream as ``run_pipeline`` does, writing CSV rows; returns the number of alarmed rows."""
+    scorer = DetectorEnsemble(window, detectors=detectors, rule=ensemble, history=baseline*2, normalize=normalize,
+                              attribution=attribution)
+    feature_names = input_columns(mock_path, features)[1:] if attribution else []
+    score_hist = make_threshold(maxlen=baseline*2, mode=threshold_mode, pct=threshold_pct, **(threshold_params or {}))
+    alarm = SustainAlarm(n=10, k=sustain)
+
+    f = open(out_csv, "w", newline="") if out_csv else sys.stdout
+    writer = csv.writer(f)
+    writer.writerow(["ts", *(f"score_{name}" for name in scorer.names), "score_ens", "threshold", "exceed", "alarm",
+                     *(f"attr_{name}" for name in feature_names)])
+    alarms = 0
+    try:
+        rows = iter_rows(mock_path, interval=interval, features=features)
+        for i, (ts, Xw) in enumerate(windowed_vectors(rows, window=window), start=1):
+            for row in (Xw if i == 1 else Xw[-1:]):
+                scorer.update(row)
+            scores, s_ens, _ = scorer.score(Xw[-1])
+            score_hist.update(s_ens, ts)
+            thr = score_hist.percentile(threshold_pct)
+            exceed = s_ens >= thr
+            is_alarm = alarm.update(exceed)
+            score_hist.update_alarm(is_alarm, exceed)
+            alarms += is_alarm
+            shares = scorer.contributions if attribution else None
+            attr_cols = [f"{a:.6f}" for a in (shares.tolist() if shares is not None else [float("nan")] * len(feature_names))]
+            writer.writerow([ts, *(f"{s:.6f}" for s in scores.tolist()), f"{s_ens:.6f}", f"{thr:.6f}", int(exceed), int(is_alarm), *attr_cols])
+            if interval > 0:
+                f.flush()
+    finally:
+        scorer.close()
+        if out_csv:
+            f.close()
+    return alarms
+
+def main():
+    p = argparse.ArgumentParser(description="ECOD streaming detection on NumPy alone (edge)")
+    p.add_argument("--mock", type=str, required=True, help="Input to simulate stream: CSV or .npy (Parquet/Arrow need pyarrow)")
+    p.add_argument("--interval", type=float, default=0.0, help="Seconds between records (0 for batch)")
+    p.add_argument("--window", type=int, default=5, help="Sliding window size")
+    p.add_argument("--baseline", type=int, default=60, help="Number of windows for baseline stats")
+    p.add_argument("--threshold-pct", type=float, default=98.0, help="Percentile threshold")
+    p.add_argument("--threshold-mode", type=str, choices=THRESHOLD_MODES, default="exact")
+    p.add_argument("--threshold-drift", type=float, default=50.0, help="Page-Hinkley drift threshold (adaptive mode)")
+    p.add_argument("--seasonal-slots", type=int, default=0, help="Time-of-day baselines per day (adaptive mode, 0 = off)")
+    p.add_argument("--sustain", type=int, default=6, help="Alarm sustain k of last 10")
+    p.add_argument("--ensemble", type=str, choices=RULES, default="max", help="Ensemble rule")
+    p.add_argument("--normalize", type=str, choices=NORMALIZERS, default="none", help="Per-detector score normalization")
+    p.add_argument("--detectors", type=str, nargs="+", default=["ecod"], help="Streaming detectors, e.g. ecod hbos loda")
+    p.add_argument("--features", type=str, nargs="+", default=None, help="Columns to read (all after ts if omitted)")
+    p.add_argument("--attribution", action="store_true", help="Add each feature's share of the ensemble score (attr_* columns)")
+    p.add_argument("--out", type=str, default=None, help="Output CSV (default: stdout)")
+    args = p.parse_args()
+
+    alarms = run_edge(
+        args.mock,
+        interval=args.interval,
+        window=args.window,
+        baseline=args.baseline,
+        threshold_pct=args.threshold_pct,
+        sustain=args.sustain,
+        ensemble=args.ensemble,
+        threshold_mode=args.threshold_mode,
+        threshold_params={"drift_threshold": args.threshold_drift, "seasonal_slots": args.seasonal_slots},
+        features=args.features,
+        detectors=args.detectors,
+        normalize=args.normalize,
+        attribution=args.attribution,
+        out_csv=args.out,
+    )
+    if args.out:
+        print(f"{alarms} alarmed rows; saved to {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+
+from __future__ import annotations
+import math
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+from .checkpoint import State, prefixed, unprefixed
+from .detectors import DETECTORS, make_detector
+from .normalize import NORMALIZERS, make_normalizer
+from .telemetry import StageTimings
+from .utils import PercentileThreshold
+
+# How per-detector scores become one. "rank" and "norm" are shorthands for
+# "mean" over rank- or z-normalized scores.
+RULES = ("max", "mean", "weighted", "rank", "norm")
+_SHORTHANDS = {"rank": "rank", "norm": "zscore"}
+
+def resolve_rule(rule: str, normalize: str = "none") -> Tuple[str, str]:
+    """(combination rule, normalization) with the "rank"/"norm" shorthands expanded."""
+    if rule not in RULES:
+        raise ValueError(f"unknown ensemble rule {rule!r}; expected one of {RULES}")
+    if normalize not in NORMALIZERS:
+        raise ValueError(f"unknown score normalization {normalize!r}; expected one of {NORMALIZERS}")
+    if rule in _SHORTHANDS:
+        return "mean", _SHORTHANDS[rule]
+    return rule, normalize
+
+def combine_scores(S: np.ndarray, rule: str = "max", weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Row-wise combination of a (samples, detectors) score matrix; NaN (gated-off) entries are skipped."""
+    S = np.atleast_2d(S)
+    if rule == "max":
+        return np.nanmax(S, axis=1)
+    if rule == "weighted":
+        valid = ~np.isnan(S)
+        return np.nansum(S * weights, axis=1) / (valid * weights).sum(axis=1)
+    return np.nanmean(S, axis=1)
+
+def combine_attributions(
+    C: np.ndarray, S: np.ndarray, rule: str = "max", weights: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Per-feature shares of the combined score, from (samples, detectors, features) terms C.
+
+    Each detector's terms are turned into shares of its own score, then
+    averaged as ``rule`` combines the (samples, detectors) scores S: the top
+    detector for "max", weighted for "weighted", equally otherwise. Detectors
+    without terms (NaN in C) are left out; rows with none are NaN.
+    """
+    total = C.sum(axis=2, keepdims=True)
+    shares = C / np.where(total > 0, total, np.nan)
+    have = ~np.isnan(shares).any(axis=2)
+    w = np.broadcast_to(weights if weights is not None else 1.0, S.shape).astype(np.float64)
+    if rule == "max":
+        top = have & (S == np.nanmax(np.where(np.isnan(S), -np.inf, S), axis=1, keepdims=True))
+        w = np.where(top.any(axis=1, keepdims=True), w * top, w)
+    w = w * have
+    norm = w.sum(axis=1, keepdims=True)
+    return np.nansum(shares * w[:, :, None], axis=1) / np.where(norm > 0, norm, np.nan)
+
+class DetectorEnsemble:
+    """The configured detectors (see ``detectors.DETECTORS``), scored together each tick.
+
+    Each detector's score can be normalized against its own recent scores
+    (``normalize``: rolling z-score, rolling rank or Gaussian-CDF calibration
+    over ``normalize_history`` samples) so the rule combines comparable
+    values; the raw scores are still reported per detector.
+
+    Every detector sees every sample. With ``gate_pct`` > 0, expensive
+    detectors (IForest) are only scored when the cheap detectors' combined
+    score reaches that rolling percentile of its own recent values; on other
+    ticks their score is NaN and the rule combines the cheap scores alone.
+    State keys are prefixed by detector name, so the default ECOD + IForest
+    set reads checkpoints written before detectors were pluggable.
+
+    With ``attribution``, detectors that split their score by feature
+    (``per_feature``) are scored through ``score_features`` in the same pass,
+    and ``contributions`` holds each feature's share of the last combined
+    score (see ``combine_attributions``), or None if no detector had terms.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        detectors: Sequence[str] = ("ecod", "iforest"),
+        rule: str = "max",
+        weights: Optional[Sequence[float]] = None,
+        history: int = 120,
+        gate_pct: float = 0.0,
+        params: Optional[Dict[str, dict]] = None,
+        timings: Optional[StageTimings] = None,
+        normalize: str = "none",
+        normalize_history: Optional[int] = None,
+        attribution: bool = False,
+    ):
+        rule, normalize = resolve_rule(rule, normalize)
+        self.names = tuple(detectors)
+        if not self.names:
+            raise ValueError("at least one detector is required")
+        params = params or {}
+        self.detectors = {name: make_detector(name, window, **params.get(name, {})) for name in self.names}
+        self.rule = rule
+        self.weights = None
+        if rule == "weighted":
+            self.weights = np.asarray(weights if weights else [1.0] * len(self.names), dtype=np.float64)
+            if len(self.weights) != len(self.names):
+                raise ValueError(f"{len(self.weights)} ensemble weights for {len(self.names)} detectors")
+        self.normalize = normalize
+        self.transforms = None
+        if normalize != "none":
+            self.transforms = [make_normalizer(normalize, normalize_history or history) for _ in self.names]
+
+        expensive = [DETECTORS[name].expensive for name in self.names]
+        self._cheap = [i for i, e in enumerate(expensive) if not e]
+        self._expensive = [i for i, e in enumerate(expensive) if e]
+        self.gate_pct = gate_pct
+        self.gate: Optional[PercentileThreshold] = None
+        if gate_pct > 0 and self._expensive:
+            if not self._cheap:
+                raise ValueError("gating needs at least one cheap detector")
+            self.gate = PercentileThreshold(maxlen=history)
+        self.gated = 0  # ticks on which expensive detectors were skipped
+        self.timings = timings or StageTimings(enabled=False)
+        self.attribution = attribution
+        self.contributions: Optional[np.ndarray] = None
+
+    def update(self, x: np.ndarray, t: float = 0.0) -> float:
+        """Push a sample into every detector; returns the timing clock."""
+        for name, detector in self.detectors.items():
+            detector.update(x)
+            t = self.timings.lap(f"{name}_fit", t)
+        return t
+
+    def _score(self, i: int, latest: np.ndarray, raw: np.ndarray, scores: np.ndarray,
+               terms: Optional[np.ndarray], t: float) -> float:
+        name = self.names[i]
+        detector = self.detectors[name]
+        if terms is not None and getattr(detector, "per_feature", False):
+            terms[i] = detector.score_features(latest)[0]
+            raw[i] = float(terms[i].sum())
+        else:
+            raw[i] = float(detector.score(latest)[0])
+        scores[i] = raw[i] if self.transforms is None else self.transforms[i].transform(raw[i])
+        return self.timings.lap(f"{name}_score", t)
+
+    def score(self, x: np.ndarray, t: float = 0.0) -> Tuple[np.ndarray, float, float]:
+        """(per-detector scores, NaN where gated off; combined score; timing clock) for one sample."""
+        latest = np.asarray(x, dtype=np.float64).reshape(1, -1)
+        raw = np.full(len(self.names), math.nan)
+        scores = raw.copy()
+        terms = np.full((len(self.names), latest.shape[1]), math.nan) if self.attribution else None
+        for i in self._cheap:
+            t = self._score(i, latest, raw, scores, terms, t)
+        run_expensive = True
+        if self.gate is not None:
+            cheap = float(combine_scores(scores, self.rule, self.weights)[0])
+            self.gate.update(cheap)
+            run_expensive = cheap >= self.gate.percentile(self.gate_pct)
+        if run_expensive:
+            for i in self._expensive:
+                t = self._score(i, latest, raw, scores, terms, t)
+        else:
+            self.gated += 1
+        score_ens = float(combine_scores(scores, self.rule, self.weights)[0])
+        if terms is not None:
+            shares = combine_attributions(terms[None], scores[None], self.rule, self.weights)[0]
+            self.contributions = None if np.isnan(shares).any() else shares
+        return raw, score_ens, self.timings.lap("ensemble", t)
+
+    def state_dict(self) -> State:
+        state: State = {}
+        for name, detector in self.detectors.items():
+            state.update(prefixed(name, detector.state_dict()))
+        for name, transform in zip(self.names, self.transforms or ()):
+            state.update(prefixed(f"normalize.{name}", transform.state_dict()))
+        if self.gate is not None:
+            state.update(prefixed("gate", self.gate.state_dict()))
+        return state
+
+    def load_state(self, state: State) -> None:
+        """Restore every detector; expensive ones last, since IForest refits on load."""
+        for i in self._cheap + self._expensive:
+            name = self.names[i]
+            self.detectors[name].load_state(unprefixed(name, state))
+        for name, transform in zip(self.names, self.transforms or ()):
+            transform.load_state(unprefixed(f"normalize.{name}", state))
+        if self.gate is not None:
+            self.gate.load_state(unprefixed("gate", state))
+
+    def close(self) -> None:
+        for detector in self.detectors.values():
+            detector.close()
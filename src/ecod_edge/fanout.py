@@ -0,0 +1,128 @@
+
+from __future__ import annotations
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class FramePublisher:
+    """Publishes encoded frames to subscriber processes over a Unix socket.
+
+    A frame is one newline-terminated line: the JSON text a ``/ws/metrics``
+    client receives, serialized once here. Like ``ConnectionManager``, each
+    subscriber has a bounded queue and a slow one has its oldest frame
+    skipped, so no subscriber can stall the detection loop. A new subscriber
+    is first sent the lines from ``backfill`` so its history starts warm.
+    """
+
+    def __init__(self, path: str, queue_size: int = 256, backfill: Optional[Callable[[], List[str]]] = None):
+        self.path = path
+        self.queue_size = queue_size
+        self.backfill = backfill
+        self.subscribers: Dict[asyncio.StreamWriter, asyncio.Queue] = {}
+        self.published = 0
+        self.dropped_frames = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by a hub that did not shut down cleanly
+        self._server = await asyncio.start_unix_server(self._serve, self.path)
+        logger.info(f"Publishing frames on {self.path}")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self.subscribers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[writer] = queue
+        logger.info(f"Subscriber connected. Total subscribers: {len(self.subscribers)}")
+        try:
+            for line in self.backfill() if self.backfill else ():
+                writer.write(line.encode() + b"\n")
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+            logger.info(f"Subscriber disconnected. Total subscribers: {len(self.subscribers)}")
+
+    def publish(self, line: str) -> None:
+        """Queue one frame for every subscriber."""
+        data = line.encode() + b"\n"
+        self.published += 1
+        for queue in self.subscribers.values():
+            if queue.full():
+                queue.get_nowait()
+                self.dropped_frames += 1
+            queue.put_nowait(data)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped_frames": self.dropped_frames,
+            "queue_depth_max": max((q.qsize() for q in self.subscribers.values()), default=0),
+        }
+
+class FrameSubscriber:
+    """Feeds a FramePublisher's lines to ``on_frame``, reconnecting with backoff while the hub is away."""
+
+    def __init__(
+        self,
+        path: str,
+        on_frame: Callable[[str], Awaitable[None]],
+        retry: float = 0.5,
+        max_retry: float = 5.0,
+    ):
+        self.path = path
+        self.on_frame = on_frame
+        self.retry = retry
+        self.max_retry = max_retry
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    async def run(self) -> None:
+        delay = self.retry
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=1 << 20)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry)
+                continue
+            self.connected = True
+            delay = self.retry
+            logger.info(f"Subscribed to frames on {self.path}")
+            try:
+                while line := await reader.readline():
+                    self.received += 1
+                    try:
+                        await self.on_frame(line.decode())
+                    except Exception as e:
+                        logger.error(f"Relay error: {e}")
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"Frame subscription lost: {e}")
+            finally:
+                self.connected = False
+                writer.close()
+            self.reconnects += 1
+            logger.warning(f"Hub at {self.path} went away; reconnecting")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "received": self.received, "reconnects": self.reconnects}
@@ -0,0 +1,176 @@
+
+from __future__ import annotations
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from ecod_edge.checkpoint import State, check_meta
+from ecod_edge.detectors import ecod_window_scores
+
+@dataclass
+class TerminalDetection:
+    """ECOD detection result for one terminal in one tick."""
+    terminal_id: str
+    ts: str
+    score_ecod: float
+    threshold: float
+    exceed: bool
+    alarm: bool
+
+class TerminalRegistry:
+    """Per-terminal ECOD state for many POS terminals, in array-backed storage.
+
+    Windows, score histories and sustain histories live in preallocated
+    arrays indexed by terminal row (grown by doubling), so one ``tick`` scores
+    every due terminal with a single vectorized ECOD pass over a
+    (terminals, window, features) array. Per terminal the results match
+    ``StreamingECODDetector`` + ``PercentileThreshold(baseline)`` +
+    ``SustainAlarm(n=sustain, k=sustain)``, as in ``RealtimeDetector``.
+
+    Only the ECOD edge detector runs here: a forest per terminal does not fit
+    the single-core budget at hundreds of terminals.
+    """
+
+    # per-terminal arrays, indexed by terminal row
+    _ARRAYS = (
+        "_windows", "_latest", "_win_pos", "_win_count", "_due",
+        "_hist", "_hist_pos", "_hist_count", "_exceed", "_exceed_pos",
+    )
+
+    def __init__(
+        self,
+        dim: int,
+        window: int = 5,
+        baseline: int = 60,
+        threshold_pct: float = 98.0,
+        sustain: int = 6,
+        capacity: int = 64,
+    ):
+        self.dim = dim
+        self.window = window
+        self.baseline = baseline
+        self.threshold_pct = threshold_pct
+        self.sustain = sustain
+
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._last_ts: List[str] = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        self._windows = np.zeros((capacity, self.window, self.dim), dtype=np.float64)
+        self._latest = np.zeros((capacity, self.dim), dtype=np.float64)
+        self._win_pos = np.zeros(capacity, dtype=np.int64)
+        self._win_count = np.zeros(capacity, dtype=np.int64)
+        self._due = np.zeros(capacity, dtype=bool)
+        # unused history slots hold +inf so they sort after every real score
+        self._hist = np.full((capacity, self.baseline), np.inf, dtype=np.float64)
+        self._hist_pos = np.zeros(capacity, dtype=np.int64)
+        self._hist_count = np.zeros(capacity, dtype=np.int64)
+        self._exceed = np.zeros((capacity, self.sustain), dtype=bool)
+        self._exceed_pos = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self) -> None:
+        old = {name: getattr(self, name) for name in self._ARRAYS}
+        self._alloc(2 * len(old["_win_pos"]))
+        n = len(self._ids)
+        for name, arr in old.items():
+            getattr(self, name)[:n] = arr[:n]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def state_dict(self) -> State:
+        """All per-terminal state as plain arrays (rows of registered terminals only)."""
+        n = len(self._ids)
+        state: State = {
+            "dim": np.array(self.dim),
+            "window": np.array(self.window),
+            "baseline": np.array(self.baseline),
+            "sustain": np.array(self.sustain),
+            "ids": np.array(self._ids, dtype=str),
+            "last_ts": np.array(self._last_ts, dtype=str),
+        }
+        for name in self._ARRAYS:
+            state[name.lstrip("_")] = getattr(self, name)[:n].copy()
+        return state
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, dim=self.dim, window=self.window, baseline=self.baseline, sustain=self.sustain)
+        ids = state["ids"].tolist()
+        self._alloc(max(len(self._win_pos), len(ids)))
+        for name in self._ARRAYS:
+            getattr(self, name)[:len(ids)] = state[name.lstrip("_")]
+        self._ids = ids
+        self._last_ts = state["last_ts"].tolist()
+        self._index = {terminal_id: row for row, terminal_id in enumerate(ids)}
+
+    def __contains__(self, terminal_id: str) -> bool:
+        return terminal_id in self._index
+
+    def _row(self, terminal_id: str) -> int:
+        row = self._index.get(terminal_id)
+        if row is None:
+            if len(self._ids) == len(self._win_pos):
+                self._grow()
+            row = len(self._ids)
+            self._index[terminal_id] = row
+            self._ids.append(terminal_id)
+            self._last_ts.append("")
+        return row
+
+    def ingest(self, batch: Iterable[Tuple[str, str, Sequence[float]]]) -> int:
+        """Append (terminal_id, ts, features) samples; returns the number ingested.
+
+        Every sample enters its terminal's window; the next ``tick`` scores the
+        latest sample of each terminal that received one.
+        """
+        n = 0
+        for terminal_id, ts, feats in batch:
+            row = self._row(terminal_id)
+            pos = self._win_pos[row]
+            self._windows[row, pos] = feats
+            self._latest[row] = self._windows[row, pos]
+            self._win_pos[row] = (pos + 1) % self.window
+            self._win_count[row] += 1
+            self._due[row] = True
+            self._last_ts[row] = ts
+            n += 1
+        return n
+
+    def tick(self) -> List[TerminalDetection]:
+        """Score every terminal with a new sample and a full window."""
+        n = len(self._ids)
+        rows = np.flatnonzero(self._due[:n] & (self._win_count[:n] >= self.window))
+        self._due[:n] = False
+        if len(rows) == 0:
+            return []
+
+        # ECOD is order-free within a window, so the rings are scored as stored
+        scores = ecod_window_scores(self._windows[rows].transpose(0, 2, 1), self._latest[rows])
+
+        # Rolling percentile threshold (PercentileThreshold semantics)
+        self._hist[rows, self._hist_pos[rows]] = scores
+        self._hist_pos[rows] = (self._hist_pos[rows] + 1) % self.baseline
+        count = np.minimum(self._hist_count[rows] + 1, self.baseline)
+        self._hist_count[rows] = count
+        k = np.clip(np.rint((self.threshold_pct / 100.0) * (count - 1)).astype(np.int64), 0, count - 1)
+        thresholds = np.take_along_axis(np.sort(self._hist[rows], axis=1), k[:, None], axis=1)[:, 0]
+        exceed = scores > thresholds
+
+        # Sustain alarm: all of the last `sustain` frames exceeded
+        self._exceed[rows, self._exceed_pos[rows]] = exceed
+        self._exceed_pos[rows] = (self._exceed_pos[rows] + 1) % self.sustain
+        alarm = self._exceed[rows].sum(axis=1) >= self.sustain
+
+        return [
+            TerminalDetection(
+                terminal_id=self._ids[r],
+                ts=self._last_ts[r],
+                score_ecod=s,
+                threshold=t,
+                exceed=e,
+                alarm=a,
+            )
+            for r, s, t, e, a in zip(rows.tolist(), scores.tolist(), thresholds.tolist(), exceed.tolist(), alarm.tolist())
+        ]
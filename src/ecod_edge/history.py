@@ -0,0 +1,316 @@
+
+from __future__ import annotations
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ecod_edge.inference import DetectionResult
+from ecod_edge.metrics import MetricSnapshot
+from ecod_edge.protocol import BASE_FIELDS, LEGACY_DETECTORS, detector_scores, score_fields, score_values
+
+# "detection" is 1 for frames that carry a DetectionResult (a NaN score may only mean "not configured")
+FLAG_FIELDS = ("detection", "exceed", "alarm")
+
+Frame = Tuple[MetricSnapshot, Optional[DetectionResult]]
+
+class RollupLevel:
+    """Per-bucket mean/max of every field at one resolution, in append-only segment files.
+
+    A segment is a memory-mapped .npy of shape (1 + 2 * fields, rows): a
+    count row, then one mean row and one max row per field, so each column
+    of the query result is a contiguous slice. Segments cover fixed,
+    aligned time spans and buckets are addressed by time, so a range query
+    is a slice of one or two segments; missing buckets read as NaN.
+    ``read_only`` maps segments another process writes, for queries only.
+    """
+
+    def __init__(self, directory: str, resolution: int, fields: Sequence[str], rows: int = 1440, cache: int = 8,
+                 read_only: bool = False):
+        self.directory = directory
+        self.resolution = resolution
+        self.fields = tuple(fields)
+        self.rows = rows
+        self.span = resolution * rows
+        self._cache: OrderedDict[int, np.memmap] = OrderedDict()
+        self._cache_size = cache
+        self.read_only = read_only
+        os.makedirs(directory, exist_ok=True)
+
+        nf = len(self.fields)
+        self._bucket: Optional[int] = None
+        self._count = 0
+        self._sum = np.zeros(nf)
+        self._n = np.zeros(nf)
+        self._max = np.full(nf, -np.inf)
+
+    def _path(self, seg_start: int) -> str:
+        return os.path.join(self.directory, f"seg-{seg_start}.npy")
+
+    def _segment(self, seg_start: int, create: bool = False) -> Optional[np.memmap]:
+        seg = self._cache.get(seg_start)
+        if seg is not None:
+            self._cache.move_to_end(seg_start)
+            return seg
+        path = self._path(seg_start)
+        if os.path.exists(path):
+            seg = np.load(path, mmap_mode="r" if self.read_only else "r+")
+        elif create:
+            seg = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(1 + 2 * len(self.fields), self.rows))
+            seg[:] = np.nan
+        else:
+            return None
+        self._cache[seg_start] = seg
+        while len(self._cache) > self._cache_size:
+            _, old = self._cache.popitem(last=False)
+            if not self.read_only:
+                old.flush()
+        return seg
+
+    def add(self, ts: float, values: np.ndarray) -> None:
+        bucket = int(ts // self.resolution) * self.resolution
+        if bucket != self._bucket:
+            self.flush_bucket()
+            self._bucket = bucket
+        valid = ~np.isnan(values)
+        self._count += 1
+        self._sum[valid] += values[valid]
+        self._n[valid] += 1
+        np.fmax(self._max, values, out=self._max)
+
+    def flush_bucket(self) -> None:
+        """Write the open bucket's row to its segment."""
+        if self._bucket is None or self._count == 0:
+            return
+        seg_start = (self._bucket // self.span) * self.span
+        seg = self._segment(seg_start, create=True)
+        row = (self._bucket - seg_start) // self.resolution
+        nf = len(self.fields)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self._n > 0, self._sum / self._n, np.nan)
+        seg[0, row] = self._count
+        seg[1:1 + nf, row] = mean
+        seg[1 + nf:, row] = np.where(np.isinf(self._max), np.nan, self._max)
+        seg.flush()
+        self._count = 0
+        self._sum[:] = 0.0
+        self._n[:] = 0
+        self._max[:] = -np.inf
+
+    def query(self, start: float, end: float, agg: str = "mean") -> Tuple[np.ndarray, np.ndarray]:
+        """(bucket start times, (fields, buckets) values) for buckets with data in [start, end]."""
+        nf = len(self.fields)
+        off = 1 if agg == "mean" else 1 + nf
+        first = int(start // self.resolution) * self.resolution
+        ts_parts, val_parts = [], []
+        seg_start = (first // self.span) * self.span
+        while seg_start <= end:
+            seg = self._segment(seg_start)
+            if seg is not None:
+                lo = max(0, (first - seg_start) // self.resolution)
+                hi = min(self.rows, int((end - seg_start) // self.resolution) + 1)
+                if hi > lo:
+                    present = ~np.isnan(seg[0, lo:hi])
+                    ts_parts.append((seg_start + self.resolution * np.arange(lo, hi))[present])
+                    val_parts.append(np.asarray(seg[off:off + nf, lo:hi])[:, present])
+            seg_start += self.span
+        if not ts_parts:
+            return np.empty(0), np.empty((nf, 0))
+        return np.concatenate(ts_parts).astype(np.float64), np.concatenate(val_parts, axis=1)
+
+    def close(self) -> None:
+        if not self.read_only:
+            self.flush_bucket()
+            for seg in self._cache.values():
+                seg.flush()
+        self._cache.clear()
+
+class HistoryStore:
+    """Recent raw frames in a bounded ring plus on-disk rollups for long ranges.
+
+    Every appended frame (metric + optional DetectionResult) becomes one row
+    of floats: the stream fields (scores per ``score_fields(detectors)``),
+    then the detection/exceed/alarm flags as 0/1; fields a frame lacks are NaN.
+    The ring also keeps each detection's per-feature attribution (not rolled
+    up), so a replayed frame serializes like the live one. Rollups live under ``directory`` in one subdirectory per
+    resolution, keyed by a hash of the field list so a config change never
+    mixes layouts. ``directory=None`` keeps only the ring; ``read_only``
+    queries rollups written by another process (the detection hub) and
+    keeps appended frames in the ring only.
+    """
+
+    def __init__(
+        self,
+        extras: Sequence[str] = (),
+        raw_size: int = 3600,
+        directory: Optional[str] = None,
+        rollups: Sequence[int] = (60, 3600),
+        read_only: bool = False,
+        detectors: Sequence[str] = LEGACY_DETECTORS,
+    ):
+        self.detectors = tuple(detectors)
+        self.score_fields = score_fields(self.detectors)
+        self.extras = tuple(extras)
+        self.fields = BASE_FIELDS + self.extras + self.score_fields + FLAG_FIELDS
+        self.raw_size = raw_size
+        self._ts = np.full(raw_size, np.nan)
+        self._rows = np.full((raw_size, len(self.fields)), np.nan)
+        self._features = BASE_FIELDS + self.extras
+        self._attr = np.full((raw_size, len(self._features)), np.nan)
+        self._pos = 0
+        self._count = 0
+
+        self.levels: List[RollupLevel] = []
+        if directory:
+            key = hashlib.sha1(",".join(self.fields).encode()).hexdigest()[:8]
+            self.levels = [
+                RollupLevel(os.path.join(directory, f"{res}s-{key}"), res, self.fields, read_only=read_only)
+                for res in sorted(rollups)
+            ]
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_ts(self) -> float:
+        """Epoch seconds of the newest frame in the ring (-inf when empty)."""
+        return float(self._ts[self._pos - 1]) if self._count else -math.inf
+
+    def _row(self, metric: MetricSnapshot, detection: Optional[DetectionResult]) -> np.ndarray:
+        values = [metric.cpu, metric.mem, metric.netInBps, metric.netOutBps, metric.diskReadBps, metric.diskWriteBps]
+        values += [metric.extra.get(name, math.nan) for name in self.extras]
+        if detection is None:
+            values += [math.nan] * len(self.score_fields) + [0.0, math.nan, math.nan]
+        else:
+            values += score_values(detection, self.detectors)
+            values += [1.0, float(detection.exceed), float(detection.alarm)]
+        return np.array(values, dtype=np.float64)
+
+    def append(self, metric: MetricSnapshot, detection: Optional[DetectionResult] = None) -> None:
+        ts = datetime.fromisoformat(metric.ts).timestamp()
+        row = self._row(metric, detection)
+        self._ts[self._pos] = ts
+        self._rows[self._pos] = row
+        attribution = detection.attribution if detection is not None else {}
+        self._attr[self._pos] = [attribution.get(name, math.nan) for name in self._features]
+        self._pos = (self._pos + 1) % self.raw_size
+        self._count = min(self._count + 1, self.raw_size)
+        for level in self.levels:
+            if not level.read_only:
+                level.add(ts, row)
+
+    def _order(self) -> slice | np.ndarray:
+        if self._count < self.raw_size:
+            return slice(0, self._count)
+        return np.r_[self._pos:self.raw_size, 0:self._pos]
+
+    def _ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        order = self._order()
+        return self._ts[order], self._rows[order]
+
+    def _raw(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        ts, rows = self._ordered()
+        lo = np.searchsorted(ts, start, side="left")
+        hi = np.searchsorted(ts, end, side="right")
+        return ts[lo:hi], rows[lo:hi].T
+
+    def _ring_rollup(self, start: float, end: float, resolution: int, agg: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The ring's frames in [start, end] bucketed like a RollupLevel: (bucket start times, (fields, buckets))."""
+        ts, values = self._raw(start, end)
+        if not len(ts):
+            return ts, values
+        buckets, inverse = np.unique((ts // resolution) * resolution, return_inverse=True)
+        rows = values.T
+        valid = ~np.isnan(rows)
+        if agg == "mean":
+            total = np.zeros((len(buckets), rows.shape[1]))
+            n = np.zeros_like(total)
+            np.add.at(total, inverse, np.where(valid, rows, 0.0))
+            np.add.at(n, inverse, valid)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out = np.where(n > 0, total / n, np.nan)
+        else:
+            out = np.full((len(buckets), rows.shape[1]), -np.inf)
+            np.fmax.at(out, inverse, rows)
+            out[np.isinf(out)] = np.nan
+        return buckets, out.T
+
+    def pick_resolution(self, start: float, end: float, max_points: int = 2000) -> int:
+        """0 (raw) when the ring covers ``start`` with at most ``max_points`` rows, else the finest rollup that fits."""
+        ts, _ = self._ordered()
+        if len(ts) and ts[0] <= start:
+            n = np.searchsorted(ts, end, side="right") - np.searchsorted(ts, start)
+            if n <= max_points:
+                return 0
+        for level in self.levels:
+            if (end - start) / level.resolution <= max_points:
+                return level.resolution
+        return self.levels[-1].resolution if self.levels else 0
+
+    def query(
+        self,
+        start: float,
+        end: float,
+        resolution: Optional[int] = None,
+        agg: str = "mean",
+        max_points: int = 2000,
+    ) -> Dict[str, object]:
+        """Columnar rows in [start, end] (epoch seconds); rollups aggregate by ``agg`` ("mean" or "max").
+
+        Rollup results include buckets still only in the ring, so a range is
+        never empty just because its buckets have not been flushed.
+        """
+        if agg not in ("mean", "max"):
+            raise ValueError(f"agg must be 'mean' or 'max', got {agg!r}")
+        if resolution is None:
+            resolution = self.pick_resolution(start, end, max_points)
+        if resolution == 0:
+            ts, values = self._raw(start, end)
+        else:
+            level = next((lv for lv in self.levels if lv.resolution == resolution), None)
+            if level is None:
+                raise ValueError(f"no rollup at {resolution}s; available: {[lv.resolution for lv in self.levels]}")
+            ts, values = level.query(start, end, agg)
+            # Buckets not on disk yet (the open one, or all of them right after
+            # startup or in a read-only worker) come from the ring instead
+            ring_ts, ring_values = self._ring_rollup(start, end, resolution, agg)
+            missing = ~np.isin(ring_ts, ts)
+            if missing.any():
+                ts = np.concatenate([ts, ring_ts[missing]])
+                values = np.concatenate([values, ring_values[:, missing]], axis=1)
+                order = np.argsort(ts, kind="stable")
+                ts, values = ts[order], values[:, order]
+        return {"resolution": resolution, "ts": ts, **dict(zip(self.fields, values))}
+
+    def recent(self, seconds: float) -> List[Frame]:
+        """Raw frames from the last ``seconds`` of the ring, oldest first."""
+        order = self._order()
+        ts, rows, attrs = self._ts[order], self._rows[order], self._attr[order]
+        if not len(ts):
+            return []
+        lo = np.searchsorted(ts, ts[-1] - seconds, side="left")
+        nb = len(BASE_FIELDS) + len(self.extras)
+        frames: List[Frame] = []
+        for t, row, attr in zip(ts[lo:].tolist(), rows[lo:].tolist(), attrs[lo:].tolist()):
+            metric = MetricSnapshot(
+                datetime.fromtimestamp(t, timezone.utc).isoformat(), *row[:len(BASE_FIELDS)],
+                extra=dict(zip(self.extras, row[len(BASE_FIELDS):nb])),
+            )
+            detection = None
+            if row[-3] == 1.0:
+                values = row[nb:nb + len(self.score_fields)]
+                detection = DetectionResult(
+                    values[0], values[1], values[-2], values[-1], bool(row[-2]), bool(row[-1]),
+                    scores=detector_scores(values, self.detectors),
+                    attribution={name: a for name, a in zip(self._features, attr) if not math.isnan(a)},
+                )
+            frames.append((metric, detection))
+        return frames
+
+    def close(self) -> None:
+        for level in self.levels:
+            level.close()
@@ -1,23 +1,32 @@
 
 from __future__ import annotations
+import asyncio
+import multiprocessing
+import math
+import time
 import numpy as np
 from collections import deque
-from typing import Deque, Optional
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, Optional, Sequence
+from dataclasses import dataclass, field
 
-from ecod_edge.detectors import ECODDetector, IForestDetector
-from ecod_edge.utils import PercentileThreshold, SustainAlarm
-from ecod_edge.metrics import MetricSnapshot
+from ecod_edge.ensemble import DetectorEnsemble
+from ecod_edge.utils import SustainAlarm, make_threshold
+from ecod_edge.metrics import BASE_FEATURES, MetricSnapshot
+from ecod_edge.checkpoint import State, check_meta, prefixed, unprefixed
+from ecod_edge.telemetry import Histogram, StageTimings
 
 @dataclass
 class DetectionResult:
     """Anomaly detection results for a single sample."""
-    score_ecod: float
-    score_iforest: float
+    score_ecod: float  # NaN unless ECOD is configured
+    score_iforest: float  # NaN unless IForest is configured, or when it was gated off
     score_ens: float
     threshold: float
     exceed: bool
     alarm: bool
+    scores: Dict[str, float] = field(default_factory=dict)  # every configured detector, by name
+    attribution: Dict[str, float] = field(default_factory=dict)  # feature -> share of score_ens; empty unless enabled
 
 class RealtimeDetector:
     """Real-time anomaly detection with sliding window and ensemble scoring."""
@@ -29,6 +38,21 @@ class RealtimeDetector:
         threshold_pct: float = 98.0,
         sustain: int = 6,
         ensemble: str = "max",
+        iforest_retrain_every: int = 60,
+        iforest_reservoir: int = 600,
+        iforest_drift_z: float = 3.0,
+        threshold_mode: str = "exact",
+        threshold_params: Optional[dict] = None,
+        stage_timings: bool = True,
+        detectors: Sequence[str] = ("ecod", "iforest"),
+        detector_params: Optional[Dict[str, dict]] = None,
+        ensemble_weights: Optional[Sequence[float]] = None,
+        gate_pct: float = 0.0,
+        normalize: str = "none",
+        normalize_history: Optional[int] = None,
+        attribution: bool = False,
+        iforest_attribution: bool = False,
+        dim: int = len(BASE_FEATURES),
     ):
         """
         Args:
@@ -36,29 +60,91 @@ class RealtimeDetector:
             baseline: Buffer size for threshold calculation
             threshold_pct: Percentile for threshold (e.g., 98.0 = 98th percentile)
             sustain: Number of exceeds in last n frames to trigger alarm
-            ensemble: Ensemble method - "max" or "mean"
+            ensemble: Ensemble rule - "max", "mean", "weighted", "rank" or "norm"
+            iforest_retrain_every: Samples between background IForest refits
+            iforest_reservoir: Number of recent samples an IForest refit trains on
+            iforest_drift_z: Feature-mean shift (in stds) that forces an early refit
+            threshold_mode: "exact" rolling percentile, bounded-memory "approx" or drift-aware "adaptive"
+            threshold_params: AdaptiveThreshold options (drift_threshold, seasonal_slots, ...)
+            stage_timings: Record per-stage latency histograms in ``timings``
+            detectors: Registered detector names (see ecod_edge.detectors.DETECTORS)
+            detector_params: Per-detector options, by name
+            ensemble_weights: Per-detector weights for the "weighted" rule
+            gate_pct: Score expensive detectors only when the cheap score reaches this rolling percentile (0 = always)
+            normalize: Per-detector score normalization - "none", "zscore", "rank" or "gauss"
+            normalize_history: Scores each normalizer remembers (default: baseline)
+            attribution: Report each feature's share of the ensemble score (ECOD, COPOD, HBOS, z-score terms)
+            iforest_attribution: Include IForest's path-based per-feature split in the attribution
+            dim: Feature-vector length (the six base metrics plus configured collector extras)
         """
         self.window = window
         self.baseline = baseline
+        self.dim = dim
         self.threshold_pct = threshold_pct
         self.sustain = sustain
         self.ensemble = ensemble
+        self.timings = StageTimings(enabled=stage_timings)
 
         # Detectors
-        self.ecod = ECODDetector()
-        self.iforest = IForestDetector()
+        params = {name: dict(p) for name, p in (detector_params or {}).items()}
+        params.setdefault("iforest", {}).update(
+            retrain_every=iforest_retrain_every,
+            reservoir=iforest_reservoir,
+            drift_z=iforest_drift_z,
+            attribution=iforest_attribution,
+        )
+        self.detectors = DetectorEnsemble(
+            window,
+            detectors=detectors,
+            rule=ensemble,
+            weights=ensemble_weights,
+            history=baseline,
+            gate_pct=gate_pct,
+            params=params,
+            timings=self.timings,
+            normalize=normalize,
+            normalize_history=normalize_history,
+            attribution=attribution,
+        )
 
         # Sliding window buffer
         self.buffer: Deque[np.ndarray] = deque(maxlen=window)
 
         # Threshold and alarm tracking
-        self.threshold_tracker = PercentileThreshold(maxlen=baseline)
+        self.threshold_tracker = make_threshold(
+            maxlen=baseline, mode=threshold_mode, pct=threshold_pct, **(threshold_params or {}),
+        )
         self.alarm_tracker = SustainAlarm(n=sustain, k=sustain)
 
         self._fitted = False
 
+    def close(self) -> None:
+        """Release the background IForest worker."""
+        self.detectors.close()
+
+    def state_dict(self) -> State:
+        """Snapshot of all sliding state as plain arrays (see ecod_edge.checkpoint)."""
+        return {
+            "window": np.array(self.window),
+            "baseline": np.array(self.baseline),
+            "dim": np.array(self.dim),
+            "buffer": np.array(self.buffer, dtype=np.float64),
+            **self.detectors.state_dict(),
+            **prefixed("threshold", self.threshold_tracker.state_dict()),
+            **prefixed("alarm", self.alarm_tracker.state_dict()),
+        }
+
+    def load_state(self, state: State) -> None:
+        """Restore a state_dict; raises ValueError if it was taken with other parameters."""
+        check_meta(state, window=self.window, baseline=self.baseline, dim=self.dim)
+        self.threshold_tracker.load_state(unprefixed("threshold", state))
+        self.alarm_tracker.load_state(unprefixed("alarm", state))
+        self.detectors.load_state(state)
+        self.buffer.clear()
+        self.buffer.extend(np.array(row) for row in state["buffer"])
+
     def _metric_to_vector(self, metric: MetricSnapshot) -> np.ndarray:
-        """Convert MetricSnapshot to feature vector."""
+        """Convert MetricSnapshot to feature vector (configured extras follow the six base metrics)."""
         return np.array([
             metric.cpu,
             metric.mem,
@@ -66,6 +152,7 @@ class RealtimeDetector:
             metric.netOutBps,
             metric.diskReadBps,
             metric.diskWriteBps,
+            *metric.extra.values(),
         ], dtype=np.float64)
 
     def process(self, metric: MetricSnapshot) -> Optional[DetectionResult]:
@@ -74,47 +161,144 @@ class RealtimeDetector:
 
         Returns None if not enough samples yet for detection.
         """
+        timings = self.timings
+        t = time.perf_counter()
         vec = self._metric_to_vector(metric)
         self.buffer.append(vec)
+        t = timings.lap("vectorize", t)
+        t = self.detectors.update(vec, t)
 
         # Need at least window samples to start detection
         if len(self.buffer) < self.window:
             return None
 
-        # Build window matrix (window x features)
-        X = np.array(list(self.buffer))
-
-        # Fit both models on current window
-        self.ecod.fit(X)
-        self.iforest.fit(X)
+        # ECOD is maintained incrementally; IForest scores with its last fitted
+        # forest and refits in the background
         self._fitted = True
 
-        # Score the latest sample
-        latest = vec.reshape(1, -1)
-        score_ecod = float(self.ecod.score(latest)[0])
-        score_iforest = float(self.iforest.score(latest)[0])
-
-        # Ensemble scoring
-        if self.ensemble == "max":
-            score_ens = max(score_ecod, score_iforest)
-        else:  # mean
-            score_ens = (score_ecod + score_iforest) / 2.0
+        # Score the latest sample with every detector and combine
+        raw, score_ens, t = self.detectors.score(vec, t)
+        scores = dict(zip(self.detectors.names, raw.tolist()))
+        shares = self.detectors.contributions
+        attribution = {} if shares is None else dict(zip(BASE_FEATURES + tuple(metric.extra), shares.tolist()))
 
         # Update threshold tracker
-        self.threshold_tracker.update(score_ens)
+        self.threshold_tracker.update(score_ens, metric.ts)
         threshold = self.threshold_tracker.percentile(self.threshold_pct)
 
         # Check if exceeds threshold
         exceed = score_ens > threshold
+        t = timings.lap("threshold", t)
 
         # Update alarm tracker
         alarm = self.alarm_tracker.update(exceed)
+        self.threshold_tracker.update_alarm(alarm, exceed)
+        timings.lap("alarm", t)
 
         return DetectionResult(
-            score_ecod=score_ecod,
-            score_iforest=score_iforest,
+            score_ecod=scores.get("ecod", math.nan),
+            score_iforest=scores.get("iforest", math.nan),
             score_ens=score_ens,
             threshold=threshold,
             exceed=exceed,
             alarm=alarm,
+            scores=scores,
+            attribution=attribution,
         )
+
+def _restored(kwargs: dict, state: State) -> RealtimeDetector:
+    """A new RealtimeDetector loaded from ``state``; raises (ValueError/KeyError) without touching any live detector."""
+    detector = RealtimeDetector(**kwargs)
+    try:
+        detector.load_state(state)
+    except BaseException:
+        detector.close()
+        raise
+    return detector
+
+# Detector owned by a DetectionExecutor process worker
+_worker_detector: Optional[RealtimeDetector] = None
+_worker_kwargs: dict = {}
+
+def _init_worker_detector(kwargs: dict) -> None:
+    global _worker_detector, _worker_kwargs
+    _worker_kwargs = kwargs
+    _worker_detector = RealtimeDetector(**kwargs)
+
+def _worker_process(metric: MetricSnapshot) -> Optional[DetectionResult]:
+    return _worker_detector.process(metric)
+
+def _worker_state_dict() -> State:
+    return _worker_detector.state_dict()
+
+def _worker_load_state(state: State) -> None:
+    global _worker_detector
+    restored = _restored(_worker_kwargs, state)
+    _worker_detector.close()
+    _worker_detector = restored
+
+def _worker_stage_timings() -> Dict[str, Histogram]:
+    return _worker_detector.timings.snapshot()
+
+class DetectionExecutor:
+    """Runs a RealtimeDetector on one dedicated worker, off the event loop.
+
+    ``kind="thread"`` keeps the detector in this process on a single worker
+    thread; ``kind="process"`` builds it inside a single spawned worker
+    process, so scoring never contends for the GIL. One worker keeps samples
+    in order against the detector's sliding state. ``load_state`` restores
+    into a fresh detector and swaps it in only if the whole state loaded.
+    """
+
+    def __init__(self, kind: str = "thread", **detector_kwargs):
+        self.kind = kind
+        self._kwargs = detector_kwargs
+        self._detector: Optional[RealtimeDetector] = None
+        if kind == "thread":
+            self._detector = RealtimeDetector(**detector_kwargs)
+            self._executor: Executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+        elif kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_detector,
+                initargs=(detector_kwargs,),
+            )
+        else:
+            raise ValueError(f"unknown detection executor: {kind!r}")
+
+    async def process(self, metric: MetricSnapshot) -> Optional[DetectionResult]:
+        loop = asyncio.get_running_loop()
+        if self._detector is not None:
+            return await loop.run_in_executor(self._executor, self._detector.process, metric)
+        return await loop.run_in_executor(self._executor, _worker_process, metric)
+
+    async def state_dict(self) -> State:
+        """Snapshot taken on the worker, between two samples."""
+        loop = asyncio.get_running_loop()
+        if self._detector is not None:
+            return await loop.run_in_executor(self._executor, self._detector.state_dict)
+        return await loop.run_in_executor(self._executor, _worker_state_dict)
+
+    async def load_state(self, state: State) -> None:
+        loop = asyncio.get_running_loop()
+        if self._detector is not None:
+            await loop.run_in_executor(self._executor, self._swap_restored, state)
+        else:
+            await loop.run_in_executor(self._executor, _worker_load_state, state)
+
+    def _swap_restored(self, state: State) -> None:
+        restored = _restored(self._kwargs, state)
+        self._detector.close()
+        self._detector = restored
+
+    async def stage_timings(self) -> Dict[str, Histogram]:
+        """Copies of the detector's per-stage latency histograms."""
+        if self._detector is not None:
+            return self._detector.timings.snapshot()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, _worker_stage_timings)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._detector is not None:
+            self._detector.close()
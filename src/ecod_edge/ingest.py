@@ -0,0 +1,178 @@
+
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+from ecod_edge.alerts import Alert, AlarmTransitions, AlertDispatcher
+from ecod_edge.checkpoint import State
+from ecod_edge.gateway import TerminalRegistry
+
+logger = logging.getLogger(__name__)
+
+class IngestFrame(BaseModel):
+    """A MetricSnapshot pushed by an edge agent, tagged with its terminal."""
+    # NaN/inf would poison the terminal's sorted windows and running moments for good: reject with 422
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    terminal_id: str
+    ts: str
+    cpu: float
+    mem: float
+    netInBps: float
+    netOutBps: float
+    diskReadBps: float
+    diskWriteBps: float
+
+    def to_vector(self) -> List[float]:
+        # same feature order as RealtimeDetector._metric_to_vector
+        return [self.cpu, self.mem, self.netInBps, self.netOutBps, self.diskReadBps, self.diskWriteBps]
+
+FEATURE_DIM = 6
+
+IngestBody = Union[IngestFrame, List[IngestFrame]]
+ingest_body = TypeAdapter(IngestBody)
+
+@dataclass
+class _Request:
+    frames: List[IngestFrame]
+    future: asyncio.Future
+    enqueued: float
+
+class IngestPipeline:
+    """Bounded async queue of pushed frames in front of a TerminalRegistry.
+
+    A single worker drains queued requests, up to ``max_batch`` frames at a
+    time, and scores them on ``executor`` (the loop's default executor if
+    None), off the event loop, in rounds so that every frame gets its own result:
+    round r ingests the r-th frame of each terminal in the batch, then ticks.
+    Frames whose terminal window is not yet full resolve to ``None``.
+    A terminal's alarm being raised or cleared is published to ``alerts``.
+    """
+
+    def __init__(
+        self,
+        registry: TerminalRegistry,
+        queue_size: int = 256,
+        max_batch: int = 4096,
+        executor: Optional[Executor] = None,
+        alerts: Optional[AlertDispatcher] = None,
+    ):
+        self.registry = registry
+        self.alerts = alerts
+        self.transitions = AlarmTransitions()
+        self.max_batch = max_batch
+        self.executor = executor
+        self.queue: asyncio.Queue[_Request] = asyncio.Queue(maxsize=queue_size)
+        self.frames_scored = 0
+        self.rejected = 0
+        self.latencies: Deque[float] = deque(maxlen=10000)  # seconds, enqueue -> scored
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    def _request(self, frames: List[IngestFrame]) -> _Request:
+        return _Request(frames, asyncio.get_running_loop().create_future(), time.perf_counter())
+
+    def submit_nowait(self, frames: List[IngestFrame]) -> asyncio.Future:
+        """Enqueue without waiting; raises asyncio.QueueFull when saturated."""
+        req = self._request(frames)
+        try:
+            self.queue.put_nowait(req)
+        except asyncio.QueueFull:
+            self.rejected += len(frames)
+            raise
+        return req.future
+
+    async def submit(self, frames: List[IngestFrame]) -> asyncio.Future:
+        """Enqueue, waiting for room (backpressure for persistent connections)."""
+        req = self._request(frames)
+        await self.queue.put(req)
+        return req.future
+
+    async def _run(self) -> None:
+        while True:
+            reqs = [await self.queue.get()]
+            n = len(reqs[0].frames)
+            while n < self.max_batch and not self.queue.empty():
+                req = self.queue.get_nowait()
+                reqs.append(req)
+                n += len(req.frames)
+            try:
+                results, alerts = await asyncio.get_running_loop().run_in_executor(self.executor, self._score, reqs)
+            except Exception as e:
+                logger.error(f"Ingest scoring error: {e}")
+                for req in reqs:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for req, res in zip(reqs, results):
+                self.latencies.append(now - req.enqueued)
+                self.frames_scored += len(req.frames)
+                if not req.future.done():
+                    req.future.set_result(res)
+            if self.alerts:
+                for alert in alerts:
+                    self.alerts.publish(alert)
+
+    def _score(self, reqs: List[_Request]) -> Tuple[List[List[Optional[dict]]], List[Alert]]:
+        rounds: List[List[tuple]] = []
+        seen: Dict[str, int] = {}
+        for ri, req in enumerate(reqs):
+            for fi, frame in enumerate(req.frames):
+                r = seen.get(frame.terminal_id, 0)
+                seen[frame.terminal_id] = r + 1
+                if r == len(rounds):
+                    rounds.append([])
+                rounds[r].append((ri, fi, frame))
+
+        results: List[List[Optional[dict]]] = [[None] * len(req.frames) for req in reqs]
+        alerts: List[Alert] = []
+        for batch in rounds:
+            self.registry.ingest((f.terminal_id, f.ts, f.to_vector()) for _, _, f in batch)
+            scored = {d.terminal_id: d for d in self.registry.tick()}
+            for d in scored.values():
+                alert = self.transitions.update(d.terminal_id, d.ts, d.alarm, d.score_ecod, d.threshold, {"ecod": d.score_ecod})
+                if alert is not None:
+                    alerts.append(alert)
+            for ri, fi, frame in batch:
+                d = scored.get(frame.terminal_id)
+                if d is not None:
+                    results[ri][fi] = asdict(d)
+        return results, alerts
+
+    async def state_dict(self) -> State:
+        """Registry snapshot taken on the scoring executor, between two passes."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.registry.state_dict)
+
+    async def load_state(self, state: State) -> None:
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.registry.load_state, state)
+
+    def stats(self) -> dict:
+        lat = np.asarray(self.latencies) * 1e3
+        return {
+            "queue_depth": self.queue.qsize(),
+            "terminals": len(self.registry),
+            "frames_scored": self.frames_scored,
+            "frames_rejected": self.rejected,
+            "latency_ms_p50": float(np.percentile(lat, 50)) if len(lat) else None,
+            "latency_ms_p99": float(np.percentile(lat, 99)) if len(lat) else None,
+        }
@@ -1,9 +1,10 @@
 
 from __future__ import annotations
+import os
 import time
 import psutil
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timezone
 
 @dataclass
@@ -16,55 +17,49 @@ class MetricSnapshot:
     netOutBps: float  # Network bytes sent per second
     diskReadBps: float  # Disk bytes read per second
     diskWriteBps: float  # Disk bytes written per second
+    extra: Dict[str, float] = field(default_factory=dict)  # optional features, in configured order
 
-class MetricsCollector:
-    """Collects system metrics using psutil with differential calculation for I/O."""
+# Detector feature vector order: these, then MetricSnapshot.extra in configured order
+BASE_FEATURES = ("cpu", "mem", "netInBps", "netOutBps", "diskReadBps", "diskWriteBps")
+# Optional features a collector can add to MetricSnapshot.extra
+EXTRA_FEATURES = ("load1", "load5", "load15", "ctx_switches", "interrupts", "swap")
+# Extras that are monotonic counters, reported as per-second rates
+_RATE_EXTRAS = ("ctx_switches", "interrupts")
 
-    def __init__(self):
-        self._prev_net: Optional[psutil._common.snetio] = None
-        self._prev_disk: Optional[psutil._common.sdiskio] = None
-        self._prev_time: Optional[float] = None
+class _RateCollector:
+    """Turns a backend's cumulative counters into per-second rates.
 
-        # Prime CPU percent (first call returns meaningless value)
-        psutil.cpu_percent(interval=None)
+    Backends implement ``_sample`` returning cpu and mem percentages, the
+    cumulative counters (net_in, net_out, disk_read, disk_write and any rate
+    extras) and the instantaneous extras. Rates are 0.0 on the first tick.
+    """
 
-    def collect(self) -> MetricSnapshot:
-        """Collect current system metrics."""
-        current_time = time.time()
+    def __init__(self, extras: Sequence[str] = ()):
+        unknown = set(extras) - set(EXTRA_FEATURES)
+        if unknown:
+            raise ValueError(f"unknown extra features: {sorted(unknown)}; expected {EXTRA_FEATURES}")
+        self.extras = tuple(extras)
+        self._prev_counters: Optional[Dict[str, float]] = None
+        self._prev_time: Optional[float] = None
 
-        # CPU and Memory are instantaneous
-        cpu_pct = psutil.cpu_percent(interval=None)
-        mem_pct = psutil.virtual_memory().percent
+    def _sample(self) -> Tuple[float, float, Dict[str, float], Dict[str, float]]:
+        raise NotImplementedError
 
-        # Network and Disk require differential calculation
-        net_io = psutil.net_io_counters()
-        disk_io = psutil.disk_io_counters()
+    def close(self) -> None:
+        pass
 
-        # Calculate rates
-        net_in_bps = 0.0
-        net_out_bps = 0.0
-        disk_read_bps = 0.0
-        disk_write_bps = 0.0
+    def collect(self) -> MetricSnapshot:
+        """Collect current system metrics."""
+        current_time = time.monotonic()
+        cpu_pct, mem_pct, counters, gauges = self._sample()
 
-        if self._prev_net is not None and self._prev_disk is not None and self._prev_time is not None:
+        rates = dict.fromkeys(counters, 0.0)
+        if self._prev_counters is not None:
             elapsed = current_time - self._prev_time
-
             if elapsed > 0:
-                # Network rates
-                net_in_bytes = net_io.bytes_recv - self._prev_net.bytes_recv
-                net_out_bytes = net_io.bytes_sent - self._prev_net.bytes_sent
-                net_in_bps = max(0.0, net_in_bytes / elapsed)
-                net_out_bps = max(0.0, net_out_bytes / elapsed)
-
-                # Disk rates
-                disk_read_bytes = disk_io.read_bytes - self._prev_disk.read_bytes
-                disk_write_bytes = disk_io.write_bytes - self._prev_disk.write_bytes
-                disk_read_bps = max(0.0, disk_read_bytes / elapsed)
-                disk_write_bps = max(0.0, disk_write_bytes / elapsed)
-
-        # Update previous values
-        self._prev_net = net_io
-        self._prev_disk = disk_io
+                for name, value in counters.items():
+                    rates[name] = max(0.0, (value - self._prev_counters.get(name, value)) / elapsed)
+        self._prev_counters = counters
         self._prev_time = current_time
 
         # Create snapshot with ISO8601 timestamp
@@ -74,8 +69,210 @@ class MetricsCollector:
             ts=ts_iso,
             cpu=cpu_pct,
             mem=mem_pct,
-            netInBps=net_in_bps,
-            netOutBps=net_out_bps,
-            diskReadBps=disk_read_bps,
-            diskWriteBps=disk_write_bps,
+            netInBps=rates["net_in"],
+            netOutBps=rates["net_out"],
+            diskReadBps=rates["disk_read"],
+            diskWriteBps=rates["disk_write"],
+            extra={name: rates[name] if name in _RATE_EXTRAS else gauges[name] for name in self.extras},
         )
+
+class MetricsCollector(_RateCollector):
+    """Collects system metrics using psutil with differential calculation for I/O.
+
+    ``nics``/``disks`` restrict network and disk rates to the named devices;
+    by default psutil's all-device totals are used.
+    """
+
+    def __init__(
+        self,
+        nics: Optional[Sequence[str]] = None,
+        disks: Optional[Sequence[str]] = None,
+        extras: Sequence[str] = (),
+    ):
+        super().__init__(extras)
+        self.nics = list(nics) if nics else None
+        self.disks = list(disks) if disks else None
+
+        # Prime CPU percent (first call returns meaningless value)
+        psutil.cpu_percent(interval=None)
+
+    def _sample(self):
+        # CPU and Memory are instantaneous
+        cpu_pct = psutil.cpu_percent(interval=None)
+        mem_pct = psutil.virtual_memory().percent
+
+        # Network and Disk require differential calculation
+        if self.nics is None:
+            net = psutil.net_io_counters()
+            net_in, net_out = net.bytes_recv, net.bytes_sent
+        else:
+            pernic = psutil.net_io_counters(pernic=True)
+            net_in = sum(pernic[n].bytes_recv for n in self.nics if n in pernic)
+            net_out = sum(pernic[n].bytes_sent for n in self.nics if n in pernic)
+        if self.disks is None:
+            disk = psutil.disk_io_counters()
+            disk_read, disk_write = (disk.read_bytes, disk.write_bytes) if disk else (0, 0)
+        else:
+            perdisk = psutil.disk_io_counters(perdisk=True)
+            disk_read = sum(perdisk[d].read_bytes for d in self.disks if d in perdisk)
+            disk_write = sum(perdisk[d].write_bytes for d in self.disks if d in perdisk)
+
+        counters = {"net_in": net_in, "net_out": net_out, "disk_read": disk_read, "disk_write": disk_write}
+        gauges: Dict[str, float] = {}
+        if any(e in self.extras for e in _RATE_EXTRAS):
+            stats = psutil.cpu_stats()
+            counters["ctx_switches"] = stats.ctx_switches
+            counters["interrupts"] = stats.interrupts
+        if any(e.startswith("load") for e in self.extras):
+            gauges["load1"], gauges["load5"], gauges["load15"] = os.getloadavg()
+        if "swap" in self.extras:
+            gauges["swap"] = psutil.swap_memory().percent
+        return cpu_pct, mem_pct, counters, gauges
+
+class _ProcFile:
+    """A /proc file kept open and re-read from offset 0 each tick.
+
+    ``index`` maps a line key to its line number, found once and re-located
+    only if the file's layout shifts (e.g. a NIC appears or disappears).
+    """
+
+    def __init__(self, path: str, key, wanted: Optional[Sequence[str]] = None):
+        self._f = open(path, "r")
+        self._key = key
+        self._wanted = wanted
+        self.index: Dict[str, int] = {}
+        self._locate(self._read())
+
+    def _read(self) -> List[str]:
+        self._f.seek(0)
+        return self._f.read().splitlines()
+
+    def _locate(self, lines: List[str]) -> None:
+        keys = [self._key(line) for line in lines]
+        self.index = {k: i for i, k in enumerate(keys) if k and (self._wanted is None or k in self._wanted)}
+
+    def lines(self) -> Dict[str, str]:
+        """Current line for each indexed key."""
+        lines = self._read()
+        for k, i in self.index.items():
+            if i >= len(lines) or self._key(lines[i]) != k:
+                self._locate(lines)
+                break
+        return {k: lines[i] for k, i in self.index.items()}
+
+    def close(self) -> None:
+        self._f.close()
+
+def _first_word(line: str) -> str:
+    return line.split(None, 1)[0].rstrip(":") if line.strip() else ""
+
+def _nic_name(line: str) -> str:
+    name, sep, _ = line.partition(":")
+    return name.strip() if sep and "|" not in name else ""
+
+def _disk_name(line: str) -> str:
+    fields = line.split(None, 3)
+    return fields[2] if len(fields) > 2 else ""
+
+class ProcCollector(_RateCollector):
+    """Linux collector reading /proc/stat, meminfo, net/dev and diskstats directly.
+
+    Avoids psutil's per-call file opens and namedtuple construction: files stay
+    open, and the lines of interest are located once. Defaults match psutil's
+    totals: every NIC, and every whole disk listed in /sys/block.
+    """
+
+    SECTOR_BYTES = 512
+
+    def __init__(
+        self,
+        nics: Optional[Sequence[str]] = None,
+        disks: Optional[Sequence[str]] = None,
+        extras: Sequence[str] = (),
+        root: str = "/proc",
+    ):
+        super().__init__(extras)
+        if disks is None:
+            sys_block = os.path.join(os.path.dirname(root.rstrip("/")) or "/", "sys", "block")
+            disks = os.listdir(sys_block) if os.path.isdir(sys_block) else None
+        self._stat = _ProcFile(os.path.join(root, "stat"), _first_word, ("cpu", "ctxt", "intr"))
+        self._meminfo = _ProcFile(os.path.join(root, "meminfo"), _first_word,
+                                  ("MemTotal", "MemAvailable", "SwapTotal", "SwapFree"))
+        self._net = _ProcFile(os.path.join(root, "net", "dev"), _nic_name, nics)
+        self._disk = _ProcFile(os.path.join(root, "diskstats"), _disk_name, disks)
+        self._loadavg = _ProcFile(os.path.join(root, "loadavg"), lambda line: "loadavg") if any(
+            e.startswith("load") for e in self.extras) else None
+        self._prev_cpu: Optional[Tuple[int, int]] = None
+        self._cpu_pct()  # prime, like psutil.cpu_percent(interval=None)
+
+    def _cpu_pct(self, stat: Optional[Dict[str, str]] = None) -> float:
+        stat = stat or self._stat.lines()
+        # user nice system idle iowait irq softirq steal [guest guest_nice, already in user/nice]
+        times = [int(v) for v in stat["cpu"].split()[1:9]]
+        total = sum(times)
+        busy = total - times[3] - times[4]
+        prev = self._prev_cpu
+        self._prev_cpu = (busy, total)
+        if prev is None or total <= prev[1]:
+            return 0.0
+        return round(100.0 * max(0, busy - prev[0]) / (total - prev[1]), 1)
+
+    def _sample(self):
+        stat = self._stat.lines()
+        cpu_pct = self._cpu_pct(stat)
+
+        mem = {k: int(v.split()[1]) for k, v in self._meminfo.lines().items()}
+        mem_pct = round(100.0 * (mem["MemTotal"] - mem["MemAvailable"]) / mem["MemTotal"], 1)
+
+        net_in = net_out = 0
+        for line in self._net.lines().values():
+            fields = line.partition(":")[2].split()
+            net_in += int(fields[0])
+            net_out += int(fields[8])
+
+        disk_read = disk_write = 0
+        for line in self._disk.lines().values():
+            fields = line.split()
+            disk_read += int(fields[5])
+            disk_write += int(fields[9])
+
+        counters = {
+            "net_in": net_in,
+            "net_out": net_out,
+            "disk_read": disk_read * self.SECTOR_BYTES,
+            "disk_write": disk_write * self.SECTOR_BYTES,
+        }
+        gauges: Dict[str, float] = {}
+        if "ctx_switches" in self.extras:
+            counters["ctx_switches"] = int(stat["ctxt"].split()[1])
+        if "interrupts" in self.extras:
+            counters["interrupts"] = int(stat["intr"].split(None, 2)[1])
+        if self._loadavg is not None:
+            load = self._loadavg.lines()["loadavg"].split()
+            gauges["load1"], gauges["load5"], gauges["load15"] = (float(v) for v in load[:3])
+        if "swap" in self.extras:
+            swap_total = mem.get("SwapTotal", 0)
+            gauges["swap"] = round(100.0 * (swap_total - mem.get("SwapFree", 0)) / swap_total, 1) if swap_total else 0.0
+        return cpu_pct, mem_pct, counters, gauges
+
+    def close(self) -> None:
+        for f in (self._stat, self._meminfo, self._net, self._disk, self._loadavg):
+            if f is not None:
+                f.close()
+
+def make_collector(
+    backend: str = "auto",
+    nics: Optional[Sequence[str]] = None,
+    disks: Optional[Sequence[str]] = None,
+    extras: Sequence[str] = (),
+) -> _RateCollector:
+    """Build a collector: "proc" (Linux /proc), "psutil", or "auto" (proc when readable)."""
+    if backend not in ("auto", "proc", "psutil"):
+        raise ValueError(f"unknown collector backend: {backend!r}")
+    if backend == "proc" or (backend == "auto" and os.access("/proc/stat", os.R_OK)):
+        try:
+            return ProcCollector(nics=nics, disks=disks, extras=extras)
+        except (OSError, KeyError, ValueError, IndexError):
+            if backend == "proc":
+                raise
+    return MetricsCollector(nics=nics, disks=disks, extras=extras)
@@ -0,0 +1,126 @@
+
+from __future__ import annotations
+import math
+from bisect import bisect_right
+from collections import deque
+from typing import Deque
+import numpy as np
+
+from .checkpoint import State, check_meta
+from .utils import PercentileThreshold
+
+# Per-detector score normalization applied before the ensemble rule
+NORMALIZERS = ("none", "zscore", "rank", "gauss")
+
+class RollingZ:
+    """z-score of each new score against the last ``maxlen`` scores, this one included.
+
+    O(1) per sample: the window's mean and sum of squared deviations are
+    updated with sliding Welford steps, and recomputed from the buffer every
+    ``maxlen`` samples to cancel accumulated rounding.
+    """
+
+    def __init__(self, maxlen: int = 120):
+        self.buf: Deque[float] = deque(maxlen=maxlen)
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_resync = 0
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        full = len(self.buf) == self.buf.maxlen
+        old = self.buf[0] if full else None
+        self.buf.append(value)
+        n = len(self.buf)
+        if old is None:
+            d = value - self._mean
+            self._mean += d / n
+            self._m2 += d * (value - self._mean)
+        else:
+            # replace old with value at constant n
+            d = value - old
+            mean = self._mean + d / n
+            self._m2 += d * (value - mean + old - self._mean)
+            self._mean = mean
+        self._since_resync += 1
+        if self._since_resync >= self.buf.maxlen:
+            self._resync()
+
+    def _resync(self) -> None:
+        arr = np.fromiter(self.buf, dtype=np.float64, count=len(self.buf))
+        self._mean = float(arr.mean())
+        self._m2 = float(((arr - self._mean) ** 2).sum())
+        self._since_resync = 0
+
+    def z(self, value: float) -> float:
+        std = math.sqrt(max(self._m2, 0.0) / len(self.buf)) if self.buf else 0.0
+        # (near-)constant history: every score is typical
+        if std <= 1e-12 * max(1.0, abs(self._mean)):
+            return 0.0
+        return (float(value) - self._mean) / std
+
+    def transform(self, value: float) -> float:
+        self.update(value)
+        return self.z(value)
+
+    def state_dict(self) -> State:
+        return {"maxlen": np.array(self.buf.maxlen), "buf": np.array(self.buf, dtype=np.float64)}
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, maxlen=self.buf.maxlen)
+        self.buf.clear()
+        self.buf.extend(state["buf"].tolist())
+        if self.buf:
+            self._resync()
+        else:
+            self._mean = self._m2 = 0.0
+
+class GaussianCDF(RollingZ):
+    """Rolling z-score mapped through the standard normal CDF into (0, 1)."""
+
+    def transform(self, value: float) -> float:
+        self.update(value)
+        return 0.5 * (1.0 + math.erf(self.z(value) / math.sqrt(2.0)))
+
+class RollingRank(PercentileThreshold):
+    """Fraction of the last ``maxlen`` scores, this one included, at or below each new score.
+
+    Shares PercentileThreshold's sorted mirror of the window, so a rank is a
+    bisect into it.
+    """
+
+    def transform(self, value: float) -> float:
+        self.update(value)
+        return bisect_right(self._sorted, float(value)) / len(self._sorted)
+
+def make_normalizer(kind: str, maxlen: int):
+    """Streaming normalizer for ``kind`` in NORMALIZERS other than "none"."""
+    if kind == "zscore":
+        return RollingZ(maxlen=maxlen)
+    if kind == "gauss":
+        return GaussianCDF(maxlen=maxlen)
+    if kind == "rank":
+        return RollingRank(maxlen=maxlen)
+    raise ValueError(f"unknown score normalization {kind!r}; expected one of {NORMALIZERS}")
+
+def rolling_rank(scores: np.ndarray, maxlen: int, chunk_size: int = 4096) -> np.ndarray:
+    """``RollingRank(maxlen).transform`` over a whole score sequence, vectorized."""
+    out = np.empty(len(scores), dtype=np.float64)
+    for i in range(min(len(scores), maxlen - 1)):
+        out[i] = np.count_nonzero(scores[:i + 1] <= scores[i]) / (i + 1)
+    if len(scores) >= maxlen:
+        views = np.lib.stride_tricks.sliding_window_view(scores, maxlen)
+        for start in range(0, len(views), chunk_size):
+            block = views[start:start + chunk_size]
+            out[maxlen - 1 + start:maxlen - 1 + start + len(block)] = (block <= block[:, -1:]).sum(axis=1) / maxlen
+    return out
+
+def normalize_series(scores: np.ndarray, kind: str, maxlen: int) -> np.ndarray:
+    """A streaming normalizer applied over a whole score sequence."""
+    if kind == "none":
+        return scores
+    if kind == "rank":
+        return rolling_rank(scores, maxlen)
+    # the running moments are order-dependent; replay them so results match the stream exactly
+    normalizer = make_normalizer(kind, maxlen)
+    return np.fromiter((normalizer.transform(s) for s in scores.tolist()), dtype=np.float64, count=len(scores))
@@ -1,17 +1,22 @@
 
 from __future__ import annotations
-import csv, sys, yaml
-from typing import Dict, List
+import csv, os, sys, time, yaml
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence
 import numpy as np
 from rich.console import Console
 from rich.table import Table
 
-from .utils import PercentileThreshold, SustainAlarm
-from .detectors import ECODDetector, IForestDetector
-from .stream import iter_csv_rows, windowed_vectors
+from .utils import SustainAlarm, make_threshold
+from .ensemble import DetectorEnsemble
+from .stream import input_columns, iter_rows, windowed_vectors
+from .checkpoint import load_checkpoint, prefixed, save_checkpoint, unprefixed
 
 console = Console()
 
+# Console labels for per-detector scores (default: upper-cased name)
+LABELS = {"iforest": "IF"}
+
 def run_pipeline(
     mock_path: str,
     interval: float = 0.0,
@@ -20,55 +25,174 @@ def run_pipeline(
     threshold_pct: float = 98.0,
     sustain: int = 6,
     ensemble: str = "max",
+    iforest_retrain_every: int = 60,
+    iforest_reservoir: int = 600,
+    iforest_drift_z: float = 3.0,
+    threshold_mode: str = "exact",
+    threshold_params: dict = None,
     features: List[str] = None,
-    out_csv: str = None
+    out_csv: str = None,
+    checkpoint: str = None,
+    checkpoint_every: int = 1000,
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    detector_params: Dict[str, dict] = None,
+    ensemble_weights: Sequence[float] = None,
+    gate_pct: float = 0.0,
+    normalize: str = "none",
+    normalize_history: int = None,
+    alert_sinks: Sequence[str] = None,
+    csv_flush_interval: float = 1.0,
+    attribution: bool = False,
 ):
-    # Initialize
-    ecod = ECODDetector()
-    iforest = IForestDetector()
+    params = {name: dict(p) for name, p in (detector_params or {}).items()}
+    # Refits are synchronous here so replays are reproducible
+    params.setdefault("iforest", {}).update(
+        retrain_every=iforest_retrain_every,
+        reservoir=iforest_reservoir,
+        drift_z=iforest_drift_z,
+        background=False,
+    )
+
+    def init_detectors():
+        scorer = DetectorEnsemble(
+            window, detectors=detectors, rule=ensemble, weights=ensemble_weights,
+            history=baseline*2, gate_pct=gate_pct, params=params,
+            normalize=normalize, normalize_history=normalize_history, attribution=attribution,
+        )
+        return scorer, {
+            # Warm-up baseline buffers
+            "threshold": make_threshold(maxlen=baseline*2, mode=threshold_mode, pct=threshold_pct, **(threshold_params or {})),  # keep extra
+            "alarm": SustainAlarm(n=10, k=sustain),
+        }
+
+    # Initialize, warm-starting from a previous run's checkpoint if there is one
+    scorer, parts = init_detectors()
+    state = load_checkpoint(checkpoint) if checkpoint else None
+    if state is not None:
+        try:
+            scorer.load_state(state)
+            for prefix, part in parts.items():
+                part.load_state(unprefixed(prefix, state))
+            console.print(f"[green]Restored detector state from {checkpoint}[/]")
+        except (ValueError, KeyError) as e:
+            console.print(f"[yellow]Not restoring {checkpoint}: {e}[/]")
+            scorer.close()
+            scorer, parts = init_detectors()
+    score_hist, alarm = parts["threshold"], parts["alarm"]
+    labels = [LABELS.get(name, name.upper()) for name in scorer.names]
+    feature_names = input_columns(mock_path, features)[1:] if attribution else []
+
+    # Snapshots are taken inline (small copies) and written on a background thread
+    snapshot_writer = ThreadPoolExecutor(max_workers=1) if checkpoint else None
 
-    # Warm-up baseline buffers
-    score_hist = PercentileThreshold(maxlen=baseline*2)  # keep extra
-    alarm = SustainAlarm(n=10, k=sustain)
+    def snapshot():
+        state = scorer.state_dict()
+        for prefix, part in parts.items():
+            state.update(prefixed(prefix, part.state_dict()))
+        snapshot_writer.submit(save_checkpoint, checkpoint, state)
 
-    # For output
+    # Alarm transitions go to the alert sinks on a background loop, off the scoring path
+    source = os.path.basename(mock_path)
+    alerts = start_alerts(alert_sinks)
+    if alerts:
+        from .alerts import AlarmTransitions
+        transitions = AlarmTransitions()
+
+    # For output; flushed every csv_flush_interval seconds rather than every row
     writer = None
+    last_flush = time.monotonic()
     if out_csv:
         wf = open(out_csv, "w", newline="")
         writer = csv.writer(wf)
-        writer.writerow(["ts","score_ecod","score_iforest","score_ens","threshold","exceed","alarm"])
+        writer.writerow(["ts", *(f"score_{name}" for name in scorer.names), "score_ens","threshold","exceed","alarm",
+                         *(f"attr_{name}" for name in feature_names)])
 
     # Iterate stream
-    rows = iter_csv_rows(mock_path, interval=interval)
+    rows = iter_rows(mock_path, interval=interval, features=features)
     for i, (ts, Xw) in enumerate(windowed_vectors(rows, window=window), start=1):
-        # Fit models incrementally: ECOD/IForest are batch; here we refit on sliding window
-        ecod.fit(Xw)
-        s_ecod = float(ecod.score(Xw[-1:].reshape(1, -1))[0])
-
-        iforest.fit(Xw)
-        s_if = float(iforest.score(Xw[-1:].reshape(1, -1))[0])
-
-        if ensemble == "mean":
-            s_ens = 0.5*(s_ecod + s_if)
-        else:
-            s_ens = max(s_ecod, s_if)
+        # ECOD slides incrementally; IForest refits on its own schedule.
+        # The first window primes every row (on top of any restored state).
+        for row in (Xw if i == 1 else Xw[-1:]):
+            scorer.update(row)
+        scores, s_ens, _ = scorer.score(Xw[-1])
 
         # Update threshold from history (uses past s_ens)
-        score_hist.update(s_ens)
+        score_hist.update(s_ens, ts)
         thr = score_hist.percentile(threshold_pct)
         exceed = s_ens >= thr
         is_alarm = alarm.update(exceed)
+        score_hist.update_alarm(is_alarm, exceed)
+        shares = scorer.contributions if attribution else None
+        attributed = {} if shares is None else dict(zip(feature_names, shares.tolist()))
 
         # Print row
-        console.print(f"[bold]{ts}[/]  ECOD={s_ecod:.3f}  IF={s_if:.3f}  ENS={s_ens:.3f}  thr({threshold_pct:.0f}%)={thr:.3f}  exceed={exceed}  alarm={is_alarm}")
+        per_detector = "  ".join(f"{label}={s:.3f}" for label, s in zip(labels, scores.tolist()))
+        top = f"  top={max(attributed, key=attributed.get)}" if attributed else ""
+        console.print(f"[bold]{ts}[/]  {per_detector}  ENS={s_ens:.3f}  thr({threshold_pct:.0f}%)={thr:.3f}  exceed={exceed}  alarm={is_alarm}{top}")
         if writer:
-            writer.writerow([ts, f"{s_ecod:.6f}", f"{s_if:.6f}", f"{s_ens:.6f}", f"{thr:.6f}", int(exceed), int(is_alarm)])
-            wf.flush()
+            attr_cols = [f"{attributed.get(name, np.nan):.6f}" for name in feature_names]
+            writer.writerow([ts, *(f"{s:.6f}" for s in scores.tolist()), f"{s_ens:.6f}", f"{thr:.6f}", int(exceed), int(is_alarm), *attr_cols])
+            if time.monotonic() - last_flush >= csv_flush_interval:
+                wf.flush()
+                last_flush = time.monotonic()
+
+        if alerts:
+            alert = transitions.update(source, ts, is_alarm, s_ens, thr, dict(zip(scorer.names, scores.tolist())), attributed)
+            if alert is not None:
+                alerts.publish_threadsafe(alert)
+
+        if snapshot_writer is not None and i % checkpoint_every == 0:
+            snapshot()
+
+    if snapshot_writer is not None:
+        snapshot()
+        snapshot_writer.shutdown(wait=True)
+    scorer.close()
 
     if writer:
         wf.close()
         console.print(f"[green]Saved alerts to {out_csv}[/]")
+    stop_alerts(alerts)
+
+def start_alerts(specs: Sequence[str] = None) -> AlertDispatcher | None:
+    """An AlertDispatcher for sink specs (see alerts.make_sink), running on its own thread; None without sinks."""
+    if not specs:
+        return None
+    # loaded only when alerts are configured (asyncio, sqlite3, urllib)
+    from .alerts import AlertDispatcher, make_sink
+    alerts = AlertDispatcher([make_sink(spec) for spec in specs])
+    alerts.start_thread()
+    return alerts
+
+def stop_alerts(alerts: AlertDispatcher | None) -> None:
+    """Deliver pending alerts and print per-sink delivery stats."""
+    if alerts is None:
+        return
+    alerts.stop_thread()
+    table = Table(title=f"Alert sinks ({alerts.published} alarm transitions)")
+    for col in ("sink", "delivered", "dropped", "failed writes", "last error"):
+        table.add_column(col)
+    for name, st in alerts.stats().items():
+        table.add_row(name, str(st["delivered"]), str(st["dropped"]), str(st["failures"]), st["last_error"] or "")
+    console.print(table)
 
 def load_config(path: str) -> Dict:
     with open(path) as f:
         return yaml.safe_load(f) or {}
+
+def detector_params(cfg: Dict) -> Dict[str, dict]:
+    """Per-detector options from a config: ``detector_params`` plus the top-level iforest_* keys."""
+    params = {name: dict(p) for name, p in (cfg.get("detector_params") or {}).items()}
+    params.setdefault("iforest", {}).update(
+        retrain_every=cfg.get("iforest_retrain_every", 60),
+        reservoir=cfg.get("iforest_reservoir", 600),
+        drift_z=cfg.get("iforest_drift_z", 3.0),
+    )
+    return params
+
+def threshold_params(cfg: Dict) -> dict:
+    """AdaptiveThreshold options from a config's threshold_* keys (ignored by the other modes)."""
+    return {
+        "drift_threshold": cfg.get("threshold_drift", 50.0),
+        "seasonal_slots": cfg.get("threshold_seasonal_slots", 0),
+    }
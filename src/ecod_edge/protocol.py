@@ -0,0 +1,116 @@
+
+from __future__ import annotations
+import json
+import math
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ecod_edge.inference import DetectionResult
+from ecod_edge.metrics import BASE_FEATURES, MetricSnapshot
+
+# Wire formats a /ws/metrics client can ask for with ?format=
+FORMATS = ("json", "binary")
+
+BASE_FIELDS = BASE_FEATURES
+# Per-detector scores every frame carries (NaN when not configured), as in DetectionResult
+LEGACY_DETECTORS = ("ecod", "iforest")
+
+def score_fields(detectors: Sequence[str] = LEGACY_DETECTORS) -> Tuple[str, ...]:
+    """score_ecod and score_iforest, score_<name> for each other configured detector, then score_ens and threshold."""
+    others = tuple(f"score_{name}" for name in detectors if name not in LEGACY_DETECTORS)
+    return tuple(f"score_{name}" for name in LEGACY_DETECTORS) + others + ("score_ens", "threshold")
+
+SCORE_FIELDS = score_fields()
+
+def score_values(detection: DetectionResult, detectors: Sequence[str] = LEGACY_DETECTORS) -> List[float]:
+    """``detection``'s values for ``score_fields(detectors)``."""
+    others = [detection.scores.get(name, math.nan) for name in detectors if name not in LEGACY_DETECTORS]
+    return [detection.score_ecod, detection.score_iforest, *others, detection.score_ens, detection.threshold]
+
+def detector_scores(values: Sequence[float], detectors: Sequence[str] = LEGACY_DETECTORS) -> Dict[str, float]:
+    """Inverse of ``score_values`` for the per-detector part: configured detector -> score."""
+    fields = score_fields(detectors)
+    return {name: values[fields.index(f"score_{name}")] for name in detectors}
+
+# Record flag bits
+FLAG_DETECTION = 1
+FLAG_EXCEED = 2
+FLAG_ALARM = 4
+
+VERSION = 1
+MAX_BATCH = 256  # records per binary message a client may ask for
+# Message header: version, reserved, record count, t0 (epoch seconds of the first record)
+HEADER = struct.Struct("<BBHd")
+# Per record, before the float32 fields: ms since t0, flags
+RECORD_PREFIX = struct.Struct("<IB")
+
+# An encoded record: (epoch seconds, flags + float32 fields)
+Record = Tuple[float, bytes]
+
+class BinaryCodec:
+    """Packed little-endian float32 records for ``/ws/metrics?format=binary``.
+
+    A client first receives a JSON schema message naming the fields, then
+    binary messages of ``HEADER`` followed by ``count`` records of
+    ``RECORD_PREFIX`` + one float32 per field. Timestamps are millisecond
+    offsets from the message's t0, so a record is 5 + 4 * fields bytes
+    against ~300 bytes of JSON. Scores are NaN when FLAG_DETECTION is unset;
+    the score fields follow ``score_fields(detectors)``. With ``attribution``
+    they are followed by ``attr_<feature>`` for every feature, NaN when a
+    detection carries no attribution.
+    """
+
+    def __init__(self, extras: Sequence[str] = (), include_scores: bool = True,
+                 detectors: Sequence[str] = LEGACY_DETECTORS, attribution: bool = False):
+        self.extras = tuple(extras)
+        self.detectors = tuple(detectors)
+        self.attribution = attribution and include_scores
+        self._features = BASE_FIELDS + self.extras if self.attribution else ()
+        scores = score_fields(self.detectors) + tuple(f"attr_{name}" for name in self._features)
+        self.fields = BASE_FIELDS + self.extras + (scores if include_scores else ())
+        self._include_scores = include_scores
+        self._values = struct.Struct(f"<{len(self.fields)}f")
+        self._nan_scores = (math.nan,) * len(scores)
+
+    @property
+    def record_size(self) -> int:
+        return RECORD_PREFIX.size + self._values.size
+
+    def schema(self, batch: int = 1) -> str:
+        """Header message sent as text before the first binary frame."""
+        return json.dumps({
+            "type": "schema",
+            "format": "binary",
+            "version": VERSION,
+            "fields": list(self.fields),
+            "detectors": list(self.detectors) if self._include_scores else [],
+            "attribution": self.attribution,
+            "flags": {"detection": FLAG_DETECTION, "exceed": FLAG_EXCEED, "alarm": FLAG_ALARM},
+            "header": HEADER.format,
+            "record": RECORD_PREFIX.format + self._values.format[1:],
+            "batch": batch,
+        })
+
+    def record(self, metric: MetricSnapshot, detection: Optional[DetectionResult] = None) -> Record:
+        values = [metric.cpu, metric.mem, metric.netInBps, metric.netOutBps, metric.diskReadBps, metric.diskWriteBps]
+        values += [metric.extra.get(name, math.nan) for name in self.extras]
+        flags = 0
+        if self._include_scores:
+            if detection is None:
+                values += self._nan_scores
+            else:
+                values += score_values(detection, self.detectors)
+                values += [detection.attribution.get(name, math.nan) for name in self._features]
+                flags = FLAG_DETECTION | (FLAG_EXCEED if detection.exceed else 0) | (FLAG_ALARM if detection.alarm else 0)
+        epoch = datetime.fromisoformat(metric.ts).timestamp()
+        return epoch, bytes((flags,)) + self._values.pack(*values)
+
+    def pack(self, records: List[Record]) -> bytes:
+        """One binary message carrying ``records`` in order."""
+        t0 = records[0][0]
+        parts = [HEADER.pack(VERSION, 0, len(records), t0)]
+        for epoch, body in records:
+            parts.append(struct.pack("<I", max(0, round((epoch - t0) * 1e3))))
+            parts.append(body)
+        return b"".join(parts)
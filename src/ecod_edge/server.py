@@ -3,15 +3,36 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-from typing import Set
+import math
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
+from dotenv import load_dotenv
+
+# Settings come from .env (existing environment variables win), loaded before
+# ecod_edge.config reads them
+load_dotenv()
 
 from ecod_edge.config import config
-from ecod_edge.metrics import MetricsCollector, MetricSnapshot
-from ecod_edge.inference import RealtimeDetector, DetectionResult
+from ecod_edge.checkpoint import load_checkpoint, prefixed, save_checkpoint, unprefixed
+from ecod_edge.metrics import BASE_FEATURES, MetricSnapshot, make_collector
+from ecod_edge.inference import DetectionExecutor, DetectionResult
+from ecod_edge.gateway import TerminalRegistry
+from ecod_edge.ingest import FEATURE_DIM, IngestBody, IngestPipeline, ingest_body
+from ecod_edge.telemetry import PrometheusText, StageTimings
+from ecod_edge.protocol import FORMATS, MAX_BATCH, BinaryCodec
+from ecod_edge.history import HistoryStore
+from ecod_edge.alerts import AlarmTransitions, AlertDispatcher, make_sink
+from ecod_edge.fanout import FramePublisher, FrameSubscriber
 
 # Configure logging
 logging.basicConfig(
@@ -22,33 +43,324 @@ logger = logging.getLogger(__name__)
 
 # Connection manager for multiple WebSocket clients
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+    """Fans frames out to clients through bounded per-client send queues.
+
+    ``broadcast`` never awaits a socket: a client whose queue is full has its
+    oldest pending frame skipped, so one slow consumer cannot stall the others.
+    Each client chooses a wire format (see ecod_edge.protocol); ``encode``
+    serializes a frame once per format in use, not once per client. With a
+    ``publisher`` (the hub role) every frame's JSON is also published to the
+    worker processes.
+    """
 
-    async def connect(self, websocket: WebSocket):
+    def __init__(self, queue_size: int = 8, codec: BinaryCodec | None = None, publisher: FramePublisher | None = None):
+        self.queue_size = queue_size
+        self.codec = codec or BinaryCodec()
+        self.publisher = publisher
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        self.formats: Dict[WebSocket, str] = {}
+        self.dropped_frames = 0
+
+    async def connect(self, websocket: WebSocket, fmt: str = "json") -> asyncio.Queue:
         await websocket.accept()
-        self.active_connections.add(websocket)
-        logger.info(f"Client connected. Total connections: {len(self.active_connections)}")
+        return self.register(websocket, fmt)
+
+    def register(self, websocket: WebSocket, fmt: str = "json") -> asyncio.Queue:
+        """Start queueing broadcasts for an accepted socket."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.active_connections[websocket] = queue
+        self.formats[websocket] = fmt
+        logger.info(f"Client connected ({fmt}). Total connections: {len(self.active_connections)}")
+        return queue
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
-        logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
+        self.formats.pop(websocket, None)
+        if self.active_connections.pop(websocket, None) is not None:
+            logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
+
+    def encode(self, metric: MetricSnapshot, detection: DetectionResult | None = None,
+               text: str | None = None) -> Dict[str, object]:
+        """Serialize a frame for each wire format a connected client uses; ``text`` is its JSON if already serialized."""
+        in_use = set(self.formats.values())
+        frame: Dict[str, object] = {}
+        if "json" in in_use or self.publisher is not None:
+            frame["json"] = text or json.dumps(metric_to_dict(metric, detection))
+        if "binary" in in_use:
+            frame["binary"] = self.codec.record(metric, detection)
+        return frame
+
+    async def broadcast(self, frame: Dict[str, object]):
+        """Broadcast an encoded frame to all connected clients."""
+        if self.publisher is not None:
+            self.publisher.publish(frame["json"])
+        for websocket, queue in self.active_connections.items():
+            item = frame.get(self.formats[websocket])
+            if item is None:
+                continue
+            if queue.full():
+                # Skip the stalest frame rather than block the broadcaster
+                queue.get_nowait()
+                self.dropped_frames += 1
+            queue.put_nowait(item)
+
+# A worker relays frames the hub process collected and scored (see fanout);
+# the hub alone owns detector state, alert sinks, checkpoints and rollups
+WORKER = config.SERVER_ROLE == "worker"
+
+manager = ConnectionManager(
+    queue_size=config.CLIENT_QUEUE_SIZE,
+    codec=BinaryCodec(extras=config.COLLECTOR_EXTRAS, include_scores=config.INCLUDE_SCORES,
+                      detectors=config.DETECTORS, attribution=config.ATTRIBUTION),
+    publisher=FramePublisher(
+        config.HUB_SOCKET,
+        queue_size=config.HUB_QUEUE_SIZE,
+        backfill=lambda: [json.dumps(metric_to_dict(m, d)) for m, d in history.recent(config.HISTORY_BACKFILL)],
+    ) if config.SERVER_ROLE == "hub" else None,
+)
+
+# Recent frames for range queries and dashboard backfill
+history = HistoryStore(
+    extras=config.COLLECTOR_EXTRAS,
+    raw_size=config.HISTORY_SIZE,
+    directory=config.HISTORY_DIR or None,
+    rollups=config.HISTORY_ROLLUPS,
+    read_only=WORKER,
+    detectors=config.DETECTORS,
+)
+
+# Alarm transitions, delivered to the configured sinks off the detection path
+alerts = AlertDispatcher(
+    [make_sink(spec) for spec in config.ALERT_SINKS] if not WORKER else [],
+    queue_size=config.ALERT_QUEUE_SIZE,
+    max_batch=config.ALERT_MAX_BATCH,
+    linger=config.ALERT_LINGER,
+    retries=config.ALERT_RETRIES,
+)
+transitions = AlarmTransitions()
+
+# Scores frames pushed by edge agents (one detector state per terminal)
+ingest = IngestPipeline(
+    TerminalRegistry(
+        dim=FEATURE_DIM,
+        window=config.WINDOW,
+        baseline=config.BASELINE,
+        threshold_pct=config.THRESHOLD_PCT,
+        sustain=config.SUSTAIN,
+    ),
+    queue_size=config.INGEST_QUEUE_SIZE,
+    max_batch=config.INGEST_MAX_BATCH,
+    executor=ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest"),
+    alerts=alerts,
+)
+
+def _finite(value: float) -> float | None:
+    """JSON has no NaN: scores a detector did not produce (not configured, gated off) become null."""
+    return None if math.isnan(value) else value
+
+def metric_to_dict(metric: MetricSnapshot, detection: DetectionResult | None = None) -> dict:
+    """Convert metric snapshot and optional detection result to dictionary."""
+    data = {
+        "ts": metric.ts,
+        "cpu": metric.cpu,
+        "mem": metric.mem,
+        "netInBps": metric.netInBps,
+        "netOutBps": metric.netOutBps,
+        "diskReadBps": metric.diskReadBps,
+        "diskWriteBps": metric.diskWriteBps,
+        **metric.extra,
+    }
+
+    if detection is not None:
+        data.update({
+            "score_ecod": _finite(detection.score_ecod),
+            "score_iforest": _finite(detection.score_iforest),
+            "scores": {name: _finite(s) for name, s in detection.scores.items()},
+            "score_ens": detection.score_ens,
+            "threshold": detection.threshold,
+            "exceed": detection.exceed,
+            "alarm": detection.alarm,
+        })
+        if detection.attribution:
+            data["attribution"] = detection.attribution
+
+    return data
+
+def metric_from_dict(data: dict) -> Tuple[MetricSnapshot, DetectionResult | None]:
+    """Inverse of ``metric_to_dict``, for frames relayed from the hub (null scores become NaN)."""
+    metric = MetricSnapshot(
+        data["ts"], data["cpu"], data["mem"], data["netInBps"], data["netOutBps"], data["diskReadBps"], data["diskWriteBps"],
+        extra={name: data[name] for name in config.COLLECTOR_EXTRAS if name in data},
+    )
+    if "score_ens" not in data:
+        return metric, None
+    nan = lambda value: math.nan if value is None else value
+    detection = DetectionResult(
+        nan(data["score_ecod"]), nan(data["score_iforest"]), data["score_ens"], data["threshold"],
+        data["exceed"], data["alarm"],
+        scores={name: nan(s) for name, s in data["scores"].items()},
+        attribution=data.get("attribution", {}),
+    )
+    return metric, detection
+
+class LoopMonitor:
+    """Event-loop responsiveness: lag of a periodic probe and sampler tick lateness."""
+
+    def __init__(self, probe_interval: float = 0.25):
+        self.probe_interval = probe_interval
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.tick_lateness_ms = 0.0
+        self.late_ticks = 0
+        self.skipped_detections = 0
+        self.detection_backlog = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.probe_interval)
+            self.lag_ms = max(0.0, (loop.time() - start - self.probe_interval) * 1e3)
+            self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+
+    def stats(self) -> dict:
+        return {
+            "lag_ms": self.lag_ms,
+            "max_lag_ms": self.max_lag_ms,
+            "tick_lateness_ms": self.tick_lateness_ms,
+            "late_ticks": self.late_ticks,
+            "skipped_detections": self.skipped_detections,
+        }
+
+monitor = LoopMonitor()
+
+# Server-side stage latencies (collect, detect, serialize, send); the detector keeps its own
+timings = StageTimings(enabled=config.METRICS_ENABLED)
+
+async def detection_loop(frames: asyncio.Queue[MetricSnapshot], detector: DetectionExecutor | None):
+    """Score sampled frames in order on the detection worker and broadcast them."""
+    while True:
+        metric = await frames.get()
+        t = time.perf_counter()
+
+        # Optional: run detection
+        detection: DetectionResult | None = None
+        if detector is not None:
+            try:
+                detection = await detector.process(metric)
+            except Exception as e:
+                logger.error(f"Detection error: {e}")
+            t = timings.lap("detect", t)
+            if detection is not None and alerts:
+                alert = transitions.update("local", metric.ts, detection.alarm, detection.score_ens,
+                                           detection.threshold, detection.scores, detection.attribution)
+                if alert is not None:
+                    alerts.publish(alert)
+
+        frame = manager.encode(metric, detection)
+        t = timings.lap("serialize", t)
+        await manager.broadcast(frame)
+        history.append(metric, detection)
+        timings.lap("history", t)
+
+async def relay_frame(text: str):
+    """A worker's detection_loop: broadcast and record one frame the hub scored.
+
+    Backfill sent on (re)subscribing overlaps frames already in the ring and is
+    skipped; the tolerance covers the microseconds the ring's float
+    timestamps can lose.
+    """
+    t = time.perf_counter()
+    metric, detection = metric_from_dict(json.loads(text))
+    if datetime.fromisoformat(metric.ts).timestamp() <= history.last_ts + 1e-3:
+        return
+    frame = manager.encode(metric, detection, text=text.rstrip("\n"))
+    t = timings.lap("serialize", t)
+    await manager.broadcast(frame)
+    history.append(metric, detection)
+    timings.lap("history", t)
+
+subscriber = FrameSubscriber(config.HUB_SOCKET, relay_frame) if WORKER else None
+
+async def sampling_loop(detector: DetectionExecutor | None):
+    """Single shared collector on a fixed cadence; detection runs off the event loop.
+
+    Ticks are scheduled against the loop clock rather than sleeping a full
+    interval after the work, so detection time never stretches the cadence.
+    A tick that wakes a whole interval late is counted and the schedule is
+    realigned instead of bursting to catch up.
+    """
+    collector = make_collector(
+        config.COLLECTOR_BACKEND,
+        nics=config.COLLECTOR_NICS or None,
+        disks=config.COLLECTOR_DISKS or None,
+        extras=config.COLLECTOR_EXTRAS,
+    )
+    logger.info(f"Metrics collector: {type(collector).__name__}")
+    frames: asyncio.Queue[MetricSnapshot] = asyncio.Queue(maxsize=config.DETECTION_BACKLOG)
+    worker = asyncio.create_task(detection_loop(frames, detector))
+    loop = asyncio.get_running_loop()
+    interval = config.SAMPLE_INTERVAL
+    next_tick = loop.time()
+    try:
+        while True:
+            lateness = loop.time() - next_tick
+            monitor.tick_lateness_ms = lateness * 1e3
+            if lateness >= interval:
+                monitor.late_ticks += 1
+                next_tick = loop.time()
 
-    async def broadcast(self, message: str):
-        """Broadcast message to all connected clients."""
-        disconnected = set()
-        for connection in self.active_connections:
             try:
-                await connection.send_text(message)
+                t = time.perf_counter()
+                metric = collector.collect()
+                timings.lap("collect", t)
+                if frames.full():
+                    # Detection is behind; skip its stalest frame
+                    frames.get_nowait()
+                    monitor.skipped_detections += 1
+                frames.put_nowait(metric)
+                monitor.detection_backlog = frames.qsize()
             except Exception as e:
-                logger.error(f"Error sending to client: {e}")
-                disconnected.add(connection)
+                logger.error(f"Sampling error: {e}")
 
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+            # Wait for next sample
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    finally:
+        worker.cancel()
+        collector.close()
+
+async def restore_checkpoint(detector: DetectionExecutor | None):
+    """Warm-start detector and gateway state from CHECKPOINT_PATH, if present."""
+    state = await asyncio.get_running_loop().run_in_executor(None, load_checkpoint, config.CHECKPOINT_PATH)
+    if state is None:
+        return
+    parts = [("gateway", ingest)]
+    if detector is not None:
+        parts.append(("detector", detector))
+    for prefix, owner in parts:
+        sub = unprefixed(prefix, state)
+        if not sub:
+            continue
+        try:
+            await owner.load_state(sub)
+            logger.info(f"Restored {prefix} state from {config.CHECKPOINT_PATH}")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Not restoring {prefix} state: {e}")
+
+async def write_checkpoint(detector: DetectionExecutor | None):
+    """Snapshot on the detection workers, then write the file on a separate thread."""
+    state = prefixed("gateway", await ingest.state_dict())
+    if detector is not None:
+        state.update(prefixed("detector", await detector.state_dict()))
+    await asyncio.get_running_loop().run_in_executor(None, save_checkpoint, config.CHECKPOINT_PATH, state)
 
-manager = ConnectionManager()
+async def checkpoint_loop(detector: DetectionExecutor | None):
+    while True:
+        await asyncio.sleep(config.CHECKPOINT_INTERVAL)
+        try:
+            await write_checkpoint(detector)
+        except Exception as e:
+            logger.error(f"Checkpoint error: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -59,15 +371,92 @@ async def lifespan(app: FastAPI):
     if config.INCLUDE_SCORES:
         logger.info(f"Window: {config.WINDOW}, Baseline: {config.BASELINE}, "
                    f"Threshold: {config.THRESHOLD_PCT}%, Sustain: {config.SUSTAIN}, "
-                   f"Ensemble: {config.ENSEMBLE}")
+                   f"Detectors: {','.join(config.DETECTORS)}, Ensemble: {config.ENSEMBLE}")
+    logger.info(f"Detection executor: {config.DETECTION_EXECUTOR}")
+    if alerts:
+        logger.info(f"Alert sinks: {', '.join(alerts.stats())}")
+
+    detector: DetectionExecutor | None = None
+    if config.INCLUDE_SCORES:
+        detector = DetectionExecutor(
+            kind=config.DETECTION_EXECUTOR,
+            window=config.WINDOW,
+            baseline=config.BASELINE,
+            threshold_pct=config.THRESHOLD_PCT,
+            sustain=config.SUSTAIN,
+            ensemble=config.ENSEMBLE,
+            detectors=config.DETECTORS,
+            ensemble_weights=config.ENSEMBLE_WEIGHTS or None,
+            gate_pct=config.GATE_PCT,
+            normalize=config.NORMALIZE,
+            normalize_history=config.NORMALIZE_HISTORY or None,
+            iforest_retrain_every=config.IFOREST_RETRAIN_EVERY,
+            iforest_reservoir=config.IFOREST_RESERVOIR,
+            iforest_drift_z=config.IFOREST_DRIFT_Z,
+            threshold_mode=config.THRESHOLD_MODE,
+            threshold_params={
+                "drift_threshold": config.THRESHOLD_DRIFT,
+                "seasonal_slots": config.THRESHOLD_SEASONAL_SLOTS,
+            },
+            attribution=config.ATTRIBUTION,
+            iforest_attribution=config.IFOREST_ATTRIBUTION,
+            dim=len(BASE_FEATURES) + len(config.COLLECTOR_EXTRAS),
+            stage_timings=config.METRICS_ENABLED,
+        )
+    app.state.detector = detector
+
+    tasks = []
+    if config.CHECKPOINT_PATH:
+        await restore_checkpoint(detector)
+        tasks.append(asyncio.create_task(checkpoint_loop(detector)))
+    tasks.append(asyncio.create_task(sampling_loop(detector)))
+    tasks.append(asyncio.create_task(monitor.run()))
+    await alerts.start()
+    await ingest.start()
+    if manager.publisher is not None:
+        await manager.publisher.start()
     yield
     logger.info("Shutting down Real-time Monitoring Server")
+    if manager.publisher is not None:
+        await manager.publisher.stop()
+    await ingest.stop()
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    if config.CHECKPOINT_PATH:
+        try:
+            await write_checkpoint(detector)
+        except Exception as e:
+            logger.error(f"Checkpoint error: {e}")
+    await alerts.stop()
+    if detector is not None:
+        detector.close()
+    history.close()
+
+@asynccontextmanager
+async def worker_lifespan(app: FastAPI):
+    """Worker role: no collector or detector here, only clients fed from the hub's frames."""
+    logger.info(f"Starting Real-time Monitoring Server worker (hub: {config.HUB_SOCKET})")
+    app.state.detector = None
+    tasks = [asyncio.create_task(subscriber.run()), asyncio.create_task(monitor.run())]
+    yield
+    logger.info("Shutting down Real-time Monitoring Server worker")
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    history.close()
 
 # Create FastAPI app
 app = FastAPI(
     title="Real-time System Monitoring API",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=worker_lifespan if WORKER else lifespan
 )
 
 # Add CORS middleware
@@ -79,83 +468,142 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    """422 without echoing inputs: a rejected NaN/inf is not valid JSON."""
+    errors = [{k: v for k, v in e.items() if k not in ("input", "ctx", "url")} for e in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": errors})
+
 @app.get("/healthz")
 async def healthcheck():
     """Health check endpoint."""
     return {
         "status": "healthy",
         "active_connections": len(manager.active_connections),
+        "dropped_frames": manager.dropped_frames,
+        "ingest": ingest.stats(),
+        "alerts": alerts.stats(),
+        "loop": monitor.stats(),
+        "hub": manager.publisher.stats() if manager.publisher else subscriber.stats() if subscriber else None,
         "config": {
+            "role": config.SERVER_ROLE,
             "sample_interval": config.SAMPLE_INTERVAL,
             "include_scores": config.INCLUDE_SCORES,
         }
     }
 
-def metric_to_dict(metric: MetricSnapshot, detection: DetectionResult | None = None) -> dict:
-    """Convert metric snapshot and optional detection result to dictionary."""
-    data = {
-        "ts": metric.ts,
-        "cpu": metric.cpu,
-        "mem": metric.mem,
-        "netInBps": metric.netInBps,
-        "netOutBps": metric.netOutBps,
-        "diskReadBps": metric.diskReadBps,
-        "diskWriteBps": metric.diskWriteBps,
-    }
+if config.METRICS_ENABLED:
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        """Prometheus text exposition: stage latencies, queue depths, drops and loop lag."""
+        stages = timings.snapshot()
+        detector: DetectionExecutor | None = app.state.detector
+        if detector is not None:
+            stages.update(await detector.stage_timings())
+        ingest_stats = ingest.stats()
 
-    if detection is not None:
-        data.update({
-            "score_ecod": detection.score_ecod,
-            "score_iforest": detection.score_iforest,
-            "score_ens": detection.score_ens,
-            "threshold": detection.threshold,
-            "exceed": detection.exceed,
-            "alarm": detection.alarm,
-        })
+        out = PrometheusText()
+        out.histograms("stage_seconds", "Latency of each hot-path stage.", "stage", stages)
+        out.gauge("ws_clients", "Connected /ws/metrics clients.", len(manager.active_connections))
+        out.gauge("ws_queue_depth_max", "Deepest per-client send queue.",
+                  max((q.qsize() for q in manager.active_connections.values()), default=0))
+        out.counter("ws_dropped_frames", "Frames skipped for slow WebSocket clients.", manager.dropped_frames)
+        out.gauge("detection_queue_depth", "Sampled frames waiting for detection.", monitor.detection_backlog)
+        out.counter("skipped_detections", "Sampled frames dropped because detection was behind.", monitor.skipped_detections)
+        out.counter("late_ticks", "Sampler ticks that woke a whole interval late.", monitor.late_ticks)
+        out.gauge("loop_lag_seconds", "Latest event-loop lag probe.", monitor.lag_ms / 1e3)
+        out.gauge("loop_lag_max_seconds", "Largest event-loop lag seen.", monitor.max_lag_ms / 1e3)
+        if manager.publisher is not None:
+            hub = manager.publisher.stats()
+            out.gauge("hub_subscribers", "Worker processes subscribed to the hub's frames.", hub["subscribers"])
+            out.gauge("hub_queue_depth_max", "Deepest per-worker send queue.", hub["queue_depth_max"])
+            out.counter("hub_dropped_frames", "Frames skipped for slow workers.", hub["dropped_frames"])
+        if subscriber is not None:
+            hub = subscriber.stats()
+            out.gauge("hub_connected", "Whether this worker is subscribed to the hub.", int(hub["connected"]))
+            out.counter("hub_frames_received", "Frames relayed from the hub.", hub["received"])
+            out.counter("hub_reconnects", "Times the hub subscription was lost.", hub["reconnects"])
+        out.gauge("ingest_queue_depth", "Pending ingest requests.", ingest_stats["queue_depth"])
+        out.gauge("ingest_terminals", "Terminals tracked by the ingest gateway.", ingest_stats["terminals"])
+        out.counter("ingest_frames_scored", "Pushed frames scored.", ingest_stats["frames_scored"])
+        out.counter("ingest_frames_rejected", "Pushed frames rejected with 503.", ingest_stats["frames_rejected"])
+        sinks = alerts.stats()
+        out.counter("alerts_published", "Alarm transitions published to the alert sinks.", alerts.published)
+        out.labelled("gauge", "alert_queue_depth", "Alerts waiting for each sink.", "sink",
+                     {name: st["queue_depth"] for name, st in sinks.items()})
+        out.labelled("counter", "alerts_delivered", "Alerts written by each sink.", "sink",
+                     {name: st["delivered"] for name, st in sinks.items()})
+        out.labelled("counter", "alerts_dropped", "Alerts a sink lost to a full queue or exhausted retries.", "sink",
+                     {name: st["dropped"] for name, st in sinks.items()})
+        out.labelled("counter", "alert_write_failures", "Failed sink write attempts.", "sink",
+                     {name: st["failures"] for name, st in sinks.items()})
+        out.labelled("gauge", "alerts_per_second", "Rolling alert delivery rate of each sink.", "sink",
+                     {name: st["alerts_per_sec"] for name, st in sinks.items()})
+        return Response(out.render(), media_type=PrometheusText.CONTENT_TYPE)
 
-    return data
+@app.get("/history")
+async def history_range(
+    start: float | None = None,
+    end: float | None = None,
+    resolution: int | None = None,
+    agg: str = "mean",
+    max_points: int = 2000,
+):
+    """Frames in [start, end] (epoch seconds; default the last hour) as columns.
+
+    Without ``resolution`` the raw ring is used when it covers the range in at
+    most ``max_points`` rows, else the finest on-disk rollup that does.
+    """
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    try:
+        result = history.query(start, end, resolution=resolution, agg=agg, max_points=max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = {
+        name: (np.where(np.isnan(col), None, col).tolist() if name != "resolution" else col)
+        for name, col in result.items()
+    }
+    # Serialized directly: FastAPI's encoder is slow on long columns
+    return Response(json.dumps(body), media_type="application/json")
 
 @app.websocket("/ws/metrics")
-async def websocket_metrics(websocket: WebSocket):
-    """WebSocket endpoint for real-time metrics streaming."""
-    await manager.connect(websocket)
+async def websocket_metrics(websocket: WebSocket, format: str = "json", batch: int = 1):
+    """WebSocket endpoint for real-time metrics streaming.
 
-    # Initialize collector and optional detector
-    collector = MetricsCollector()
-    detector: RealtimeDetector | None = None
-
-    if config.INCLUDE_SCORES:
-        detector = RealtimeDetector(
-            window=config.WINDOW,
-            baseline=config.BASELINE,
-            threshold_pct=config.THRESHOLD_PCT,
-            sustain=config.SUSTAIN,
-            ensemble=config.ENSEMBLE,
-        )
-        logger.info("Detection enabled for this connection")
+    ``?format=json`` (default) sends one JSON object per frame. ``?format=binary``
+    sends a JSON schema message, then packed records (ecod_edge.protocol),
+    ``batch`` frames per message.
+    """
+    if format not in FORMATS:
+        await websocket.close(code=1008, reason=f"format must be one of {FORMATS}")
+        return
+    batch = min(max(batch, 1), MAX_BATCH)
+    await websocket.accept()
+    # Read the backfill and register in one step, so no frame is missed or sent twice
+    backfill = history.recent(config.HISTORY_BACKFILL)
+    queue = manager.register(websocket, format)
 
     try:
+        if format == "binary":
+            await websocket.send_text(manager.codec.schema(batch))
+            records = [manager.codec.record(m, d) for m, d in backfill]
+            for i in range(0, len(records), MAX_BATCH):
+                await websocket.send_bytes(manager.codec.pack(records[i:i + MAX_BATCH]))
+        elif backfill:
+            await websocket.send_text(json.dumps({"type": "backfill", "frames": [metric_to_dict(m, d) for m, d in backfill]}))
         while True:
-            # Collect metrics
-            metric = collector.collect()
-
-            # Optional: run detection
-            detection: DetectionResult | None = None
-            if detector is not None:
-                detection = detector.process(metric)
-
-            # Convert to JSON and send
-            data = metric_to_dict(metric, detection)
-            message = json.dumps(data)
-
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                logger.error(f"Error sending message: {e}")
-                break
-
-            # Wait for next sample
-            await asyncio.sleep(config.SAMPLE_INTERVAL)
+            item = await queue.get()
+            t = time.perf_counter()
+            if format == "json":
+                await websocket.send_text(item)
+            else:
+                records = [item]
+                while len(records) < batch:
+                    records.append(await queue.get())
+                    t = time.perf_counter()
+                await websocket.send_bytes(manager.codec.pack(records))
+            timings.lap("send", t)
 
     except WebSocketDisconnect:
         logger.info("Client disconnected normally")
@@ -163,3 +611,40 @@ async def websocket_metrics(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}")
     finally:
         manager.disconnect(websocket)
+
+# Pushed frames are scored where their terminals' detector state lives: the hub
+if not WORKER:
+    @app.post("/ingest")
+    async def ingest_frames(body: IngestBody):
+        """Score one frame or a batch of frames pushed by edge agents."""
+        frames = body if isinstance(body, list) else [body]
+        try:
+            future = ingest.submit_nowait(frames)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Ingest queue full", headers={"Retry-After": "1"})
+        return {"results": await future}
+
+    @app.websocket("/ws/ingest")
+    async def websocket_ingest(websocket: WebSocket):
+        """Persistent ingest: each message is a frame or a batch; each reply carries its results.
+
+        Messages are handled one at a time and the queue put is awaited, so a
+        saturated gateway stops reading from the socket instead of buffering.
+        """
+        await websocket.accept()
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    body = ingest_body.validate_json(text)
+                except ValidationError as e:
+                    await websocket.send_text(json.dumps({"error": e.errors(include_url=False, include_context=False, include_input=False)}))
+                    continue
+                frames = body if isinstance(body, list) else [body]
+                future = await ingest.submit(frames)
+                await websocket.send_text(json.dumps({"results": await future}))
+
+        except WebSocketDisconnect:
+            logger.info("Ingest client disconnected normally")
+        except Exception as e:
+            logger.error(f"Ingest WebSocket error: {e}")
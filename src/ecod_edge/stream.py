@@ -1,26 +1,273 @@
 
 from __future__ import annotations
-import time, csv
-from typing import Iterator, List, Tuple
+import os, time, csv
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence, Tuple
 import numpy as np
 
-def iter_csv_rows(path: str, interval: float = 0.0) -> Iterator[Tuple[str, List[float]]]:
+# Input formats by file extension. The first column is the timestamp, the rest numeric features.
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet", ".pq": "parquet",
+    ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow",
+    ".npy": "npy",
+}
+
+Chunk = Tuple[List[str], np.ndarray]
+
+def input_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"unsupported input {path!r}; expected one of {sorted(FORMATS)}")
+    return FORMATS[ext]
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow input needs pyarrow: pip install 'pos-ecod-edge-ensemble[arrow]'") from e
+    return pyarrow
+
+def _select(names: Sequence[str], features: Optional[Sequence[str]], path: str) -> Tuple[str, List[str]]:
+    """(ts column, feature columns): features default to every column after the first."""
+    cols = list(features) if features else list(names[1:])
+    missing = [c for c in cols if c not in names]
+    if missing:
+        raise ValueError(f"features {missing} not in {path} (columns: {list(names)})")
+    return names[0], cols
+
+def iter_csv_rows(path: str, interval: float = 0.0, features: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, List[float]]]:
     """Yield (timestamp, features[]) row by row. Assumes first column is ts, rest numeric."""
     with open(path, newline="") as f:
         reader = csv.reader(f)
         header = next(reader)
+        _, cols = _select(header, features, path)
+        idx = [header.index(c) for c in cols]
         for row in reader:
             ts = row[0]
-            feats = [float(x) for x in row[1:]]
+            feats = [float(row[i]) for i in idx]
+            yield ts, feats
+            if interval > 0:
+                time.sleep(interval)
+
+def _csv_chunks(path: str, features, chunk_size: int) -> Iterator[Chunk]:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        _, cols = _select(header, features, path)
+        idx = [header.index(c) for c in cols]
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            # only the selected cells are converted
+            yield [row[0] for row in rows], np.array([[row[i] for i in idx] for row in rows], dtype=np.float64)
+
+def _arrow_chunk(batch, cols: List[str]) -> Chunk:
+    """(ts strings, float64 matrix) from a record batch whose first column is ts."""
+    ts_col = batch.column(0)
+    if hasattr(ts_col.type, "unit"):  # timestamp / date types
+        ts = [t.isoformat() if t is not None else "" for t in ts_col.to_pylist()]
+    else:
+        ts = [str(t) for t in ts_col.to_pylist()]
+    X = np.empty((batch.num_rows, len(cols)), dtype=np.float64)
+    for j in range(len(cols)):
+        X[:, j] = batch.column(j + 1).to_numpy(zero_copy_only=False)
+    return ts, X
+
+def _parquet_chunks(path: str, features, chunk_size: int) -> Iterator[Chunk]:
+    pa = _pyarrow()
+    pf = pa.parquet.ParquetFile(path)
+    ts_col, cols = _select(pf.schema_arrow.names, features, path)
+    # only the selected column chunks are read and decoded
+    for batch in pf.iter_batches(batch_size=chunk_size, columns=[ts_col] + cols):
+        yield _arrow_chunk(batch, cols)
+
+def _arrow_chunks(path: str, features, chunk_size: int) -> Iterator[Chunk]:
+    pa = _pyarrow()
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        ts_col, cols = _select(reader.schema.names, features, path)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select([ts_col] + cols)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield _arrow_chunk(batch.slice(start, chunk_size), cols)
+
+def _npy_header(f):
+    version = np.lib.format.read_magic(f)
+    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+    shape, fortran, dtype = read_header(f)
+    if fortran:
+        raise ValueError("Fortran-ordered .npy input is not supported")
+    return shape, dtype
+
+def _npy_chunks(path: str, features, chunk_size: int) -> Iterator[Chunk]:
+    """Structured arrays (as written by ``convert``) by field name; plain 2-D arrays as columns c0.. with row-number ts."""
+    with open(path, "rb") as f:
+        shape, dtype = _npy_header(f)
+        if dtype.names:
+            ts_col, cols = _select(dtype.names, features, path)
+        else:
+            _, cols = _select(["ts"] + [f"c{j}" for j in range(shape[1])], features, path)
+            idx = [int(c[1:]) for c in cols]
+        n, row = shape[0], 0
+        # raw reads of the file in order: nothing to parse, and only one chunk resident
+        while row < n:
+            count = min(chunk_size, n - row)
+            if dtype.names:
+                block = np.fromfile(f, dtype=dtype, count=count)
+                ts = [t.decode() if isinstance(t, bytes) else str(t) for t in block[ts_col].tolist()]
+                X = np.empty((count, len(cols)), dtype=np.float64)
+                for j, c in enumerate(cols):
+                    X[:, j] = block[c]
+            else:
+                block = np.fromfile(f, dtype=dtype, count=count * shape[1]).reshape(count, shape[1])
+                ts = [str(i) for i in range(row, row + count)]
+                X = block[:, idx].astype(np.float64)
+            yield ts, X
+            row += count
+
+def input_columns(path: str, features: Optional[Sequence[str]] = None) -> List[str]:
+    """The ts column name followed by the selected feature columns."""
+    fmt = input_format(path)
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            names = next(csv.reader(f))
+    elif fmt == "parquet":
+        names = _pyarrow().parquet.ParquetFile(path).schema_arrow.names
+    elif fmt == "arrow":
+        pa = _pyarrow()
+        with pa.memory_map(path, "r") as source:
+            names = pa.ipc.open_file(source).schema.names
+    else:
+        with open(path, "rb") as f:
+            shape, dtype = _npy_header(f)
+        names = list(dtype.names) if dtype.names else ["ts"] + [f"c{j}" for j in range(shape[1])]
+    ts_col, cols = _select(names, features, path)
+    return [ts_col] + cols
+
+_CHUNKERS = {"csv": _csv_chunks, "parquet": _parquet_chunks, "arrow": _arrow_chunks, "npy": _npy_chunks}
+
+def iter_chunks(path: str, features: Optional[Sequence[str]] = None, chunk_size: int = 65536) -> Iterator[Chunk]:
+    """Yield (timestamps, float64 matrix) blocks of at most chunk_size rows, reading only ``features`` columns."""
+    yield from _CHUNKERS[input_format(path)](path, features, chunk_size)
+
+def iter_rows(
+    path: str,
+    interval: float = 0.0,
+    features: Optional[Sequence[str]] = None,
+    chunk_size: int = 65536,
+) -> Iterator[Tuple[str, np.ndarray]]:
+    """Row-by-row replay of any supported input, read chunk_size rows at a time (memory stays flat)."""
+    for ts_chunk, X in iter_chunks(path, features, chunk_size):
+        for ts, feats in zip(ts_chunk, X):
             yield ts, feats
             if interval > 0:
                 time.sleep(interval)
 
-def windowed_vectors(rows: Iterator[Tuple[str, List[float]]], window: int):
-    buf_ts, buf = [], []
+def load_array(path: str, features: Optional[Sequence[str]] = None, chunk_size: int = 65536) -> Chunk:
+    """Read a whole input as (timestamps, float64 matrix)."""
+    ts: List[str] = []
+    chunks: List[np.ndarray] = []
+    for ts_chunk, X in iter_chunks(path, features, chunk_size):
+        ts.extend(ts_chunk)
+        chunks.append(X)
+    if not chunks:
+        return ts, np.empty((0, len(input_columns(path, features)) - 1), dtype=np.float64)
+    return ts, np.concatenate(chunks, axis=0)
+
+def load_csv_array(path: str, chunk_size: int = 65536, features: Optional[Sequence[str]] = None) -> Chunk:
+    """Read the whole CSV as (timestamps, float64 matrix), parsing chunk_size rows at a time."""
+    return load_array(path, features, chunk_size)
+
+def convert(src: str, dst: str, features: Optional[Sequence[str]] = None, chunk_size: int = 65536) -> int:
+    """Convert any supported input to .npy, Parquet or Arrow/Feather (by ``dst`` extension); returns rows written.
+
+    .npy output is a structured array (ts as fixed-width bytes, one float64
+    field per feature), the fastest to replay: reads are raw, with no parsing.
+    """
+    fmt = input_format(dst)
+    if fmt == "csv":
+        raise ValueError("convert writes .npy, Parquet or Arrow/Feather, not CSV")
+
+    names = input_columns(src, features)
+    if fmt == "npy":
+        # one pass to size the array and the ts field, one to fill it
+        n, width = 0, 1
+        for ts, _ in iter_chunks(src, features, chunk_size):
+            n += len(ts)
+            width = max(width, max((len(t.encode()) for t in ts), default=1))
+        dtype = np.dtype([(names[0], f"S{width}")] + [(c, "<f8") for c in names[1:]])
+        out = np.lib.format.open_memmap(dst, mode="w+", dtype=dtype, shape=(n,))
+        row = 0
+        for ts, X in iter_chunks(src, features, chunk_size):
+            block = out[row:row + len(ts)]
+            block[names[0]] = [t.encode() for t in ts]
+            for j, c in enumerate(names[1:]):
+                block[c] = X[:, j]
+            row += len(ts)
+        out.flush()
+        del out
+        return row
+
+    pa = _pyarrow()
+    schema = pa.schema([(names[0], pa.string())] + [(c, pa.float64()) for c in names[1:]])
+    writer = pa.parquet.ParquetWriter(dst, schema) if fmt == "parquet" else pa.ipc.new_file(dst, schema)
+    rows = 0
+    try:
+        for ts, X in iter_chunks(src, features, chunk_size):
+            arrays = [pa.array(ts, pa.string())] + [pa.array(X[:, j]) for j in range(X.shape[1])]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(ts)
+    finally:
+        writer.close()
+    return rows
+
+class RingWindow:
+    """Fixed-size sliding window over a preallocated float64 buffer.
+
+    Each row is written twice, at ``i`` and ``i + window`` of a (2*window, dim)
+    array, so the current window is always one contiguous, time-ordered slice:
+    ``view()`` is zero-copy and memory is O(window) however long the stream.
+    """
+    def __init__(self, window: int, dim: int):
+        self.window = window
+        self._buf = np.zeros((2 * window, dim), dtype=np.float64)
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self.window)
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.window
+
+    def push(self, feats) -> None:
+        self._buf[self._pos] = feats
+        self._buf[self._pos + self.window] = feats
+        self._pos = (self._pos + 1) % self.window
+        self._count += 1
+
+    def view(self) -> np.ndarray:
+        """Oldest-to-newest rows; only valid until the next push."""
+        n = len(self)
+        start = self._pos + self.window - n
+        return self._buf[start:start + n]
+
+def windowed_vectors(rows: Iterator[Tuple[str, List[float]]], window: int, copy: bool = False):
+    """Yield (last ts, X) per row once ``window`` rows are seen; X shape: (window, dim).
+
+    X is a view into a ring buffer that the next row overwrites; pass
+    ``copy=True`` to get an independent array.
+    """
+    ring = None
     for ts, feats in rows:
-        buf.append(feats)
-        buf_ts.append(ts)
-        if len(buf) >= window:
-            X = np.array(buf[-window:])
-            yield buf_ts[-1], X  # last timestamp of window, X shape: (window, dim)
+        if ring is None:
+            ring = RingWindow(window, len(feats))
+        ring.push(feats)
+        if ring.full:
+            X = ring.view()
+            yield ts, (X.copy() if copy else X)
@@ -0,0 +1,220 @@
+
+from __future__ import annotations
+import argparse, csv, glob, hashlib, itertools, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from .batch import alarm_series, detector_scores, ensemble_series
+from .checkpoint import load_checkpoint, save_checkpoint
+from .ensemble import RULES
+from .pipeline import detector_params, load_config, threshold_params
+from .stream import input_columns, load_array
+
+console = Console()
+
+# One grid point: (window, ensemble, baseline, threshold_pct, sustain)
+GridKey = Tuple[int, str, int, float, int]
+
+def load_labelled(path: str, features: Optional[Sequence[str]], label_column: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(timestamps, features matrix, 0/1 labels) from one input; the label column is never a feature."""
+    names = input_columns(path)[1:]
+    if label_column not in names:
+        raise ValueError(f"{path} has no {label_column!r} column")
+    feats = [c for c in (features or names) if c != label_column]
+    ts, X = load_array(path, features=feats + [label_column])
+    return ts, X[:, :-1], X[:, -1] > 0
+
+def event_stats(alarm: np.ndarray, label: np.ndarray) -> Dict[str, object]:
+    """Point-wise alarm precision counts; event-wise recall and alarm latency (rows from event start)."""
+    tp = int(np.count_nonzero(alarm & label))
+    fp = int(np.count_nonzero(alarm & ~label))
+    edges = np.diff(np.concatenate(([0], label.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    # first alarm at or after each event start; the sentinel means "never"
+    hits = np.append(np.flatnonzero(alarm), len(alarm))
+    first_hit = hits[np.searchsorted(hits, starts)]
+    detected = first_hit < ends
+    return {
+        "tp": tp,
+        "fp": fp,
+        "events": len(starts),
+        "detected": int(detected.sum()),
+        "latencies": (first_hit[detected] - starts[detected]).tolist(),
+    }
+
+def _cache_path(cache_dir: str, path: str, features, window: int, detectors, params: dict) -> str:
+    st = os.stat(path)
+    key = repr((os.path.abspath(path), st.st_size, st.st_mtime_ns, list(features or []), window,
+                list(detectors), sorted((k, sorted(v.items())) for k, v in params.items())))
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+def score_file_window(
+    path: str,
+    window: int,
+    grid: List[Tuple[str, int, float, int]],
+    features: Optional[Sequence[str]] = None,
+    label_column: str = "label",
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    params: Optional[Dict[str, dict]] = None,
+    ensemble_weights: Optional[Sequence[float]] = None,
+    gate_pct: float = 0.0,
+    threshold_mode: str = "exact",
+    cache_dir: Optional[str] = None,
+    normalize: str = "none",
+    normalize_history: Optional[int] = None,
+    threshold_params: Optional[dict] = None,
+) -> Dict[GridKey, Dict[str, object]]:
+    """Every (ensemble, baseline, threshold_pct, sustain) grid point of one file at one window.
+
+    Detector scores depend only on the window (and detector options), so they
+    are computed once here (or loaded from ``cache_dir``) and reused across
+    the grid; thresholds are shared by points that differ only in sustain.
+    """
+    params = params or {}
+    ts, X, label = load_labelled(path, features, label_column)
+    if len(X) < window:
+        return {}
+    cached = None
+    if cache_dir:
+        cache = _cache_path(cache_dir, path, features, window, detectors, params)
+        cached = load_checkpoint(cache)
+    if cached is not None:
+        S = cached["scores"]
+    else:
+        S = detector_scores(X, window, detectors, params)
+        if cache_dir:
+            save_checkpoint(cache, {"scores": S})
+
+    ts, label = ts[window - 1:], label[window - 1:]
+    out: Dict[GridKey, Dict[str, object]] = {}
+    by_threshold = itertools.groupby(sorted(grid), key=lambda g: g[:3])
+    for (ensemble, baseline, pct), points in by_threshold:
+        _, s_ens = ensemble_series(S, detectors, ensemble, ensemble_weights, history=baseline*2, gate_pct=gate_pct,
+                                   normalize=normalize, normalize_history=normalize_history)
+        for _, _, _, sustain in points:
+            _, _, alarm = alarm_series(s_ens, baseline, pct, sustain, threshold_mode, ts, threshold_params)
+            out[(window, ensemble, baseline, pct, sustain)] = event_stats(alarm, label)
+    return out
+
+def summarize(key: GridKey, parts: Iterable[Dict[str, object]]) -> Dict[str, object]:
+    tp = fp = events = detected = 0
+    latencies: List[int] = []
+    for p in parts:
+        tp += p["tp"]; fp += p["fp"]; events += p["events"]; detected += p["detected"]
+        latencies += p["latencies"]
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = detected / events if events else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    window, ensemble, baseline, pct, sustain = key
+    return {
+        "window": window, "ensemble": ensemble, "baseline": baseline, "threshold_pct": pct, "sustain": sustain,
+        "precision": precision, "recall": recall, "f1": f1,
+        "events": events, "detected": detected, "alarm_rows": tp + fp,
+        "latency_mean": float(np.mean(latencies)) if latencies else None,
+        "latency_p50": float(np.median(latencies)) if latencies else None,
+    }
+
+def run_sweep(
+    paths: Sequence[str],
+    windows: Sequence[int],
+    ensembles: Sequence[str],
+    baselines: Sequence[int],
+    threshold_pcts: Sequence[float],
+    sustains: Sequence[int],
+    features: Optional[Sequence[str]] = None,
+    label_column: str = "label",
+    detectors: Sequence[str] = ("ecod", "iforest"),
+    params: Optional[Dict[str, dict]] = None,
+    ensemble_weights: Optional[Sequence[float]] = None,
+    gate_pct: float = 0.0,
+    threshold_mode: str = "exact",
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    normalize: str = "none",
+    normalize_history: Optional[int] = None,
+    threshold_params: Optional[dict] = None,
+) -> List[Dict[str, object]]:
+    """Score every file x window on a process pool; one summary row per grid point, best F1 first."""
+    grid = list(itertools.product(ensembles, baselines, threshold_pcts, sustains))
+    results: Dict[GridKey, List[Dict[str, object]]] = {}
+    # (file, window) tasks, largest windows first so long tasks do not trail
+    tasks = [(path, w) for w in sorted(windows, reverse=True) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(score_file_window, path, w, grid, features, label_column,
+                        detectors, params, ensemble_weights, gate_pct, threshold_mode, cache_dir,
+                        normalize, normalize_history, threshold_params)
+            for path, w in tasks
+        ]
+        for fut in as_completed(futures):
+            for key, stats in fut.result().items():
+                results.setdefault(key, []).append(stats)
+    rows = [summarize(key, parts) for key, parts in results.items()]
+    rows.sort(key=lambda r: (-r["f1"], -r["recall"], r["window"]))
+    return rows
+
+def print_summary(rows: List[Dict[str, object]], top: int = 20) -> None:
+    table = Table(title=f"Sweep: top {min(top, len(rows))} of {len(rows)} configurations")
+    for col in ("window", "ensemble", "baseline", "thr%", "sustain", "precision", "recall", "F1", "events", "latency"):
+        table.add_column(col, justify="right")
+    for r in rows[:top]:
+        latency = f"{r['latency_mean']:.1f}" if r["latency_mean"] is not None else "-"
+        table.add_row(
+            str(r["window"]), r["ensemble"], str(r["baseline"]), f"{r['threshold_pct']:g}", str(r["sustain"]),
+            f"{r['precision']:.3f}", f"{r['recall']:.3f}", f"{r['f1']:.3f}", f"{r['detected']}/{r['events']}", latency,
+        )
+    console.print(table)
+
+def main():
+    p = argparse.ArgumentParser(description="Backtest a parameter grid over labelled inputs on a process pool")
+    p.add_argument("inputs", nargs="+", help="Labelled inputs (CSV/Parquet/Arrow/.npy) or glob patterns")
+    p.add_argument("--window", type=int, nargs="+", default=None)
+    p.add_argument("--baseline", type=int, nargs="+", default=None)
+    p.add_argument("--threshold-pct", type=float, nargs="+", default=None)
+    p.add_argument("--sustain", type=int, nargs="+", default=None)
+    p.add_argument("--ensemble", type=str, nargs="+", choices=RULES, default=None)
+    p.add_argument("--label-column", type=str, default="label", help="0/1 column marking anomalous rows")
+    p.add_argument("--config", type=str, default=os.path.join(os.path.dirname(__file__), "config.yaml"), help="YAML config for defaults")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    p.add_argument("--cache-dir", type=str, default=None, help="Reuse detector scores across sweeps")
+    p.add_argument("--out", type=str, default=None, help="Write every configuration's summary to CSV")
+    p.add_argument("--top", type=int, default=20, help="Rows shown in the table")
+    args = p.parse_args()
+    cfg = load_config(args.config)
+
+    paths = sorted({f for pattern in args.inputs for f in (glob.glob(pattern) or [pattern])})
+    t0 = time.perf_counter()
+    rows = run_sweep(
+        paths,
+        windows=args.window or [cfg.get("window", 5)],
+        ensembles=args.ensemble or [cfg.get("ensemble", "max")],
+        baselines=args.baseline or [cfg.get("baseline", 60)],
+        threshold_pcts=args.threshold_pct or [cfg.get("threshold_pct", 98.0)],
+        sustains=args.sustain or [cfg.get("sustain", 6)],
+        features=cfg.get("features", None),
+        label_column=args.label_column,
+        detectors=cfg.get("detectors", ["ecod", "iforest"]),
+        params=detector_params(cfg),
+        ensemble_weights=cfg.get("ensemble_weights") or None,
+        gate_pct=cfg.get("gate_pct", 0.0),
+        normalize=cfg.get("normalize", "none"),
+        normalize_history=cfg.get("normalize_history") or None,
+        threshold_mode=cfg.get("threshold_mode", "exact"),
+        threshold_params=threshold_params(cfg),
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+    )
+    print_summary(rows, args.top)
+    console.print(f"{len(paths)} files x {len(rows)} configurations in {time.perf_counter() - t0:.1f}s")
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+        console.print(f"[green]Saved sweep summary to {args.out}[/]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+
+from __future__ import annotations
+import math
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Latency bucket upper bounds in seconds: 10us .. 10s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus ``le`` semantics); O(log buckets) per observation."""
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def copy(self) -> Histogram:
+        h = Histogram(self.bounds)
+        h.counts = list(self.counts)
+        h.sum = self.sum
+        return h
+
+class StageTimings:
+    """Per-stage latency histograms fed from ``time.perf_counter`` laps.
+
+    ``t = timings.lap("stage", t)`` records the time since ``t`` and returns
+    the new lap start, so a hot path costs one clock read and one bisect per
+    stage. Disabled timings still return the clock but record nothing.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+
+    def lap(self, stage: str, start: float) -> float:
+        now = time.perf_counter()
+        if self.enabled:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(now - start)
+        return now
+
+    def snapshot(self) -> Dict[str, Histogram]:
+        """Copies of the histograms, safe to read (or pickle) while laps continue."""
+        return {stage: hist.copy() for stage, hist in list(self.histograms.items())}
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class PrometheusText:
+    """Builds a Prometheus text-format (0.0.4) exposition."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, namespace: str = "ecod_edge"):
+        self.namespace = namespace
+        self.lines: List[str] = []
+
+    def _header(self, name: str, kind: str, help: str) -> str:
+        name = f"{self.namespace}_{name}"
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def gauge(self, name: str, help: str, value: float) -> None:
+        name = self._header(name, "gauge", help)
+        self.lines.append(f"{name} {_fmt(value)}")
+
+    def counter(self, name: str, help: str, value: float) -> None:
+        name = self._header(name + "_total", "counter", help)
+        self.lines.append(f"{name} {_fmt(value)}")
+
+    def labelled(self, kind: str, name: str, help: str, label: str, values: Dict[str, float]) -> None:
+        """One gauge or counter family with a series per label value."""
+        name = self._header(name + "_total" if kind == "counter" else name, kind, help)
+        for value, v in sorted(values.items()):
+            self.lines.append(f'{name}{{{label}="{value}"}} {_fmt(v)}')
+
+    def histograms(self, name: str, help: str, label: str, series: Dict[str, Histogram]) -> None:
+        """One histogram family with a series per label value."""
+        name = self._header(name, "histogram", help)
+        for value, hist in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(hist.bounds + (math.inf,), hist.counts):
+                cumulative += n
+                self.lines.append(f'{name}_bucket{{{label}="{value}",le="{_fmt(bound)}"}} {cumulative}')
+            self.lines.append(f'{name}_sum{{{label}="{value}"}} {_fmt(hist.sum)}')
+            self.lines.append(f'{name}_count{{{label}="{value}"}} {cumulative}')
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -1,24 +1,476 @@
 
 from __future__ import annotations
-import time, sys, statistics
-from typing import Iterable, List, Deque
+import math, time, sys, statistics
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Deque, Optional
 from collections import deque
+import numpy as np
+
+from .checkpoint import State, check_meta
 
 class PercentileThreshold:
-    """Maintain a rolling buffer of scores and provide percentile-based thresholding."""
+    """Maintain a rolling buffer of scores and provide percentile-based thresholding.
+
+    The buffer is mirrored in a sorted list, so insert/evict are a bisect each
+    and a percentile query is an index lookup rather than a full sort.
+    """
     def __init__(self, maxlen: int = 600):
         self.buf: Deque[float] = deque(maxlen=maxlen)
+        self._sorted: List[float] = []
 
-    def update(self, value: float) -> None:
+    def update(self, value: float, ts=None) -> None:
+        value = float(value)
+        if len(self.buf) == self.buf.maxlen:
+            del self._sorted[bisect_left(self._sorted, self.buf[0])]
         self.buf.append(value)
+        insort(self._sorted, value)
+
+    def update_alarm(self, alarm: bool, exceed: bool = True) -> None:
+        """Alarm and exceed state of the last update; only AdaptiveThreshold acts on it."""
+
+    def state_dict(self) -> State:
+        return {"maxlen": np.array(self.buf.maxlen), "buf": np.array(self.buf, dtype=np.float64)}
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, maxlen=self.buf.maxlen)
+        self.buf.clear()
+        self._sorted = []
+        for value in state["buf"].tolist():
+            self.update(value)
 
     def percentile(self, pct: float) -> float:
-        if not self.buf:
+        if not self._sorted:
             return float("inf")
-        arr = sorted(self.buf)
+        arr = self._sorted
         k = max(0, min(len(arr)-1, int(round((pct/100.0)* (len(arr)-1)))))
         return arr[k]
 
+class P2Quantile:
+    """Streaming estimate of a single quantile in O(1) memory (Jain & Chlamtac P\u00b2)."""
+    def __init__(self, q: float):
+        self.q = q
+        self.count = 0
+        self._heights: List[float] = []
+        self._pos = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self._desired = [1.0, 1.0 + 2*q, 1.0 + 4*q, 3.0 + 2*q, 5.0]
+        self._step = [0.0, q/2, q, (1.0 + q)/2, 1.0]
+
+    def update(self, x: float) -> None:
+        self.count += 1
+        h = self._heights
+        if self.count <= 5:
+            insort(h, x)
+            return
+
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = bisect_right(h, x) - 1
+        n = self._pos
+        for i in range(k+1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._step[i]
+
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i+1] - n[i] > 1) or (d <= -1 and n[i-1] - n[i] < -1):
+                d = 1.0 if d > 0 else -1.0
+                # piecewise-parabolic prediction, linear if it would break ordering
+                qp = h[i] + d / (n[i+1] - n[i-1]) * (
+                    (n[i] - n[i-1] + d) * (h[i+1] - h[i]) / (n[i+1] - n[i])
+                    + (n[i+1] - n[i] - d) * (h[i] - h[i-1]) / (n[i] - n[i-1])
+                )
+                if not h[i-1] < qp < h[i+1]:
+                    j = i + int(d)
+                    qp = h[i] + d * (h[j] - h[i]) / (n[j] - n[i])
+                h[i] = qp
+                n[i] += d
+
+    def state(self) -> np.ndarray:
+        """[count, heights(5, nan-padded), positions(5), desired(5)]"""
+        heights = self._heights + [np.nan] * (5 - len(self._heights))
+        return np.array([self.count, *heights, *self._pos, *self._desired], dtype=np.float64)
+
+    def load(self, state: np.ndarray) -> None:
+        self.count = int(state[0])
+        self._heights = [h for h in state[1:6].tolist()][:min(self.count, 5)]
+        self._pos = state[6:11].tolist()
+        self._desired = state[11:16].tolist()
+
+    def value(self) -> float:
+        if self.count == 0:
+            return float("inf")
+        if self.count <= 5:
+            arr = self._heights
+            return arr[max(0, min(len(arr)-1, int(round(self.q * (len(arr)-1)))))]
+        return self._heights[2]
+
+class ApproxPercentileThreshold:
+    """Bounded-memory approximation of PercentileThreshold for very long baselines.
+
+    The window is split into ``blocks`` consecutive blocks, each summarised by
+    one P\u00b2 estimator per tracked percentile; the oldest block is dropped whole
+    and queries return the count-weighted mean of the block estimates. Memory
+    is O(blocks * len(pcts)) regardless of ``maxlen``.
+
+    P² needs a block to see ~``MIN_TAIL`` samples beyond the percentile, so
+    fewer blocks are used when ``maxlen`` cannot give each that many (see
+    ``min_block_len``); ``make_threshold`` uses the exact tracker instead
+    when not even two such blocks fit.
+    """
+    MIN_TAIL = 10
+
+    @classmethod
+    def min_block_len(cls, pcts: Iterable[float]) -> int:
+        """Samples a block needs for ``MIN_TAIL`` of them to fall past the most extreme of ``pcts``."""
+        tail = min(min(p, 100.0 - p) for p in pcts) / 100.0
+        return int(math.ceil(cls.MIN_TAIL / max(tail, 1e-6)))
+
+    def __init__(self, maxlen: int = 600, pcts: Iterable[float] = (98.0,), blocks: int = 8):
+        self.pcts = tuple(float(p) for p in pcts)
+        blocks = max(1, min(blocks, maxlen // self.min_block_len(self.pcts)))
+        self.block_len = max(1, -(-maxlen // blocks))
+        self._blocks: Deque[Dict[float, P2Quantile]] = deque(maxlen=blocks)
+
+    def update(self, value: float, ts=None) -> None:
+        if not self._blocks or next(iter(self._blocks[-1].values())).count >= self.block_len:
+            self._blocks.append({p: P2Quantile(p/100.0) for p in self.pcts})
+        for est in self._blocks[-1].values():
+            est.update(float(value))
+
+    def update_alarm(self, alarm: bool, exceed: bool = True) -> None:
+        pass
+
+    def state_dict(self) -> State:
+        blocks = np.array([[b[p].state() for p in self.pcts] for b in self._blocks], dtype=np.float64)
+        return {
+            "block_len": np.array(self.block_len),
+            "pcts": np.array(self.pcts),
+            "blocks": blocks.reshape(len(self._blocks), len(self.pcts), 16),
+        }
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, block_len=self.block_len)
+        if tuple(state["pcts"].tolist()) != self.pcts:
+            raise ValueError(f"checkpoint percentiles {state['pcts'].tolist()} do not match {self.pcts}")
+        self._blocks.clear()
+        for block in state["blocks"]:
+            ests = {p: P2Quantile(p/100.0) for p in self.pcts}
+            for p, est_state in zip(self.pcts, block):
+                ests[p].load(est_state)
+            self._blocks.append(ests)
+
+    def percentile(self, pct: float) -> float:
+        pct = float(pct)
+        if pct not in self.pcts:
+            raise ValueError(f"percentile {pct} is not tracked; tracked: {self.pcts}")
+        if not self._blocks:
+            return float("inf")
+        total = sum(b[pct].count for b in self._blocks)
+        return sum(b[pct].value() * b[pct].count for b in self._blocks) / total
+
+class _LogBins:
+    """Signed log-spaced bins; a bin's lower edge is within ``accuracy`` (relative) of every value in it."""
+    def __init__(self, accuracy: float = 0.01, min_value: float = 1e-9, max_value: float = 1e12):
+        self.gamma = 1 + accuracy
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.half = int(math.ceil(math.log(max_value / min_value) / self._log_gamma)) + 1
+        self.nbins = 2 * self.half + 1  # [negatives, descending |v|] [zero] [positives]
+
+    def _index(self, a: float) -> int:
+        return min(self.half - 1, max(0, int(math.ceil(math.log(a / self.min_value) / self._log_gamma))))
+
+    def key(self, value: float) -> int:
+        if value >= self.min_value:
+            return self.half + 1 + self._index(value)
+        if value <= -self.min_value:
+            return self.half - 1 - self._index(-value)
+        return self.half
+
+    def value(self, key: int) -> float:
+        """Lower edge of the bin, so every score in the bin compares >= it (as a tie does)."""
+        if key > self.half:
+            return self.min_value * self.gamma ** (key - self.half - 2)
+        if key < self.half:
+            return -self.min_value * self.gamma ** (self.half - 1 - key)
+        return 0.0
+
+class _Fenwick:
+    """Counts per bin with O(log n) add and rank lookup."""
+    def __init__(self, n: int):
+        self.n = n
+        self.tree = [0] * (n + 1)
+        self._top = 1 << (n.bit_length() - 1)
+
+    def build(self, counts: np.ndarray) -> None:
+        tree = [0] + counts.astype(np.int64).tolist()
+        for i in range(1, self.n + 1):
+            j = i + (i & -i)
+            if j <= self.n:
+                tree[j] += tree[i]
+        self.tree = tree
+
+    def add(self, i: int, delta: int) -> None:
+        i += 1
+        tree, n = self.tree, self.n
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def kth(self, k: int) -> int:
+        """Bin holding the k-th (0-based) smallest count."""
+        pos, step, tree = 0, self._top, self.tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and tree[nxt] <= k:
+                pos = nxt
+                k -= tree[nxt]
+            step >>= 1
+        return pos
+
+class _Baseline:
+    """FIFO of bin keys mirrored in a Fenwick tree of bin counts."""
+    def __init__(self, maxlen: int, nbins: int):
+        self.keys: Deque[int] = deque(maxlen=maxlen)
+        self.counts = _Fenwick(nbins)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: int) -> None:
+        if len(self.keys) == self.keys.maxlen:
+            self.counts.add(self.keys[0], -1)
+        self.keys.append(key)
+        self.counts.add(key, 1)
+
+    def pop(self) -> None:
+        self.counts.add(self.keys.pop(), -1)
+
+    def load(self, keys: Iterable[int]) -> None:
+        self.keys.clear()
+        self.keys.extend(int(k) for k in keys)
+        self.counts.build(np.bincount(np.array(self.keys, dtype=np.int64), minlength=self.counts.n))
+
+    def clear(self) -> None:
+        self.load(())
+
+    def quantile_key(self, pct: float) -> int:
+        m = len(self.keys)
+        return self.counts.kth(max(0, min(m-1, int(round((pct/100.0) * (m-1))))))
+
+class PageHinkley:
+    """Two-sided Page-Hinkley change detector on running-standardized, clipped scores.
+
+    ``update`` returns None, or on drift the number of most recent samples
+    that came after the estimated change point.
+    """
+    def __init__(self, threshold: float = 50.0, delta: float = 0.5, clip: float = 3.0, min_samples: int = 30):
+        self.threshold = threshold
+        self.delta = delta
+        self.clip = clip
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.up = self.up_min = 0.0
+        self.down = self.down_max = 0.0
+        self.up_at = self.down_at = 0
+
+    def update(self, x: float):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+        if self.n < self.min_samples:
+            return None
+        std = math.sqrt(self.m2 / (self.n - 1))
+        z = max(-self.clip, min(self.clip, (x - self.mean) / std)) if std > 0 else 0.0
+
+        self.up += z - self.delta
+        if self.up < self.up_min:
+            self.up_min, self.up_at = self.up, self.n
+        self.down += z + self.delta
+        if self.down > self.down_max:
+            self.down_max, self.down_at = self.down, self.n
+        if self.up - self.up_min > self.threshold:
+            return self.n - self.up_at
+        if self.down_max - self.down > self.threshold:
+            return self.n - self.down_at
+        return None
+
+    def state(self) -> np.ndarray:
+        return np.array([self.n, self.mean, self.m2, self.up, self.up_min, self.down, self.down_max,
+                         self.up_at, self.down_at], dtype=np.float64)
+
+    def load(self, state: np.ndarray) -> None:
+        n, self.mean, self.m2, self.up, self.up_min, self.down, self.down_max, up_at, down_at = state.tolist()
+        self.n, self.up_at, self.down_at = int(n), int(up_at), int(down_at)
+
+def _seconds_of_day(ts) -> Optional[float]:
+    if ts is None or ts == "":
+        return None
+    if isinstance(ts, str):
+        try:
+            t = datetime.fromisoformat(ts)
+        except ValueError:
+            return None  # not a timestamp; no seasonal slot
+        return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+    return float(ts) % 86400.0
+
+class AdaptiveThreshold:
+    """Drift-aware rolling percentile for multi-day baselines.
+
+    Scores are counted in log-spaced bins (relative error <= ``accuracy``)
+    behind a Fenwick tree, so update and query are O(log bins) whatever
+    ``maxlen`` is. A Page-Hinkley test on the score stream detects level
+    shifts; on drift the baseline is rebuilt from the samples after the
+    estimated change point. Scores that exceed the threshold while the alarm
+    is up are retracted (``update_alarm``) so an incident does not raise its
+    own threshold, while in-threshold scores keep the baseline moving. With
+    ``seasonal_slots`` > 0 each time-of-day slot also keeps its own baseline.
+    """
+    def __init__(
+        self,
+        maxlen: int = 600,
+        accuracy: float = 0.01,
+        drift_threshold: float = 50.0,
+        drift_delta: float = 0.5,
+        seasonal_slots: int = 0,
+        max_excluded: float = 0.05,
+    ):
+        self.maxlen = maxlen
+        self.accuracy = accuracy
+        self.seasonal_slots = seasonal_slots
+        self.max_excluded = int(max_excluded * maxlen)
+        self.bins = _LogBins(accuracy)
+        self.baseline = _Baseline(maxlen, self.bins.nbins)
+        self.slots = [_Baseline(maxlen, self.bins.nbins) for _ in range(seasonal_slots)]
+        self.drift = PageHinkley(drift_threshold, drift_delta)
+        self.min_samples = max(10, maxlen // 10)
+        self.recent: Deque[tuple] = deque(maxlen=maxlen)  # (value, key, slot) for reseeding after drift
+        self.drifts = 0
+        self.updates = 0
+        self._excluded: Deque[int] = deque()  # update numbers of retracted samples within the last maxlen
+        self._slot: Optional[int] = None
+        self._pending = False
+
+    def _slot_of(self, ts) -> Optional[int]:
+        seconds = _seconds_of_day(ts) if self.seasonal_slots else None
+        return None if seconds is None else int(seconds * self.seasonal_slots // 86400) % self.seasonal_slots
+
+    def update(self, value: float, ts=None) -> None:
+        value = float(value)
+        key, slot = self.bins.key(value), self._slot_of(ts)
+        self._slot = slot
+        self.baseline.add(key)
+        if slot is not None:
+            self.slots[slot].add(key)
+        self.recent.append((value, key, slot))
+        self.updates += 1
+        self._pending = True
+
+        since = self.drift.update(value)
+        if since is not None:
+            self._reseed(max(1, since), slot)
+
+    def _reseed(self, since: int, slot: Optional[int]) -> None:
+        self.drifts += 1
+        tail = list(self.recent)[-since:]
+        self.baseline.load(k for _, k, _ in tail)
+        if slot is not None:
+            self.slots[slot].load(k for _, k, s in tail if s == slot)
+        self.drift.reset()
+        for value, _, _ in tail:
+            self.drift.update(value)
+        self._pending = False
+
+    def update_alarm(self, alarm: bool, exceed: bool = True) -> None:
+        """Retract the last sample from the baselines if it exceeded during an alarm.
+
+        At most ``max_excluded`` of the last ``maxlen`` samples are retracted,
+        and none during warm-up, so a long or frequent alarm cannot ratchet
+        the threshold down by starving the baseline of its upper tail.
+        """
+        excluded = self._excluded
+        while excluded and excluded[0] <= self.updates - self.maxlen:
+            excluded.popleft()
+        if (alarm and exceed and self._pending and len(excluded) < self.max_excluded
+                and len(self.baseline) > self.min_samples):
+            excluded.append(self.updates)
+            self.baseline.pop()
+            if self._slot is not None:
+                self.slots[self._slot].pop()
+        self._pending = False
+
+    def percentile(self, pct: float) -> float:
+        base = self.baseline
+        if self._slot is not None and len(self.slots[self._slot]) >= self.min_samples:
+            base = self.slots[self._slot]
+        if not len(base):
+            return float("inf")
+        return self.bins.value(base.quantile_key(pct))
+
+    def state_dict(self) -> State:
+        return {
+            "maxlen": np.array(self.maxlen),
+            "accuracy": np.array(self.accuracy),
+            "seasonal_slots": np.array(self.seasonal_slots),
+            "keys": np.array(self.baseline.keys, dtype=np.int64),
+            "slot_keys": np.array([k for b in self.slots for k in b.keys], dtype=np.int64),
+            "slot_lens": np.array([len(b) for b in self.slots], dtype=np.int64),
+            "recent": np.array([(v, k, -1 if s is None else s) for v, k, s in self.recent], dtype=np.float64).reshape(-1, 3),
+            "drift": self.drift.state(),
+            "drifts": np.array(self.drifts),
+            "updates": np.array(self.updates),
+            "excluded": np.array(self._excluded, dtype=np.int64),
+        }
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, maxlen=self.maxlen, accuracy=self.accuracy, seasonal_slots=self.seasonal_slots)
+        self.baseline.load(state["keys"].tolist())
+        start = 0
+        for b, n in zip(self.slots, state["slot_lens"].tolist()):
+            b.load(state["slot_keys"][start:start + n].tolist())
+            start += n
+        self.recent.clear()
+        self.recent.extend((v, int(k), None if s < 0 else int(s)) for v, k, s in state["recent"].tolist())
+        self.drift.load(state["drift"])
+        self.drifts = int(state["drifts"])
+        self.updates = int(state["updates"])
+        self._excluded = deque(state["excluded"].tolist())
+        self._slot, self._pending = None, False
+
+THRESHOLD_MODES = ("exact", "approx", "adaptive")
+
+def make_threshold(maxlen: int, mode: str = "exact", pct: float = 98.0, **params):
+    """Rolling threshold tracker for ``mode`` "exact", "approx" or "adaptive".
+
+    ``params`` (e.g. drift_threshold, seasonal_slots) go to AdaptiveThreshold
+    and are ignored by the other modes. "approx" falls back to the exact
+    tracker when ``maxlen`` is under two minimum-length P² blocks (1000
+    samples at the 98th percentile), where it is both inaccurate and no
+    smaller.
+    """
+    if mode == "approx":
+        if maxlen >= 2 * ApproxPercentileThreshold.min_block_len((pct,)):
+            return ApproxPercentileThreshold(maxlen=maxlen, pcts=(pct,))
+        mode = "exact"
+    if mode == "adaptive":
+        return AdaptiveThreshold(maxlen=maxlen, **params)
+    if mode != "exact":
+        raise ValueError(f"unknown threshold mode: {mode!r}")
+    return PercentileThreshold(maxlen=maxlen)
+
 class SustainAlarm:
     """Trigger alarm if k out of last n frames exceed threshold."""
     def __init__(self, n: int = 10, k: int = 6):
@@ -29,3 +481,11 @@ class SustainAlarm:
     def update(self, exceed: bool) -> bool:
         self.history.append(exceed)
         return sum(self.history) >= self.k
+
+    def state_dict(self) -> State:
+        return {"n": np.array(self.n), "history": np.array(self.history, dtype=bool)}
+
+    def load_state(self, state: State) -> None:
+        check_meta(state, n=self.n)
+        self.history.clear()
+        self.history.extend(bool(x) for x in state["history"])
@@ -0,0 +1,79 @@
+
+from __future__ import annotations
+import numpy as np
+import pytest
+
+from ecod_edge.utils import ApproxPercentileThreshold, PercentileThreshold, make_threshold
+
+PCT = 98.0
+MIN_BLOCK = ApproxPercentileThreshold.min_block_len((PCT,))
+
+def scores(n: int, seed: int = 0) -> np.ndarray:
+    """ECOD-like heavy-tailed scores with a few bursts (as in benchmarks/bench_threshold.py)."""
+    rng = np.random.default_rng(seed)
+    out = rng.gamma(2.0, 1.5, size=n)
+    out[rng.integers(0, n, size=n // 100)] *= 4
+    return out
+
+def relative_errors(tracker, maxlen: int, values: np.ndarray) -> np.ndarray:
+    """|tracker - exact| / exact for every query after the window first fills."""
+    exact = PercentileThreshold(maxlen)
+    errors = []
+    for i, v in enumerate(values):
+        tracker.update(v)
+        exact.update(v)
+        if i >= maxlen:
+            ref = exact.percentile(PCT)
+            errors.append(abs(tracker.percentile(PCT) - ref) / ref)
+    return np.array(errors)
+
+@pytest.mark.parametrize("maxlen", [1, 7, 50, 600])
+def test_exact_matches_numpy_on_rolling_window(maxlen):
+    values = scores(3 * maxlen + 50, seed=maxlen)
+    tracker = PercentileThreshold(maxlen)
+    for i, v in enumerate(values):
+        tracker.update(v)
+        window = values[max(0, i - maxlen + 1):i + 1]
+        for pct in (0.0, 50.0, 90.0, PCT, 100.0):
+            assert tracker.percentile(pct) == np.percentile(window, pct, method="nearest")
+
+def test_exact_empty_is_inf():
+    assert PercentileThreshold(10).percentile(PCT) == float("inf")
+
+def test_min_block_len():
+    # ten samples past the percentile per P² block
+    assert MIN_BLOCK == 500
+    assert ApproxPercentileThreshold.min_block_len((2.0,)) == 500
+    assert ApproxPercentileThreshold.min_block_len((50.0, 99.0)) == 1000
+
+@pytest.mark.parametrize("maxlen", [2 * MIN_BLOCK, 4 * MIN_BLOCK, 20000])
+def test_approx_blocks_hold_min_block_len(maxlen):
+    tracker = ApproxPercentileThreshold(maxlen, pcts=(PCT,))
+    assert tracker.block_len >= MIN_BLOCK
+    assert tracker._blocks.maxlen * tracker.block_len >= maxlen
+
+@pytest.mark.parametrize("maxlen, mean_tol, max_tol", [
+    (2 * MIN_BLOCK, 0.08, 0.30),
+    (10 * MIN_BLOCK, 0.02, 0.06),
+])
+def test_approx_within_tolerance_of_exact(maxlen, mean_tol, max_tol):
+    errors = relative_errors(ApproxPercentileThreshold(maxlen, pcts=(PCT,)), maxlen, scores(maxlen + 7000))
+    assert errors.mean() < mean_tol
+    assert errors.max() < max_tol
+
+def test_approx_untracked_percentile_raises():
+    with pytest.raises(ValueError):
+        ApproxPercentileThreshold(2 * MIN_BLOCK, pcts=(PCT,)).percentile(50.0)
+
+@pytest.mark.parametrize("maxlen", [1, 120, MIN_BLOCK, 2 * MIN_BLOCK - 1])
+def test_make_threshold_approx_falls_back_to_exact(maxlen):
+    tracker = make_threshold(maxlen, mode="approx", pct=PCT)
+    assert type(tracker) is PercentileThreshold
+    assert relative_errors(tracker, maxlen, scores(maxlen + 500)).max() == 0.0
+
+def test_make_threshold_approx_above_min_block_len():
+    assert isinstance(make_threshold(2 * MIN_BLOCK, mode="approx", pct=PCT), ApproxPercentileThreshold)
+
+def test_make_threshold_unknown_mode():
+    with pytest.raises(ValueError):
+        make_threshold(100, mode="sorted")